@@ -25,6 +25,29 @@ app.config['SECRET_KEY'] = 'dev_key_secret'
 app.config['SQLALCHEMY_DATABASE_URI'] = ConfigManager.get_db_uri()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Pool settings for Source/Target engines (see services/engine_registry.py)
+app.config['ENGINE_POOL_SIZE'] = 5
+app.config['ENGINE_MAX_OVERFLOW'] = 10
+app.config['ENGINE_POOL_PRE_PING'] = True
+app.config['ENGINE_POOL_RECYCLE'] = 1800 # seconds
+
+# Per-side timeout when /metadata syncs the Source/Target catalogs
+app.config['METADATA_FETCH_TIMEOUT'] = 15 # seconds
+
+# Table statistics (row counts / sizes) and the parallelism derived from them
+app.config['STATS_REFRESH_INTERVAL'] = 3600 # seconds
+app.config['TRANSFER_CHUNK_BYTES'] = 256 * 1024 * 1024 # one parallel chunk per this many bytes
+app.config['TRANSFER_MAX_PARALLEL'] = 8
+
+# DAG templates (see services/template_registry.py): shared macros folder and on-disk bytecode cache
+app.config['DAG_TEMPLATE_DIR'] = None
+app.config['DAG_TEMPLATE_BYTECODE_DIR'] = None
+# 'dated' (etl_<src>_to_<tgt>_<YYYYMMDD>) or 'deterministic' (etl_<src>_to_<tgt>, byte-identical re-renders)
+app.config['DAG_ID_MODE'] = 'dated'
+
+# Airflow dags folder that generated DAGs are published to (see services/dag_publish_service.py)
+app.config['AIRFLOW_DAGS_DIR'] = None
+
 db = SQLAlchemy(app)
 
 # Import routes after app/db initialization to avoid circular imports
@@ -1,3 +1,4 @@
+import json
 import sqlite3
 import os
 
@@ -24,6 +25,64 @@ def fix_database():
             print("Column 'role' added successfully.")
         else:
             print("Column 'role' already exists.")
+
+        cursor.execute("PRAGMA table_info(tb_etl_meta_mst)")
+        columns = [info[1] for info in cursor.fetchall()]
+
+        if 'ddl_options' not in columns:
+            print("Adding 'ddl_options' column to 'tb_etl_meta_mst' table...")
+            cursor.execute("ALTER TABLE tb_etl_meta_mst ADD COLUMN ddl_options TEXT")
+            conn.commit()
+            print("Column 'ddl_options' added successfully.")
+        else:
+            print("Column 'ddl_options' already exists.")
+
+        cursor.execute("PRAGMA table_info(tb_etl_meta_cache)")
+        columns = [info[1] for info in cursor.fetchall()]
+
+        stats_columns = [('num_rows', 'BIGINT'), ('avg_row_len', 'INTEGER'), ('size_bytes', 'BIGINT'), ('stats_at', 'DATETIME')]
+        for name, col_type in stats_columns:
+            if columns and name not in columns:
+                print(f"Adding '{name}' column to 'tb_etl_meta_cache' table...")
+                cursor.execute(f"ALTER TABLE tb_etl_meta_cache ADD COLUMN {name} {col_type}")
+                conn.commit()
+
+        cursor.execute("PRAGMA table_info(tb_etl_map_def)")
+        columns = [info[1] for info in cursor.fetchall()]
+
+        if 'column_count' not in columns:
+            print("Adding 'column_count' column to 'tb_etl_map_def' table...")
+            cursor.execute("ALTER TABLE tb_etl_map_def ADD COLUMN column_count INTEGER")
+            # Backfill from the stored mapping JSON
+            cursor.execute("SELECT id, mapping_json FROM tb_etl_map_def")
+            for mapping_id, mapping_json in cursor.fetchall():
+                try:
+                    data = json.loads(mapping_json)
+                    mappings = data.get('mappings', []) if isinstance(data, dict) else data
+                    count = len([m for m in mappings or [] if m.get('target_column')])
+                except Exception:
+                    count = None
+                cursor.execute("UPDATE tb_etl_map_def SET column_count = ? WHERE id = ?", (count, mapping_id))
+            conn.commit()
+            print("Column 'column_count' added successfully.")
+
+        cursor.execute("PRAGMA table_info(tb_etl_dag_hist)")
+        columns = [info[1] for info in cursor.fetchall()]
+
+        # Older history rows keep NULLs: a rebuild with an explicit template treats them as stale
+        for name, col_type in [('template_id', 'INTEGER'), ('input_hash', 'VARCHAR(64)')]:
+            if columns and name not in columns:
+                print(f"Adding '{name}' column to 'tb_etl_dag_hist' table...")
+                cursor.execute(f"ALTER TABLE tb_etl_dag_hist ADD COLUMN {name} {col_type}")
+                conn.commit()
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_tb_etl_dag_hist_mapping_id ON tb_etl_dag_hist (mapping_id)")
+
+        # Indexes used by the mapping list (name search and joins)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_tb_etl_meta_mst_table_name ON tb_etl_meta_mst (table_name)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_tb_etl_meta_mst_table_name_upper ON tb_etl_meta_mst (upper(table_name))")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_tb_etl_map_def_source_table_id ON tb_etl_map_def (source_table_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_tb_etl_map_def_target_table_id ON tb_etl_map_def (target_table_id)")
+        conn.commit()
             
         conn.close()
     except Exception as e:
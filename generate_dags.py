@@ -0,0 +1,56 @@
+"""
+Render DAGs for many mappings with one template (same as POST /api/dags/generate).
+
+    python generate_dags.py --template 1 [--ids 3,4,5 | --source EMP* --target TB_*] [--workers 8] [--zip dags.zip] [--publish]
+    python generate_dags.py --stale [--template 1] [--ids 3,4,5] [--publish]
+"""
+import argparse
+import sys
+from app import app
+from services.dag_publish_service import DagPublishService
+from services.dag_service import DagService
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--template', type=int, help='EtlTemplate id (required unless --stale)')
+    parser.add_argument('--ids', help='comma-separated mapping ids (default: all mappings)')
+    parser.add_argument('--source', help='source table name prefix, * for wildcards')
+    parser.add_argument('--target', help='target table name prefix, * for wildcards')
+    parser.add_argument('--workers', type=int, help='render processes (default: CPU count, max 8)')
+    parser.add_argument('--zip', help='also write the rendered files to this zip file')
+    parser.add_argument('--publish', action='store_true', help='write the DAGs to AIRFLOW_DAGS_DIR (changed files only)')
+    parser.add_argument('--stale', action='store_true',
+                        help='only re-render DAGs whose template, mapping, schemas or context changed')
+    args = parser.parse_args()
+    if not args.template and not args.stale:
+        parser.error('--template is required unless --stale is given')
+
+    mapping_ids = [int(i) for i in args.ids.split(',') if i.strip()] if args.ids else None
+    with app.app_context():
+        service = DagService()
+        if args.stale:
+            result = service.rebuild_stale(args.template, mapping_ids, args.workers)
+            for skipped in result['skipped']:
+                print(f"WARN: mapping {skipped['mapping_id']}: {skipped['message']}")
+            print(f"{len(result['stale'])} stale, {result['fresh']} up to date.")
+        else:
+            result = service.generate_dags(args.template, mapping_ids, args.source, args.target, args.workers)
+        for error in result['errors']:
+            print(f"ERROR: mapping {error['mapping_id']}: {error['message']}")
+        print(f"Generated {len(result['histories'])} DAG(s), {len(result['errors'])} error(s).")
+
+        if args.zip and result['histories']:
+            with open(args.zip, 'wb') as f:
+                f.write(service.build_zip([h['id'] for h in result['histories']]))
+            print(f"Wrote {args.zip}")
+
+        if args.publish and result['histories']:
+            # A full run also removes DAG files of deleted mappings
+            full_run = mapping_ids is None and not args.source and not args.target
+            published = DagPublishService().publish(None if full_run else [h['mapping_id'] for h in result['histories']])
+            print(f"Published to {published['dags_dir']}: {len(published['written'])} written, "
+                  f"{published['unchanged']} unchanged, {len(published['removed'])} removed.")
+    return 1 if result['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,9 @@
 from app import app, db
-from models import EtlMetadata, EtlMapping, EtlTemplate, EtlDagHistory, EtlConnection
+from models import EtlMetadata, EtlMapping, EtlTemplate, EtlDagHistory, EtlConnection, EtlCatalogCache, EtlWatermark, EtlTypeMap, EtlColumnMapping
+from services.lineage_service import LineageService
 with app.app_context():
     db.create_all()
     print("Database tables created.")
+    # Backfill the column-level lineage rows for mappings saved before tb_etl_map_col existed
+    if not EtlColumnMapping.query.first():
+        print(f"Indexed {LineageService().rebuild()} column mapping(s).")
@@ -4,22 +4,52 @@ from datetime import datetime
 class EtlMetadata(db.Model):
     __tablename__ = 'tb_etl_meta_mst'
     id = db.Column(db.Integer, primary_key=True)
-    table_name = db.Column(db.String(100), nullable=False)
+    table_name = db.Column(db.String(100), nullable=False, index=True)
     db_type = db.Column(db.String(20), nullable=False) # ORACLE, POSTGRES
     schema_info = db.Column(db.Text, nullable=True) # JSON or Text representation of columns
+    ddl_options = db.Column(db.Text, nullable=True) # JSON: unlogged, storage, partition, indexes, defer_indexes
     etl_cry_dtm = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Case-insensitive prefix search on table names (MappingService._name_filter)
+    __table_args__ = (db.Index('ix_tb_etl_meta_mst_table_name_upper', db.func.upper(table_name)),)
+
 class EtlMapping(db.Model):
     __tablename__ = 'tb_etl_map_def'
     id = db.Column(db.Integer, primary_key=True)
-    source_table_id = db.Column(db.Integer, db.ForeignKey('tb_etl_meta_mst.id'))
-    target_table_id = db.Column(db.Integer, db.ForeignKey('tb_etl_meta_mst.id'))
+    source_table_id = db.Column(db.Integer, db.ForeignKey('tb_etl_meta_mst.id'), index=True)
+    target_table_id = db.Column(db.Integer, db.ForeignKey('tb_etl_meta_mst.id'), index=True)
     mapping_json = db.Column(db.Text, nullable=False) # JSON storing column mappings and rules
+    column_count = db.Column(db.Integer, nullable=True) # mapped columns, stored at save time for the list
     etl_cry_dtm = db.Column(db.DateTime, default=datetime.utcnow)
 
     source_table = db.relationship('EtlMetadata', foreign_keys=[source_table_id])
     target_table = db.relationship('EtlMetadata', foreign_keys=[target_table_id])
 
+class EtlWatermark(db.Model):
+    __tablename__ = 'tb_etl_map_wmk'
+    id = db.Column(db.Integer, primary_key=True)
+    mapping_id = db.Column(db.Integer, db.ForeignKey('tb_etl_map_def.id'), nullable=False, unique=True)
+    watermark_column = db.Column(db.String(128), nullable=False)
+    last_value = db.Column(db.String(100), nullable=True) # High-water mark as text
+    value_type = db.Column(db.String(20), nullable=True) # datetime, date, number, string
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class EtlColumnMapping(db.Model):
+    # One row per mapped column, rebuilt from EtlMapping.mapping_json on every save (lineage lookups)
+    __tablename__ = 'tb_etl_map_col'
+    id = db.Column(db.Integer, primary_key=True)
+    mapping_id = db.Column(db.Integer, db.ForeignKey('tb_etl_map_def.id'), nullable=False, index=True)
+    seq = db.Column(db.Integer, nullable=False) # position in mapping_json
+    source_table = db.Column(db.String(100), nullable=False)
+    source_column = db.Column(db.String(128), nullable=True) # NULL for CUSTOM expressions without a known column
+    target_table = db.Column(db.String(100), nullable=False)
+    target_column = db.Column(db.String(128), nullable=False)
+    rule_type = db.Column(db.String(20), nullable=False)
+    __table_args__ = (
+        db.Index('ix_tb_etl_map_col_source', 'source_table', 'source_column'),
+        db.Index('ix_tb_etl_map_col_target', 'target_table', 'target_column'),
+    )
+
 class EtlTemplate(db.Model):
     __tablename__ = 'tb_etl_tmpl_mst'
     id = db.Column(db.Integer, primary_key=True)
@@ -39,11 +69,36 @@ class EtlConnection(db.Model):
     password = db.Column(db.String(100), nullable=False) # Plain text for demo
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class EtlCatalogCache(db.Model):
+    __tablename__ = 'tb_etl_meta_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    connection_id = db.Column(db.Integer, db.ForeignKey('etl_connection.id'), nullable=False, index=True)
+    table_name = db.Column(db.String(128), nullable=False)
+    table_comment = db.Column(db.Text, nullable=True)
+    schema_info = db.Column(db.Text, nullable=True) # JSON list of columns (same format as EtlMetadata.schema_info)
+    ddl_marker = db.Column(db.String(64), nullable=True) # last_ddl_time (Oracle) or catalog xmin hash (Postgres)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+    num_rows = db.Column(db.BigInteger, nullable=True) # optimizer estimate (num_rows / reltuples)
+    avg_row_len = db.Column(db.Integer, nullable=True) # bytes
+    size_bytes = db.Column(db.BigInteger, nullable=True) # segments (Oracle) / pg_total_relation_size
+    stats_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.UniqueConstraint('connection_id', 'table_name'),)
+
+class EtlTypeMap(db.Model):
+    __tablename__ = 'tb_etl_type_map'
+    id = db.Column(db.Integer, primary_key=True)
+    source_type = db.Column(db.String(50), nullable=False, unique=True) # NUMBER, NUMBER(1), VARCHAR2(1), DATE ...
+    target_type = db.Column(db.String(100), nullable=False) # may use {precision}, {scale}, {length}
+    etl_cry_dtm = db.Column(db.DateTime, default=datetime.utcnow)
+
 class EtlDagHistory(db.Model):
     __tablename__ = 'tb_etl_dag_hist'
     id = db.Column(db.Integer, primary_key=True)
     dag_id = db.Column(db.String(100), nullable=False)
-    mapping_id = db.Column(db.Integer, db.ForeignKey('tb_etl_map_def.id'))
+    mapping_id = db.Column(db.Integer, db.ForeignKey('tb_etl_map_def.id'), index=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('tb_etl_tmpl_mst.id'), nullable=True)
+    input_hash = db.Column(db.String(64), nullable=True) # SHA-256 of template, mapping, schemas and context
     generated_code = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
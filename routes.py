@@ -1,9 +1,12 @@
 from app import app, db
+import io
 import json
-from flask import render_template, request, jsonify, redirect, url_for, flash
+from datetime import datetime
+from flask import render_template, request, jsonify, redirect, url_for, flash, send_file
 from models import EtlMetadata, EtlMapping, EtlTemplate, EtlDagHistory, EtlConnection
 
 from services.metadata_service import MetadataService
+from services.schema_diff_service import SchemaDiffService
 
 @app.route('/')
 def index():
@@ -16,30 +19,27 @@ def metadata():
         action = request.form.get('action')
         if action == 'create_target':
             source_table = request.form.get('source_table')
-            # In a real app, we'd fetch the specific source columns again or pass them hidden
-            # For this demo, we'll just re-fetch from the mock service
-            sources = service.get_source_tables()
-            source_data = next((t for t in sources if t['table_name'] == source_table), None)
+            try:
+                options = service.parse_ddl_options(request.form)
+            except ValueError as e:
+                flash(f"Invalid DDL options for {source_table}: {e}", 'danger')
+                return redirect(url_for('metadata'))
+            source_data = service.get_table('SOURCE', source_table)
             if source_data:
-                service.create_target_from_source(source_table, source_data['columns'])
+                service.create_target_from_source(source_table, source_data['columns'], options)
         elif action == 'generate_ddl':
             source_table = request.form.get('source_table')
-            sources = service.get_source_tables()
-            source_data = next((t for t in sources if t['table_name'] == source_table), None)
+            source_data = service.get_table('SOURCE', source_table)
             if source_data:
                 # Convert to target columns first (to map types)
-                target_columns = []
-                for col in source_data['columns']:
-                    pg_type = service._map_oracle_to_postgres(col['type'])
-                    target_columns.append({
-                        "name": col['name'].upper(),
-                        "type": pg_type,
-                        "pk": col['pk'],
-                        "nullable": col['nullable'],
-                        "comment": col.get('comment')
-                    })
+                target_columns = service.to_target_columns(source_data['columns'])
+                try:
+                    options = service.parse_ddl_options(request.form)
+                    options = service.resolve_ddl_options(options, [source_table]).get(source_table)
+                except ValueError as e:
+                    return jsonify({"status": "error", "message": str(e)})
                 
-                ddl = service.generate_target_ddl(source_table, target_columns)
+                ddl = service.generate_target_ddl(source_table, target_columns, options)
                 return jsonify({"status": "success", "ddl": ddl})
             return jsonify({"status": "error", "message": "Source table not found"})
         elif action == 'generate_drop_ddl':
@@ -52,44 +52,40 @@ def metadata():
             target_table = request.form.get('target_table').strip()
             print(f"DEBUG: Deleting target table: '{target_table}'")
             service.delete_target_table(target_table)
+        elif action == 'apply_diff':
+            # Bring an existing target up to date with ALTER TABLE instead of recreating it
+            source_table = request.form.get('source_table')
+            try:
+                result = SchemaDiffService(service).apply_diff(source_table)
+                flash(f"{result['table_name']}: {result['mode']} ({len(result['statements'])} statement(s))", 'success')
+            except Exception as e:
+                flash(f"Failed to sync {source_table}: {e}", 'danger')
+        elif action == 'create_samples':
+            # Create sample tables (Source Oracle) on request only
+            service.create_sample_tables()
         
         return redirect(url_for('metadata'))
                 
         return redirect(url_for('metadata'))
                 
-    # Create sample tables if needed (Source Oracle)
-    service.create_sample_tables()
-    
-    source_tables = service.get_source_tables()
-    # Use real target tables from DB, or keep using metadata?
-    # User asked: "target DB from table search" -> implies real tables from Target DB.
-    # But the UI expects "target_tables" to be the ones we manage/delete.
-    # Actually, "Target Table" list in UI usually shows what we have defined/mapped.
-    # But user said: "search table in target DB".
-    # Let's show real tables from Target DB in the list, but maybe we need to distinguish 
-    # between "managed targets" and "all targets".
-    # For now, let's show ALL tables from Target DB as requested.
-    target_tables = service.get_real_target_tables()
-    
-    # Check if source tables exist in target
-    target_table_names = {t['table_name'] for t in target_tables}
-    for st in source_tables:
-        st['exists_in_target'] = st['table_name'] in target_table_names
+    # Sync both catalogs in parallel; a slow or unreachable side only degrades its own list.
+    # Table lists are then paged in by the page itself (/api/metadata/<role>/tables)
+    catalog_errors = service.sync_catalogs(['SOURCE', 'TARGET'], timeout=app.config['METADATA_FETCH_TIMEOUT'])
     
     source_conn_name = service.get_active_connection_name('SOURCE')
     target_conn_name = service.get_active_connection_name('TARGET')
 
     return render_template('metadata.html', 
-                         source_tables=source_tables, 
-                         target_tables=target_tables,
                          source_conn_name=source_conn_name,
-                         target_conn_name=target_conn_name)
+                         target_conn_name=target_conn_name,
+                         catalog_errors=catalog_errors)
 
 from services.mapping_service import MappingService
+from services.mapping_io_service import MappingIOService
+from services.auto_map_service import AutoMapService
 
 @app.route('/mapping', methods=['GET', 'POST'])
 def mapping():
-    meta_service = MetadataService()
     map_service = MappingService()
     
     if request.method == 'POST':
@@ -105,28 +101,84 @@ def mapping():
             "type": mapping_type,
             "mappings": mappings
         }
+        # Load options (parallel degree, split method, ...)
+        if data.get('options'):
+            mapping_data['options'] = data['options']
         
         map_service.save_mapping(source_id, target_id, mapping_data, mapping_id)
         return jsonify({"status": "success"})
 
-    # Fetch available source and target tables for the dropdowns
-    # In a real scenario, we'd fetch IDs. For now, we'll pass the full objects.
-    # We need to make sure we have IDs for source tables too, but our mock service returns dicts.
-    # Let's assume for this demo that we select by Name.
-    
-    sources = meta_service.get_source_tables()
-    targets = meta_service.get_real_target_tables()
-    
-    return render_template('mapping.html', sources=sources, targets=targets)
+    # Source and target tables are searched and loaded on demand by the page
+    return render_template('mapping.html')
 
 @app.route('/mappings')
 def mapping_list():
     source_filter = request.args.get('source')
     target_filter = request.args.get('target')
+    after = request.args.get('after', type=int)
+    limit = min(request.args.get('limit', 50, type=int), 500)
     
     map_service = MappingService()
-    mappings = map_service.get_mappings_with_names(source_filter, target_filter)
-    return render_template('mapping_list.html', mappings=mappings, source_filter=source_filter, target_filter=target_filter)
+    mappings, next_after = map_service.get_mappings_with_names(source_filter, target_filter, after, limit)
+    return render_template('mapping_list.html', mappings=mappings, source_filter=source_filter, target_filter=target_filter,
+                           after=after, next_after=next_after)
+
+@app.route('/api/mappings/export')
+def export_mappings():
+    # ?format=json|csv|xlsx&ids=1,2,3 (all mappings when ids is omitted)
+    fmt = request.args.get('format', 'json').lower()
+    ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip().isdigit()]
+    try:
+        content = MappingIOService().export_mappings(fmt, ids or None)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    mimetypes = {
+        'json': 'application/json',
+        'csv': 'text/csv',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    }
+    filename = f"mappings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return send_file(io.BytesIO(content), mimetype=mimetypes[fmt], as_attachment=True, download_name=filename)
+
+@app.route('/api/mappings/import', methods=['POST'])
+def import_mappings():
+    # multipart upload "file"; the format comes from the extension unless ?format= is given
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({"status": "error", "message": "No file uploaded"}), 400
+    fmt = request.form.get('format') or request.args.get('format') or upload.filename.rsplit('.', 1)[-1]
+    dry_run = (request.form.get('dry_run') or request.args.get('dry_run')) in ('1', 'true')
+    try:
+        result = MappingIOService().import_mappings(upload.read(), fmt, dry_run=dry_run)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(dict(result, status="success"))
+
+@app.route('/api/mappings/auto', methods=['POST'])
+def auto_map_columns():
+    # {"source_table", "target_table"} proposes one pair; {"pairs": [[s, t], ...]} or {"all": true}
+    # runs a batch (all = every source table with a same-named target). save=true stores the batch.
+    data = request.json or {}
+    min_confidence = float(data.get('min_confidence', 0.6))
+    service = AutoMapService()
+    try:
+        if data.get('source_table') and data.get('target_table'):
+            result = service.auto_map(data['source_table'], data['target_table'], min_confidence)
+            return jsonify({"status": "success", "result": result})
+
+        pairs = None if data.get('all') else [tuple(p) for p in data.get('pairs') or []]
+        if pairs == []:
+            return jsonify({"status": "error", "message": "No table pairs given"}), 400
+        results, errors = service.auto_map_batch(pairs, min_confidence)
+        saved = None
+        if data.get('save'):
+            saved = service.save_results(results, overwrite=bool(data.get('overwrite')))
+            # The column proposals are in the saved mappings; keep the response small
+            results = [{k: r[k] for k in ('source_table', 'target_table', 'matched', 'confidence')} for r in results]
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "results": results, "errors": errors, "saved": saved})
 
 @app.route('/mappings/delete/<int:id>', methods=['POST'])
 def delete_mapping(id):
@@ -144,18 +196,19 @@ def get_mapping_details(id):
     
     mapping = map_service.get_mapping(id)
     if mapping:
-        # Fetch live metadata to get column details
-        # Note: This might be slow if there are many tables. 
-        # In a production app, we should fetch only specific table metadata.
-        source_tables = meta_service.get_source_tables()
-        target_tables = meta_service.get_real_target_tables()
-        
-        source_info = next((t for t in source_tables if t['table_name'] == mapping.source_table.table_name), None)
-        target_info = next((t for t in target_tables if t['table_name'] == mapping.target_table.table_name), None)
+        # Fetch live metadata for just the two tables involved
+        source_info = meta_service.get_table('SOURCE', mapping.source_table.table_name)
+        target_info = meta_service.get_table('TARGET', mapping.target_table.table_name)
         
         # Normalize column data
         source_cols = source_info['columns'] if source_info else []
-        target_cols = target_info['schema_info'] if target_info else [] # get_real_target_tables uses schema_info
+        target_cols = target_info['columns'] if target_info else []
+        
+        # Source-side SELECT the rules compile to (cached until the mapping changes)
+        from services.pushdown_service import PushdownService
+        source_conn = meta_service._get_connection_by_role('SOURCE')
+        compiled = PushdownService().compile_for_connection(
+            mapping, source_conn.type if source_conn else None, source_cols, target_cols)
         
         return jsonify({
             "status": "success",
@@ -165,10 +218,118 @@ def get_mapping_details(id):
             "source_table_name": mapping.source_table.table_name,
             "target_table_name": mapping.target_table.table_name,
             "source_columns": source_cols,
-            "target_columns": target_cols
+            "target_columns": target_cols,
+            "compiled_sql": compiled['sql']
         })
     return jsonify({"status": "error", "message": "Mapping not found"}), 404
 
+@app.route('/api/mappings/<int:id>/run', methods=['POST'])
+def run_mapping(id):
+    from services.transfer_service import TransferService, PartialTransferError
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        stats = TransferService().run_mapping(
+            id,
+            batch_size=int(data.get('batch_size', 10000)),
+            arraysize=int(data['arraysize']) if data.get('arraysize') else None,
+            full_reload=bool(data.get('full_reload'))
+        )
+        return jsonify({"status": "success", "stats": stats})
+    except PartialTransferError as e:
+        return jsonify({"status": "partial", "message": str(e), "stats": e.stats}), 500
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route('/api/metadata/<role>/tables')
+def list_table_metadata(role):
+    role = role.upper()
+    if role not in ('SOURCE', 'TARGET'):
+        return jsonify({"status": "error", "message": f"Unknown role: {role}"}), 400
+    
+    search = request.args.get('q', '').strip()
+    after = request.args.get('after')
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    refresh = request.args.get('refresh', '1') != '0'
+    
+    meta_service = MetadataService()
+    tables, next_after = meta_service.list_tables(role, search, after, limit, refresh)
+    return jsonify({"status": "success", "tables": tables, "next_after": next_after})
+
+@app.route('/api/metadata/<role>/tables/<table_name>')
+def get_table_metadata(role, table_name):
+    role = role.upper()
+    if role not in ('SOURCE', 'TARGET'):
+        return jsonify({"status": "error", "message": f"Unknown role: {role}"}), 400
+    
+    meta_service = MetadataService()
+    table = meta_service.get_table(role, table_name)
+    if table:
+        return jsonify({"status": "success", "table": table})
+    return jsonify({"status": "error", "message": "Table not found"}), 404
+
+@app.route('/api/metadata/diff/<table_name>')
+def diff_target_table(table_name):
+    try:
+        diff = SchemaDiffService().diff_table(table_name)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "diff": diff})
+
+@app.route('/api/metadata/diff/<table_name>/apply', methods=['POST'])
+def apply_target_diff(table_name):
+    # recreate=true drops and recreates the table instead of altering it
+    data = request.json or {}
+    try:
+        result = SchemaDiffService().apply_diff(table_name, recreate=bool(data.get('recreate')))
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "result": result})
+
+@app.route('/api/metadata/provision', methods=['POST'])
+def provision_targets():
+    # Bulk create target tables from a list of source tables or a name pattern (EMP_*, TB_*)
+    data = request.json or {}
+    meta_service = MetadataService()
+    try:
+        results = meta_service.provision_targets(
+            tables=data.get('tables'),
+            pattern=data.get('pattern'),
+            batch_size=max(1, int(data.get('batch_size', 200))),
+            parallel=int(data.get('parallel', 1)),
+            ddl_options=data.get('ddl_options')
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    summary = {}
+    for r in results:
+        summary[r['status']] = summary.get(r['status'], 0) + 1
+    return jsonify({"status": "success", "summary": summary, "results": results})
+
+from services.lineage_service import LineageService
+
+@app.route('/api/lineage/<table_name>')
+def column_lineage(table_name):
+    # direction=downstream: what reads table/column (impact); upstream: what feeds it
+    direction = request.args.get('direction', 'downstream').lower()
+    if direction not in ('downstream', 'upstream'):
+        return jsonify({"status": "error", "message": f"Unknown direction: {direction}"}), 400
+    column = request.args.get('column')
+    depth = request.args.get('depth', 1, type=int)
+
+    service = LineageService()
+    if direction == 'downstream':
+        edges = service.get_downstream(table_name, column, depth)
+    else:
+        edges = service.get_upstream(table_name, column, depth)
+    return jsonify({"status": "success", "direction": direction, "edges": edges})
+
+@app.route('/api/lineage/rebuild', methods=['POST'])
+def rebuild_lineage():
+    count = LineageService().rebuild()
+    return jsonify({"status": "success", "rows": count})
+
 from services.template_service import TemplateService
 
 @app.route('/templates', methods=['GET', 'POST'])
@@ -184,6 +345,7 @@ def templates():
     return render_template('templates.html', templates=templates)
 
 from services.dag_service import DagService
+from services.dag_publish_service import DagPublishService
 from services.mapping_service import MappingService
 from services.template_service import TemplateService
 
@@ -206,6 +368,55 @@ def history():
     
     return render_template('history.html', history=history, mappings=mappings, templates=templates)
 
+@app.route('/api/dags/generate', methods=['POST'])
+def generate_dags():
+    # {"template_id", "mapping_ids": [...] | "source"/"target" name filters | neither for all,
+    #  "workers": N, "download": true for a zip of the rendered files}
+    data = request.json or {}
+    if not data.get('template_id'):
+        return jsonify({"status": "error", "message": "template_id is required"}), 400
+    workers = int(data['workers']) if data.get('workers') is not None else None
+    try:
+        result = DagService().generate_dags(data['template_id'], data.get('mapping_ids'), data.get('source'),
+                                            data.get('target'), workers)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    if data.get('download'):
+        content = DagService().build_zip([h['id'] for h in result['histories']])
+        filename = f"dags_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        return send_file(io.BytesIO(content), mimetype='application/zip', as_attachment=True, download_name=filename)
+    return jsonify(dict(result, status="success"))
+
+@app.route('/api/dags/rebuild', methods=['POST'])
+def rebuild_stale_dags():
+    # Re-render only DAGs whose inputs changed: {"template_id"?, "mapping_ids"?, "workers"?, "dry_run"?}
+    data = request.json or {}
+    workers = int(data['workers']) if data.get('workers') is not None else None
+    result = DagService().rebuild_stale(data.get('template_id'), data.get('mapping_ids'), workers,
+                                        dry_run=bool(data.get('dry_run')))
+    return jsonify(dict(result, status="success"))
+
+@app.route('/api/dags/publish', methods=['POST'])
+def publish_dags():
+    # {"mapping_ids": [...]} publishes only those (no orphan cleanup); {"dry_run": true} only reports
+    data = request.json or {}
+    try:
+        result = DagPublishService().publish(data.get('mapping_ids'), dry_run=bool(data.get('dry_run')))
+    except (ValueError, OSError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(dict(result, status="success"))
+
+@app.route('/api/dags/download')
+def download_dags():
+    # ?ids=1,2,3 (tb_etl_dag_hist ids)
+    ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip().isdigit()]
+    if not ids:
+        return jsonify({"status": "error", "message": "No history ids given"}), 400
+    content = DagService().build_zip(ids)
+    filename = f"dags_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return send_file(io.BytesIO(content), mimetype='application/zip', as_attachment=True, download_name=filename)
+
 @app.route('/dag/<code>/<id>')
 def view_dag_code(id):
     dag_service = DagService()
@@ -260,6 +471,7 @@ def connections():
                 conn = EtlConnection.query.get(data['id'])
                 if conn:
                     test_data = {
+                        'id': conn.id,
                         'type': conn.type,
                         'host': conn.host,
                         'port': conn.port,
@@ -283,6 +495,7 @@ def connections():
 
 from config_manager import ConfigManager
 from services.user_service import UserService
+from services.type_map_service import TypeMapService
 
 @app.route('/settings', methods=['GET', 'POST'])
 def settings():
@@ -357,6 +570,20 @@ def settings():
             if user_service.delete_user(user_id):
                 flash('User deleted.', 'warning')
 
+        # Type Mapping Overrides (Oracle -> Postgres)
+        elif action == 'save_type_map':
+            source_type = request.form.get('source_type', '').strip()
+            target_type = request.form.get('target_type', '').strip()
+            if source_type and target_type:
+                TypeMapService().save(source_type, target_type)
+                flash(f'Type mapping for {source_type.upper()} saved.', 'success')
+            else:
+                flash('Source and target types are required.', 'danger')
+
+        elif action == 'delete_type_map':
+            if TypeMapService().delete(request.form.get('type_map_id', type=int)):
+                flash('Type mapping deleted.', 'warning')
+
         return redirect(url_for('settings'))
 
     # GET request
@@ -367,6 +594,7 @@ def settings():
     user_service = UserService()
     users = user_service.get_all_users()
     active_user = user_service.get_active_user()
+    type_maps = TypeMapService().get_all()
     
     # We need to know which profile is "selected" for viewing/editing.
     # Default to active profile if not specified via query param.
@@ -382,16 +610,18 @@ def settings():
                          selected_profile_name=selected_profile_name,
                          config=selected_config,
                          users=users,
-                         active_user=active_user)
+                         active_user=active_user,
+                         type_maps=type_maps)
 
 @app.route('/settings/test', methods=['POST'])
 def test_settings_connection():
     data = request.json
     uri = ConfigManager.get_db_uri(data)
     
-    from sqlalchemy import create_engine, text
+    from sqlalchemy import text
+    from services.engine_registry import EngineRegistry
     try:
-        engine = create_engine(uri)
+        engine = EngineRegistry.get_engine_for_uri(uri)
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
         return jsonify({"success": True, "message": "Connection successful!"})
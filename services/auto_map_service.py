@@ -0,0 +1,212 @@
+import json
+import re
+from functools import lru_cache
+from models import db, EtlMapping, EtlMetadata
+from sqlalchemy.orm import aliased
+from services.metadata_service import MetadataService
+from services.pushdown_service import type_family
+
+# Common abbreviations in column naming standards, folded to one token before comparing
+SYNONYMS = {
+    'NO': 'NUM', 'NBR': 'NUM', 'NUMBER': 'NUM',
+    'NM': 'NAME', 'NAM': 'NAME',
+    'CD': 'CODE',
+    'DT': 'DATE', 'YMD': 'DATE', 'YMDT': 'DATE',
+    'DTM': 'DATETIME', 'DTTM': 'DATETIME', 'TS': 'DATETIME', 'TIMESTAMP': 'DATETIME',
+    'AMT': 'AMOUNT', 'QTY': 'QUANTITY', 'CNT': 'COUNT',
+    'DESC': 'DESCRIPTION', 'DSC': 'DESCRIPTION',
+    'YN': 'FLAG', 'FLG': 'FLAG',
+    'ADDR': 'ADDRESS', 'TEL': 'PHONE', 'TELNO': 'PHONE',
+    'EMP': 'EMPLOYEE', 'DEPT': 'DEPARTMENT', 'CUST': 'CUSTOMER', 'MGR': 'MANAGER',
+    'SAL': 'SALARY', 'REG': 'REGISTER', 'CRY': 'CREATE', 'CRT': 'CREATE',
+    'UPD': 'UPDATE', 'MOD': 'UPDATE', 'CHG': 'UPDATE'
+}
+
+# (match kind, base confidence); the best candidate per target column wins
+SCORES = {'exact': 1.0, 'normalized': 0.9, 'comment': 0.85, 'tokens': 0.5}
+
+NAME_SEPARATORS = re.compile(r'[^A-Za-z0-9]+')
+COMMENT_SEPARATORS = re.compile(r'[\W_]+')
+
+@lru_cache(maxsize=65536)
+def name_keys(name):
+    # Column names repeat across thousands of tables under a naming standard; split each once
+    parts = tuple(SYNONYMS.get(p, p) for p in NAME_SEPARATORS.split(name.upper()) if p)
+    return name.upper(), ''.join(parts), parts
+
+@lru_cache(maxsize=65536)
+def comment_keys(comment):
+    # Case, spaces and punctuation don't matter ("Employee No." == "employee no", "사원 번호" == "사원번호")
+    words = [w.upper() for w in COMMENT_SEPARATORS.split(comment) if w]
+    return ''.join(words).lower(), tuple(SYNONYMS.get(w, w) for w in words)
+
+class AutoMapService:
+    """
+    Proposes column mappings for table pairs.
+    Source columns of a table are indexed by exact name, normalized name (abbreviations folded,
+    separators removed), normalized comment and name/comment tokens, so each target column
+    only looks at the candidates sharing a key instead of every source column. Candidates are
+    adjusted for type family and PK flag and assigned one-to-one, best confidence first.
+    """
+    def __init__(self, meta_service=None):
+        self.meta_service = meta_service or MetadataService()
+
+    def auto_map(self, source_table, target_table, min_confidence=0.6):
+        source = self.meta_service.get_table('SOURCE', source_table)
+        if not source:
+            raise ValueError(f"Source table {source_table} not found")
+        target = self.meta_service.get_table('TARGET', target_table)
+        if not target:
+            raise ValueError(f"Target table {target_table} not found")
+        return self.match_tables(source, target, min_confidence)
+
+    def auto_map_batch(self, pairs=None, min_confidence=0.6):
+        # pairs: [(source, target)]; None pairs every source table with the same-named target table
+        sources = self.meta_service.get_tables('SOURCE', None if pairs is None else [p[0] for p in pairs])
+        targets = self.meta_service.get_tables('TARGET', None if pairs is None else [p[1] for p in pairs])
+        if pairs is None:
+            targets_by_name = {name.upper(): name for name in targets}
+            pairs = [(name, targets_by_name[name.upper()]) for name in sorted(sources) if name.upper() in targets_by_name]
+
+        results, errors = [], []
+        for source_name, target_name in pairs:
+            if source_name not in sources:
+                errors.append({"source_table": source_name, "target_table": target_name,
+                               "message": f"Source table {source_name} not found"})
+            elif target_name not in targets:
+                errors.append({"source_table": source_name, "target_table": target_name,
+                               "message": f"Target table {target_name} not found"})
+            else:
+                results.append(self.match_tables(sources[source_name], targets[target_name], min_confidence))
+        return results, errors
+
+    def match_tables(self, source, target, min_confidence=0.6):
+        index = self._build_index(source['columns'])
+        candidates = []
+        for t_pos, t_col in enumerate(target['columns']):
+            t_keys = self._column_keys(t_col)
+            for s_pos, kind in self._candidates(index, t_keys).items():
+                base = SCORES[kind] if kind != 'tokens' else self._token_score(index['token_sets'][s_pos], t_keys[3])
+                confidence = self._adjust(base, index['columns'][s_pos], t_col)
+                if confidence >= min_confidence:
+                    candidates.append((confidence, t_pos, s_pos, kind))
+
+        # Greedy one-to-one assignment, best confidence first (ties keep column order)
+        candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+        assigned, used_sources = {}, set()
+        for confidence, t_pos, s_pos, kind in candidates:
+            if t_pos in assigned or s_pos in used_sources:
+                continue
+            assigned[t_pos] = (confidence, s_pos, kind)
+            used_sources.add(s_pos)
+
+        mappings = []
+        for t_pos, t_col in enumerate(target['columns']):
+            confidence, s_pos, kind = assigned.get(t_pos, (0.0, None, None))
+            mappings.append({
+                "source_column": index['columns'][s_pos]['name'] if s_pos is not None else '',
+                "target_column": t_col['name'],
+                "rule_type": "DIRECT",
+                "rule_detail": "",
+                "remarks": "",
+                "confidence": round(confidence, 2),
+                "match": kind
+            })
+        matched = [m for m in mappings if m['source_column']]
+        return {
+            "source_table": source['table_name'],
+            "target_table": target['table_name'],
+            "mappings": mappings,
+            "matched": len(matched),
+            "confidence": round(sum(m['confidence'] for m in mappings) / len(mappings), 2) if mappings else 0.0
+        }
+
+    def save_results(self, results, overwrite=False):
+        # Store proposals as mappings via the bulk import path, which also registers tables
+        # that have no tb_etl_meta_mst row yet (from the catalog, in the same transaction).
+        # Existing mappings are left alone unless overwrite is set.
+        from services.mapping_io_service import MappingIOService
+
+        if not overwrite:
+            existing = self._existing_pairs([(r['source_table'], r['target_table']) for r in results])
+            results = [r for r in results if (r['source_table'].upper(), r['target_table'].upper()) not in existing]
+        if not results:
+            return {"created": 0, "updated": 0, "errors": [], "dry_run": False}
+
+        records = [{
+            "source_table": r['source_table'],
+            "target_table": r['target_table'],
+            "type": "1:1",
+            "mappings": [{k: v for k, v in m.items() if k not in ('confidence', 'match')} for m in r['mappings']]
+        } for r in results]
+        return MappingIOService().import_mappings(json.dumps(records), 'json')
+
+    def _build_index(self, columns):
+        index = {"columns": columns, "exact": {}, "normalized": {}, "comment": {}, "tokens": {}, "token_sets": []}
+        for pos, col in enumerate(columns):
+            name, normalized, comment_key, tokens = self._column_keys(col)
+            index['exact'].setdefault(name, pos)
+            index['normalized'].setdefault(normalized, pos)
+            if comment_key:
+                index['comment'].setdefault(comment_key, pos)
+            index['token_sets'].append(tokens)
+            for token in tokens:
+                index['tokens'].setdefault(token, []).append(pos)
+        return index
+
+    def _candidates(self, index, t_keys):
+        # {source position: best match kind}
+        found = {}
+        name, normalized, comment_key, t_tokens = t_keys
+        if name in index['exact']:
+            found[index['exact'][name]] = 'exact'
+        pos = index['normalized'].get(normalized)
+        if pos is not None:
+            found.setdefault(pos, 'normalized')
+        if comment_key and comment_key in index['comment']:
+            found.setdefault(index['comment'][comment_key], 'comment')
+        if found:
+            return found
+        # Token overlap only as a fallback; tokens most columns share (prefixes like COL_) carry no signal
+        common = max(3, len(index['columns']) // 5)
+        for token in t_tokens:
+            positions = index['tokens'].get(token, ())
+            if len(positions) <= common:
+                for pos in positions:
+                    found.setdefault(pos, 'tokens')
+        return found
+
+    def _token_score(self, source_tokens, target_tokens):
+        # Name/comment token overlap (Jaccard); 0.5..0.8, nothing below half overlap
+        union = source_tokens | target_tokens
+        overlap = len(source_tokens & target_tokens) / len(union) if union else 0
+        return SCORES['tokens'] + 0.3 * overlap if overlap >= 0.5 else 0.0
+
+    def _adjust(self, confidence, s_col, t_col):
+        s_family, t_family = type_family(s_col.get('type')), type_family(t_col.get('type'))
+        if s_family and t_family:
+            confidence += 0.05 if s_family == t_family else -0.2
+        if bool(s_col.get('pk')) == bool(t_col.get('pk')):
+            confidence += 0.05 if t_col.get('pk') else 0
+        else:
+            confidence -= 0.1
+        return max(0.0, min(1.0, confidence))
+
+    def _column_keys(self, col):
+        # (exact name, normalized name, normalized comment, name/comment tokens)
+        name, normalized, parts = name_keys(col['name'])
+        comment_key, words = comment_keys(col.get('comment') or '')
+        return name, normalized, comment_key, frozenset(parts + words)
+
+    def _existing_pairs(self, pairs):
+        source_names = sorted({p[0].upper() for p in pairs})
+        SourceMeta = aliased(EtlMetadata)
+        TargetMeta = aliased(EtlMetadata)
+        existing = set()
+        for i in range(0, len(source_names), 1000):
+            rows = db.session.query(SourceMeta.table_name, TargetMeta.table_name) \
+                .join(EtlMapping, EtlMapping.source_table_id == SourceMeta.id) \
+                .join(TargetMeta, EtlMapping.target_table_id == TargetMeta.id) \
+                .filter(SourceMeta.table_name.in_(source_names[i:i + 1000])).all()
+            existing.update((s.upper(), t.upper()) for s, t in rows)
+        return existing
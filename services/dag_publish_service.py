@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import tempfile
+from flask import current_app
+from sqlalchemy import func
+from models import db, EtlDagHistory, EtlMapping
+
+# Files this service owns in the dags folder; anything not listed here is never touched
+MANIFEST_NAME = '.etl_dags_manifest.json'
+
+class DagPublishService:
+    """
+    Writes the latest generated DAG of each mapping into the Airflow dags folder
+    (AIRFLOW_DAGS_DIR). Files are replaced with an atomic rename, files whose content
+    hash is unchanged are left alone (no mtime change, so the DAG processor does not
+    re-parse them), and files published earlier for DAGs that no longer exist are removed.
+    """
+    def __init__(self, dags_dir=None):
+        self.dags_dir = dags_dir or current_app.config.get('AIRFLOW_DAGS_DIR')
+
+    def publish(self, mapping_ids=None, dry_run=False):
+        # Orphans: on a full publish (mapping_ids is None) every previously published file not
+        # published now; otherwise only older files of the given mappings (renamed dag_id)
+        if not self.dags_dir:
+            raise ValueError("AIRFLOW_DAGS_DIR is not configured")
+        if not dry_run:
+            os.makedirs(self.dags_dir, exist_ok=True)
+
+        manifest = self._read_manifest()
+        previous = dict(manifest)
+        result = {"dags_dir": self.dags_dir, "written": [], "unchanged": 0, "removed": [], "dry_run": dry_run}
+        published = {}
+        for mapping_id, dag_id, code in self._latest_dags(mapping_ids):
+            filename = f"{dag_id}.py"
+            content = code.encode('utf-8')
+            digest = hashlib.sha256(content).hexdigest()
+            published[filename] = {"mapping_id": mapping_id, "sha256": digest}
+            if self._file_hash(filename) == digest:
+                result['unchanged'] += 1
+                continue
+            if not dry_run:
+                self._write_atomic(filename, content)
+            result['written'].append(filename)
+
+        if mapping_ids is None:
+            orphans = set(manifest) - set(published)
+        else:
+            selected = {int(i) for i in mapping_ids}
+            orphans = {f for f, entry in manifest.items() if entry.get('mapping_id') in selected and f not in published}
+        for filename in sorted(orphans):
+            if not dry_run and os.path.exists(os.path.join(self.dags_dir, filename)):
+                os.remove(os.path.join(self.dags_dir, filename))
+            manifest.pop(filename)
+            result['removed'].append(filename)
+        manifest.update(published)
+
+        if not dry_run:
+            if manifest != previous:
+                self._write_atomic(MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+            print(f"DEBUG: Published DAGs to {self.dags_dir}: {len(result['written'])} written, "
+                  f"{result['unchanged']} unchanged, {len(result['removed'])} removed.")
+        return result
+
+    def _latest_dags(self, mapping_ids):
+        # (mapping_id, dag_id, generated_code) of the newest history row per existing mapping;
+        # history outlives deleted mappings, whose files must become orphans
+        latest = db.session.query(func.max(EtlDagHistory.id)) \
+            .join(EtlMapping, EtlMapping.id == EtlDagHistory.mapping_id).group_by(EtlDagHistory.mapping_id)
+        if mapping_ids is not None:
+            latest = latest.filter(EtlDagHistory.mapping_id.in_([int(i) for i in mapping_ids]))
+        history_ids = sorted(i for (i,) in latest)
+        for i in range(0, len(history_ids), 1000):
+            rows = db.session.query(EtlDagHistory.mapping_id, EtlDagHistory.dag_id, EtlDagHistory.generated_code) \
+                .filter(EtlDagHistory.id.in_(history_ids[i:i + 1000])).order_by(EtlDagHistory.id)
+            for row in rows:
+                yield row
+
+    def _file_hash(self, filename):
+        # Hash of what is on disk, so hand edits in the dags folder are overwritten too
+        try:
+            with open(os.path.join(self.dags_dir, filename), 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def _write_atomic(self, filename, content):
+        # Write next to the target and rename over it: readers see the old or the new file, never a partial one
+        fd, tmp_path = tempfile.mkstemp(dir=self.dags_dir, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, os.path.join(self.dags_dir, filename))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.dags_dir, MANIFEST_NAME), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
@@ -1,7 +1,41 @@
-from models import db, EtlDagHistory, EtlMapping, EtlTemplate, EtlMetadata
-from jinja2 import Template
+from models import db, EtlDagHistory, EtlMapping, EtlTemplate, EtlMetadata, EtlConnection
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import io
 import json
+import os
+import zipfile
+from flask import current_app
+from jinja2 import ChoiceLoader, DictLoader, Environment, FileSystemLoader
+from sqlalchemy import func, insert
+from sqlalchemy.orm import aliased
+from services.mapping_service import MappingService
+from services.pushdown_service import PushdownService
+from services.template_registry import TemplateRegistry
+
+# Below this many DAGs, starting worker processes costs more than it saves
+PARALLEL_RENDER_THRESHOLD = 50
+RENDER_CHUNK_SIZE = 50
+
+_worker_template = None
+
+def _init_render_worker(sources, template_name, template_dir):
+    # Runs once per worker process: compile the template (and its includes) a single time
+    global _worker_template
+    loaders = [DictLoader(sources)]
+    if template_dir:
+        loaders.append(FileSystemLoader(template_dir))
+    _worker_template = Environment(loader=ChoiceLoader(loaders)).get_template(template_name)
+
+def _render_chunk(chunk):
+    results = []
+    for index, context in chunk:
+        try:
+            results.append((index, _worker_template.render(context), None))
+        except Exception as e:
+            results.append((index, None, str(e)))
+    return results
 
 class DagService:
     def get_history(self):
@@ -10,37 +44,317 @@ class DagService:
     def generate_dag(self, mapping_id, template_id):
         mapping = EtlMapping.query.get(mapping_id)
         template = EtlTemplate.query.get(template_id)
-        
+
         if not mapping or not template:
             raise ValueError("Invalid Mapping or Template ID")
 
         target_table = EtlMetadata.query.get(mapping.target_table_id)
         source_table = EtlMetadata.query.get(mapping.source_table_id)
-        
-        # Prepare context for Jinja2
-        context = {
-            "dag_id": f"etl_{source_table.table_name}_to_{target_table.table_name}_{datetime.now().strftime('%Y%m%d')}",
-            "source_table": source_table.table_name,
-            "target_table": target_table.table_name,
-            "mappings": json.loads(mapping.mapping_json),
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Render template
-        jinja_template = Template(template.template_content)
-        generated_code = jinja_template.render(context)
-        
+
+        mapping_data = json.loads(mapping.mapping_json)
+        options = (mapping_data.get('options') or {}) if isinstance(mapping_data, dict) else {}
+        watermark_column = options.get('watermark_column')
+        last_watermark = MappingService().get_watermark(mapping.id, watermark_column) if watermark_column else None
+
+        # Row count / size estimates let templates size their tasks (e.g. number of chunks)
+        from services.metadata_service import MetadataService
+        meta_service = MetadataService()
+        source_stats = meta_service.get_table_stats('SOURCE', source_table.table_name)
+        # Column types for the compiled source_sql come from the catalog, as in /api/mappings/<id>
+        source_info = meta_service.get_table('SOURCE', source_table.table_name)
+        target_info = meta_service.get_table('TARGET', target_table.table_name)
+
+        context = self._build_context(mapping, source_table, target_table, mapping_data, last_watermark,
+                                      source_stats, source_info['columns'] if source_info else [],
+                                      target_info['columns'] if target_info else [],
+                                      self._get_source_type(), meta_service)
+
+        # Render template (compiled once per template version, see TemplateRegistry)
+        generated_code = TemplateRegistry.get_template(template).render(context)
+
         # Save history
         history = EtlDagHistory(
             dag_id=context['dag_id'],
             mapping_id=mapping.id,
+            template_id=template.id,
+            input_hash=self._input_hash(TemplateRegistry.dependency_hash(template), mapping,
+                                        source_info['columns'] if source_info else [], target_table, context),
             generated_code=generated_code,
             created_at=datetime.utcnow()
         )
         db.session.add(history)
         db.session.commit()
-        
+
         return history
 
+    def generate_dags(self, template_id, mapping_ids=None, source_filter=None, target_filter=None, workers=None):
+        # Render one DAG per selected mapping (all mappings when no ids/filters are given).
+        # Metadata is preloaded with a few set-based queries, rendering runs in worker
+        # processes and the history rows go out in one batched insert.
+        # Returns {"histories": [{"id", "dag_id", "mapping_id"}], "errors": [{"mapping_id", "message"}]}
+        template = EtlTemplate.query.get(template_id)
+        if not template:
+            raise ValueError("Invalid Template ID")
+
+        rows = self._load_mappings(mapping_ids, source_filter, target_filter)
+        prepared, errors = self._prepare(template, rows)
+        histories, render_errors = self._render_and_store(template, prepared, workers)
+        return {"histories": histories, "errors": errors + render_errors}
+
+    def rebuild_stale(self, template_id=None, mapping_ids=None, workers=None, dry_run=False):
+        # Re-render only mappings whose last DAG was built from different inputs (template and
+        # its includes, mapping_json, source catalog columns, target definition, context). Each
+        # mapping is rebuilt with the template of its last DAG unless template_id is given.
+        latest = self._latest_history(mapping_ids)
+        result = {"stale": [], "fresh": 0, "histories": [], "errors": [], "skipped": [], "dry_run": dry_run}
+
+        by_template = {}
+        for mapping_id, (last_template_id, input_hash) in latest.items():
+            effective = template_id or last_template_id
+            if not effective:
+                result['skipped'].append({"mapping_id": mapping_id, "message": "Template of the last DAG is unknown"})
+                continue
+            by_template.setdefault(int(effective), []).append(mapping_id)
+
+        for t_id, ids in sorted(by_template.items()):
+            template = EtlTemplate.query.get(t_id)
+            if not template:
+                result['skipped'].extend({"mapping_id": i, "message": f"Template {t_id} no longer exists"} for i in ids)
+                continue
+            prepared, errors = self._prepare(template, self._load_mappings(ids, None, None))
+            result['errors'].extend(errors)
+
+            stale = []
+            for item in prepared:
+                last_template_id, last_hash = latest[item[0].id]
+                if last_template_id == template.id and last_hash == item[2]:
+                    result['fresh'] += 1
+                else:
+                    stale.append(item)
+            result['stale'].extend(mapping.id for mapping, _, _ in stale)
+            if stale and not dry_run:
+                histories, render_errors = self._render_and_store(template, stale, workers)
+                result['histories'].extend(histories)
+                result['errors'].extend(render_errors)
+
+        print(f"DEBUG: Rebuild: {len(result['stale'])} stale, {result['fresh']} fresh, "
+              f"{len(result['skipped'])} skipped DAG(s).")
+        return result
+
+    def _prepare(self, template, rows):
+        # [(mapping, context, input_hash)] plus errors, with watermarks and statistics preloaded
+        if not rows:
+            return [], []
+        from services.metadata_service import MetadataService
+        meta_service = MetadataService()
+        source_stats = meta_service.get_tables_stats('SOURCE', [s.table_name for _, s, _ in rows])
+        source_catalog = meta_service.get_tables('SOURCE', [s.table_name for _, s, _ in rows])
+        target_catalog = meta_service.get_tables('TARGET', [t.table_name for _, _, t in rows])
+        source_type = self._get_source_type()
+        template_hash = TemplateRegistry.dependency_hash(template)
+
+        parsed = []
+        watermark_columns = {}
+        for mapping, source_table, target_table in rows:
+            mapping_data = json.loads(mapping.mapping_json)
+            options = (mapping_data.get('options') or {}) if isinstance(mapping_data, dict) else {}
+            if options.get('watermark_column'):
+                watermark_columns[mapping.id] = options['watermark_column']
+            parsed.append(mapping_data)
+        watermarks = MappingService().get_watermarks(watermark_columns) if watermark_columns else {}
+
+        prepared, errors = [], []
+        for (mapping, source_table, target_table), mapping_data in zip(rows, parsed):
+            try:
+                source_info = source_catalog.get(source_table.table_name)
+                target_info = target_catalog.get(target_table.table_name)
+                context = self._build_context(
+                    mapping, source_table, target_table, mapping_data, watermarks.get(mapping.id),
+                    source_stats.get(source_table.table_name), source_info['columns'] if source_info else [],
+                    target_info['columns'] if target_info else [], source_type, meta_service)
+                prepared.append((mapping, context, self._input_hash(
+                    template_hash, mapping, source_info['columns'] if source_info else [], target_table, context)))
+            except Exception as e:
+                errors.append({"mapping_id": mapping.id, "message": str(e)})
+        return prepared, errors
+
+    def _render_and_store(self, template, prepared, workers):
+        rendered = self._render_all(template, [context for _, context, _ in prepared], workers)
+
+        now = datetime.utcnow()
+        history_rows, history_refs, errors = [], [], []
+        for (mapping, context, input_hash), (code, error) in zip(prepared, rendered):
+            if error:
+                errors.append({"mapping_id": mapping.id, "message": error})
+                continue
+            history_rows.append({"dag_id": context['dag_id'], "mapping_id": mapping.id, "template_id": template.id,
+                                 "input_hash": input_hash, "generated_code": code, "created_at": now})
+            history_refs.append({"dag_id": context['dag_id'], "mapping_id": mapping.id})
+
+        if history_rows:
+            ids = db.session.scalars(
+                insert(EtlDagHistory).returning(EtlDagHistory.id, sort_by_parameter_order=True), history_rows).all()
+            db.session.commit()
+            for ref, history_id in zip(history_refs, ids):
+                ref['id'] = history_id
+        print(f"DEBUG: Generated {len(history_refs)} DAG(s) with template {template.id}, {len(errors)} error(s).")
+        return history_refs, errors
+
+    def _latest_history(self, mapping_ids=None):
+        # {mapping_id: (template_id, input_hash)} of the newest DAG per mapping
+        latest = db.session.query(func.max(EtlDagHistory.id)).filter(EtlDagHistory.mapping_id.isnot(None)) \
+            .group_by(EtlDagHistory.mapping_id)
+        if mapping_ids is not None:
+            latest = latest.filter(EtlDagHistory.mapping_id.in_([int(i) for i in mapping_ids]))
+        history_ids = sorted(i for (i,) in latest)
+        result = {}
+        for i in range(0, len(history_ids), 1000):
+            rows = db.session.query(EtlDagHistory.mapping_id, EtlDagHistory.template_id, EtlDagHistory.input_hash) \
+                .filter(EtlDagHistory.id.in_(history_ids[i:i + 1000]))
+            for mapping_id, template_id, input_hash in rows:
+                result[mapping_id] = (template_id, input_hash)
+        return result
+
+    def _input_hash(self, template_hash, mapping, source_columns, target_table, context):
+        # source_columns: the SOURCE catalog entry (tb_etl_meta_mst.schema_info is empty for sources).
+        # created_at never changes what the DAG does; a dated dag_id only changes with the calendar.
+        # Row/byte estimates move on every stats refresh, so only the parallel_degree derived
+        # from them counts.
+        hashed_context = {k: v for k, v in context.items() if k not in ('created_at', 'source_stats')}
+        if self._dag_id_mode() != 'deterministic':
+            hashed_context.pop('dag_id', None)
+        inputs = {
+            "template": template_hash,
+            "mapping_json": mapping.mapping_json,
+            "source_schema": source_columns,
+            "target_schema": target_table.schema_info,
+            "target_ddl_options": target_table.ddl_options,
+            "context": hashed_context
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def build_zip(self, history_ids):
+        # One <dag_id>.py per history row
+        history_ids = sorted(set(history_ids))
+        buf = io.BytesIO()
+        names = set()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for i in range(0, len(history_ids), 1000):
+                rows = db.session.query(EtlDagHistory.id, EtlDagHistory.dag_id, EtlDagHistory.generated_code) \
+                    .filter(EtlDagHistory.id.in_(history_ids[i:i + 1000])).order_by(EtlDagHistory.id)
+                for history_id, dag_id, code in rows:
+                    name = f"{dag_id}.py"
+                    if name in names:
+                        name = f"{dag_id}_{history_id}.py"
+                    names.add(name)
+                    archive.writestr(name, code)
+        return buf.getvalue()
+
+    def _load_mappings(self, mapping_ids, source_filter, target_filter):
+        # [(EtlMapping, source EtlMetadata, target EtlMetadata)] in one joined query per 1000 ids
+        SourceMeta = aliased(EtlMetadata)
+        TargetMeta = aliased(EtlMetadata)
+        query = db.session.query(EtlMapping, SourceMeta, TargetMeta) \
+            .join(SourceMeta, EtlMapping.source_table_id == SourceMeta.id) \
+            .join(TargetMeta, EtlMapping.target_table_id == TargetMeta.id)
+        map_service = MappingService()
+        if source_filter:
+            query = query.filter(map_service._name_filter(SourceMeta.table_name, source_filter))
+        if target_filter:
+            query = query.filter(map_service._name_filter(TargetMeta.table_name, target_filter))
+
+        if mapping_ids is None:
+            return query.order_by(EtlMapping.id).all()
+        mapping_ids = sorted(set(int(i) for i in mapping_ids))
+        rows = []
+        for i in range(0, len(mapping_ids), 1000):
+            rows.extend(query.filter(EtlMapping.id.in_(mapping_ids[i:i + 1000])).order_by(EtlMapping.id).all())
+        return rows
+
+    def _render_all(self, template, contexts, workers=None):
+        # [(code, error)] in the order of contexts
+        if workers is None:
+            workers = min(os.cpu_count() or 1, 8)
+        if workers <= 1 or len(contexts) < PARALLEL_RENDER_THRESHOLD:
+            compiled = TemplateRegistry.get_template(template)
+            results = []
+            for context in contexts:
+                try:
+                    results.append((compiled.render(context), None))
+                except Exception as e:
+                    results.append((None, str(e)))
+            return results
+
+        # Workers get the template sources up front; they have no database session
+        sources = {}
+        for t_id, name, content in db.session.query(EtlTemplate.id, EtlTemplate.template_name,
+                                                    EtlTemplate.template_content).order_by(EtlTemplate.id):
+            sources[name] = content
+            sources[f"#{t_id}"] = content
+        template_dir = current_app.config.get('DAG_TEMPLATE_DIR')
+
+        indexed = list(enumerate(contexts))
+        chunks = [indexed[i:i + RENDER_CHUNK_SIZE] for i in range(0, len(indexed), RENDER_CHUNK_SIZE)]
+        results = [None] * len(contexts)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                                 initargs=(sources, f"#{template.id}", template_dir)) as executor:
+            for chunk_results in executor.map(_render_chunk, chunks):
+                for index, code, error in chunk_results:
+                    results[index] = (code, error)
+        return results
+
+    def _build_context(self, mapping, source_table, target_table, mapping_data, last_watermark,
+                       source_stats, source_columns, target_columns, source_type, meta_service):
+        options = (mapping_data.get('options') or {}) if isinstance(mapping_data, dict) else {}
+        parallel_degree = options.get('parallel_degree') or 1
+        if str(parallel_degree).upper() == 'AUTO':
+            parallel_degree = meta_service.suggest_parallel_degree(source_stats)
+
+        dag_id = f"etl_{source_table.table_name}_to_{target_table.table_name}"
+        if self._dag_id_mode() == 'deterministic':
+            # Same inputs render the same bytes: no calendar date, no render time
+            created_at = mapping.etl_cry_dtm.isoformat() if mapping.etl_cry_dtm else None
+            if source_stats:
+                source_stats = {k: v for k, v in source_stats.items() if k != 'stats_at'}
+        else:
+            dag_id = f"{dag_id}_{datetime.now().strftime('%Y%m%d')}"
+            created_at = datetime.now().isoformat()
+
+        # Prepare context for Jinja2
+        return {
+            "dag_id": dag_id,
+            "source_table": source_table.table_name,
+            "target_table": target_table.table_name,
+            "mappings": mapping_data,
+            "load_mode": (options.get('load_mode') or 'FULL').upper(),
+            "watermark_column": options.get('watermark_column'),
+            "last_watermark": str(last_watermark) if last_watermark is not None else None,
+            "source_sql": self._compile_source_sql(mapping, source_columns, target_columns, source_type),
+            "post_load_sql": self._post_load_sql(target_table),
+            "source_stats": source_stats,
+            "parallel_degree": int(parallel_degree),
+            "created_at": created_at
+        }
+
+    def _dag_id_mode(self):
+        return (current_app.config.get('DAG_ID_MODE') or 'dated').lower()
+
+    def _get_source_type(self):
+        source_conn = EtlConnection.query.filter_by(role='SOURCE').order_by(EtlConnection.id.desc()).first()
+        return source_conn.type if source_conn else None
+
+    def _compile_source_sql(self, mapping, source_columns, target_columns, source_type):
+        # Catalog columns (not EtlMetadata.schema_info, which is empty for source tables)
+        compiled = PushdownService().compile_for_connection(mapping, source_type, source_columns, target_columns)
+        return compiled['sql']
+
+    def _post_load_sql(self, target_table):
+        # Index builds deferred until after the load (targets created with defer_indexes)
+        from services.metadata_service import MetadataService
+        options = json.loads(target_table.ddl_options or '{}')
+        if not options.get('defer_indexes'):
+            return []
+        return MetadataService().generate_index_ddl(target_table.table_name, options)
+
     def get_dag_code(self, history_id):
         return EtlDagHistory.query.get(history_id).generated_code
@@ -0,0 +1,194 @@
+import json
+import re
+from sqlalchemy import delete, insert, or_, and_
+from models import db, EtlColumnMapping, EtlMapping, EtlMetadata
+from services.metadata_service import MetadataService
+
+IDENTIFIER = re.compile(r'"([^"]+)"|\b([A-Za-z_][A-Za-z0-9_$#]*)\b')
+MAX_DEPTH = 10
+
+class LineageService:
+    """
+    Column-level lineage on top of tb_etl_map_col.
+    mapping_json stays the source of truth; every save/import/delete rewrites the rows of
+    the affected mappings in the same transaction, so lookups by (table, column) use the
+    composite indexes instead of parsing every mapping. CUSTOM expressions are linked to
+    the source columns they reference, matched against the SOURCE catalog cache
+    (tb_etl_meta_cache; tb_etl_meta_mst.schema_info is empty for source tables).
+    Mappings chain by table name: a target table that is the source of another mapping
+    is followed when depth > 1.
+    """
+    def sync_mappings(self, mappings):
+        # mappings: EtlMapping rows (mapping_json loaded). Caller commits.
+        mappings = [m for m in mappings if m.id]
+        if not mappings:
+            return 0
+        meta_ids = {m.source_table_id for m in mappings} | {m.target_table_id for m in mappings}
+        tables = self._load_tables(meta_ids)
+
+        mapping_ids = [m.id for m in mappings]
+        for i in range(0, len(mapping_ids), 1000):
+            db.session.execute(delete(EtlColumnMapping).where(EtlColumnMapping.mapping_id.in_(mapping_ids[i:i + 1000])))
+
+        rows = []
+        for mapping in mappings:
+            rows.extend(self._build_rows(mapping, tables))
+        if rows:
+            db.session.execute(insert(EtlColumnMapping), rows)
+        return len(rows)
+
+    def delete_mapping(self, mapping_id):
+        db.session.execute(delete(EtlColumnMapping).where(EtlColumnMapping.mapping_id == mapping_id))
+
+    def rebuild(self):
+        # Full backfill from mapping_json (e.g. after upgrading an existing database)
+        meta_service = MetadataService()
+        source_conn = meta_service._get_connection_by_role('SOURCE')
+        if source_conn:
+            # Saves read the catalog cache as is; a rebuild brings it up to date once first
+            try:
+                meta_service._sync_catalog(source_conn)
+            except Exception as e:
+                print(f"WARN: Source catalog not synced, CUSTOM lineage uses the cached columns: {e}")
+        db.session.execute(delete(EtlColumnMapping))
+        count, batch = 0, []
+        for mapping in EtlMapping.query.order_by(EtlMapping.id).yield_per(1000):
+            batch.append(mapping)
+            if len(batch) == 1000:
+                count += self.sync_mappings(batch)
+                batch = []
+        count += self.sync_mappings(batch)
+        db.session.commit()
+        print(f"DEBUG: Rebuilt column lineage: {count} row(s).")
+        return count
+
+    def get_downstream(self, table_name, column=None, depth=1):
+        # What reads this table/column (impact analysis)
+        return self._walk(table_name, column, depth, downstream=True)
+
+    def get_upstream(self, table_name, column=None, depth=1):
+        # What feeds this table/column
+        return self._walk(table_name, column, depth, downstream=False)
+
+    def _walk(self, table_name, column, depth, downstream):
+        depth = max(1, min(int(depth or 1), MAX_DEPTH))
+        frontier = {(table_name.upper(), column.upper() if column else None)}
+        seen, edges = set(frontier), []
+        for level in range(1, depth + 1):
+            rows = self._find_edges(frontier, downstream)
+            next_frontier = set()
+            for row in rows:
+                edge = {
+                    "level": level,
+                    "mapping_id": row.mapping_id,
+                    "source_table": row.source_table,
+                    "source_column": row.source_column,
+                    "target_table": row.target_table,
+                    "target_column": row.target_column,
+                    "rule_type": row.rule_type
+                }
+                edges.append(edge)
+                node = (row.target_table, row.target_column) if downstream else (row.source_table, row.source_column)
+                if node[1] and node not in seen:
+                    seen.add(node)
+                    next_frontier.add(node)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return edges
+
+    def _find_edges(self, nodes, downstream):
+        table_col = EtlColumnMapping.source_table if downstream else EtlColumnMapping.target_table
+        column_col = EtlColumnMapping.source_column if downstream else EtlColumnMapping.target_column
+
+        # Whole tables go in one IN list; columns are grouped per table so each condition hits the index
+        whole_tables = sorted({t for t, c in nodes if not c})
+        by_table = {}
+        for t, c in nodes:
+            if c and t not in whole_tables:
+                by_table.setdefault(t, set()).add(c)
+
+        conditions = []
+        if whole_tables:
+            conditions.append(table_col.in_(whole_tables))
+        for t, columns in by_table.items():
+            conditions.append(and_(table_col == t, column_col.in_(sorted(columns))))
+        if not conditions:
+            return []
+        return EtlColumnMapping.query.filter(or_(*conditions)) \
+            .order_by(EtlColumnMapping.mapping_id, EtlColumnMapping.seq).all()
+
+    def _load_tables(self, meta_ids):
+        # id -> (table_name, set of column names); source columns come from the SOURCE catalog
+        # cache (no database round-trip), schema_info is only a fallback for uncached tables
+        meta_ids = sorted(i for i in meta_ids if i)
+        rows = []
+        for i in range(0, len(meta_ids), 1000):
+            rows.extend(db.session.query(EtlMetadata.id, EtlMetadata.table_name, EtlMetadata.db_type,
+                                         EtlMetadata.schema_info)
+                        .filter(EtlMetadata.id.in_(meta_ids[i:i + 1000])).all())
+        source_names = sorted({table_name for _, table_name, db_type, _ in rows if db_type == 'ORACLE'})
+        catalog = MetadataService().get_tables('SOURCE', source_names, refresh=False) if source_names else {}
+
+        tables = {}
+        for meta_id, table_name, db_type, schema_info in rows:
+            if db_type == 'ORACLE' and table_name in catalog:
+                columns = catalog[table_name]['columns']
+            else:
+                try:
+                    columns = json.loads(schema_info or '[]')
+                except ValueError:
+                    columns = []
+            try:
+                names = {c['name'].upper() for c in columns if c.get('name')}
+            except (TypeError, AttributeError):
+                names = set()
+            tables[meta_id] = (table_name.upper(), names)
+        return tables
+
+    def _build_rows(self, mapping, tables):
+        source_table, source_columns = tables.get(mapping.source_table_id, (None, set()))
+        target_table = tables.get(mapping.target_table_id, (None, set()))[0]
+        if not source_table or not target_table:
+            return []
+
+        mapping_data = json.loads(mapping.mapping_json)
+        entries = mapping_data.get('mappings', []) if isinstance(mapping_data, dict) else mapping_data
+
+        rows = []
+        for seq, entry in enumerate(entries or []):
+            if not isinstance(entry, dict) or not entry.get('target_column'):
+                continue
+            rule_type = (entry.get('rule_type') or 'DIRECT').upper()
+            target_column = entry['target_column'].upper()
+            if rule_type == 'CUSTOM':
+                referenced = self._referenced_columns(entry.get('rule_detail') or entry.get('custom_sql'), source_columns)
+                if entry.get('source_column'):
+                    referenced.insert(0, entry['source_column'].upper())
+                sources = list(dict.fromkeys(referenced)) or [None]
+            else:
+                sources = [entry['source_column'].upper() if entry.get('source_column') else None]
+
+            for source_column in sources:
+                rows.append({
+                    "mapping_id": mapping.id,
+                    "seq": seq,
+                    "source_table": source_table,
+                    "source_column": source_column,
+                    "target_table": target_table,
+                    "target_column": target_column,
+                    "rule_type": rule_type
+                })
+        return rows
+
+    def _referenced_columns(self, expression, source_columns):
+        if not expression or not source_columns:
+            return []
+        found = []
+        # String literals can't reference columns
+        expression = re.sub(r"'(?:[^']|'')*'", "''", expression)
+        for quoted, bare in IDENTIFIER.findall(expression):
+            name = (quoted or bare).upper()
+            if name in source_columns:
+                found.append(name)
+        return found
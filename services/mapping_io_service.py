@@ -0,0 +1,304 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.orm import aliased, load_only
+from models import db, EtlMapping, EtlMetadata
+from services.lineage_service import LineageService
+from services.mapping_service import MappingService
+from services.pushdown_service import PushdownService
+
+# One row per column mapping in CSV/XLSX; rows sharing source/target table form one mapping
+FLAT_COLUMNS = ['source_table', 'target_table', 'mapping_type', 'source_column', 'target_column',
+                'rule_type', 'rule_detail', 'remarks']
+RULE_TYPES = ('DIRECT', 'NVL', 'MASKING', 'CUSTOM')
+FORMATS = ('json', 'csv', 'xlsx')
+
+class MappingIOService:
+    """
+    Bulk import/export of mappings as JSON, CSV or XLSX.
+    Table names are resolved to tb_etl_meta_mst ids with one IN query per 1000 names; names
+    not registered yet are looked up in the source/target catalog cache and registered in the
+    same transaction as the mappings. Existing mappings are matched the same way. Rows that
+    fail validation are reported with their row number and skipped.
+    """
+    def export_mappings(self, fmt, mapping_ids=None):
+        fmt = self._check_format(fmt)
+        SourceMeta = aliased(EtlMetadata)
+        TargetMeta = aliased(EtlMetadata)
+        query = db.session.query(EtlMapping.id, EtlMapping.mapping_json, SourceMeta.table_name, TargetMeta.table_name) \
+            .join(SourceMeta, EtlMapping.source_table_id == SourceMeta.id) \
+            .join(TargetMeta, EtlMapping.target_table_id == TargetMeta.id)
+        if mapping_ids:
+            query = query.filter(EtlMapping.id.in_(mapping_ids))
+
+        mappings = []
+        for m_id, mapping_json, s_name, t_name in query.order_by(EtlMapping.id).yield_per(1000):
+            data = json.loads(mapping_json)
+            if not isinstance(data, dict):
+                data = {"type": "1:1", "mappings": data}
+            mappings.append({
+                "source_table": s_name,
+                "target_table": t_name,
+                "type": data.get('type', '1:1'),
+                "mappings": data.get('mappings') or [],
+                "options": data.get('options') or {}
+            })
+
+        if fmt == 'json':
+            return json.dumps(mappings, ensure_ascii=False, indent=2).encode('utf-8')
+
+        rows = []
+        for m in mappings:
+            for col in m['mappings']:
+                rows.append([m['source_table'], m['target_table'], m['type'], col.get('source_column') or '',
+                             col.get('target_column') or '', col.get('rule_type') or 'DIRECT',
+                             col.get('rule_detail') or '', col.get('remarks') or ''])
+        if fmt == 'csv':
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(FLAT_COLUMNS)
+            writer.writerows(rows)
+            # BOM so Excel opens Korean text correctly
+            return buf.getvalue().encode('utf-8-sig')
+
+        openpyxl = self._require_openpyxl()
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet('mappings')
+        sheet.append(FLAT_COLUMNS)
+        for row in rows:
+            sheet.append(row)
+        buf = io.BytesIO()
+        workbook.save(buf)
+        return buf.getvalue()
+
+    def import_mappings(self, content, fmt, dry_run=False):
+        # Returns {"created", "updated", "registered", "errors": [{"row", "message"}]}
+        fmt = self._check_format(fmt)
+        errors = []
+        records = self._parse(content, fmt, errors)
+
+        # Set-based name -> id resolution (latest definition per name and type wins)
+        names = {r['source_table'] for r in records} | {r['target_table'] for r in records}
+        sources, targets, catalog = self._resolve_tables(names)
+
+        valid = {}
+        for record in records:
+            message = self._validate(record, sources.keys() | catalog['ORACLE'].keys(),
+                                     targets.keys() | catalog['POSTGRES'].keys())
+            pair = (record['source_table'], record['target_table'])
+            if not message and pair in valid:
+                message = f"Duplicate mapping {record['source_table']} -> {record['target_table']}"
+            if message:
+                errors.append({"row": record['row'], "message": message})
+                continue
+            valid[pair] = record
+
+        # Only tables used by valid rows are registered, and a dry run rolls them back
+        registered = self._register_tables(valid.keys(), sources, targets, catalog)
+        valid = {(sources[s_name], targets[t_name]): record for (s_name, t_name), record in valid.items()}
+
+        existing = self._find_existing(valid.keys())
+        now = datetime.utcnow()
+        new_rows, updated_ids, changed = [], [], []
+        for pair, record in valid.items():
+            mapping = existing.get(pair)
+            mapping_data = self._mapping_data(record, mapping.mapping_json if mapping else None)
+            mapping_json = json.dumps(mapping_data)
+            column_count = MappingService.count_columns(mapping_data)
+            if mapping:
+                mapping.mapping_json = mapping_json
+                mapping.column_count = column_count
+                mapping.etl_cry_dtm = now
+                updated_ids.append(mapping.id)
+                changed.append(mapping)
+            else:
+                new_rows.append({"source_table_id": pair[0], "target_table_id": pair[1],
+                                 "mapping_json": mapping_json, "column_count": column_count, "etl_cry_dtm": now})
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            if new_rows:
+                new_ids = db.session.scalars(
+                    insert(EtlMapping).returning(EtlMapping.id, sort_by_parameter_order=True), new_rows).all()
+                changed.extend(EtlMapping(id=i, **row) for i, row in zip(new_ids, new_rows))
+            # Column-level lineage rows go out in the same transaction
+            LineageService().sync_mappings(changed)
+            db.session.commit()
+            for mapping_id in updated_ids:
+                PushdownService.clear_cache(mapping_id)
+            print(f"DEBUG: Imported mappings: {len(new_rows)} created, {len(updated_ids)} updated, "
+                  f"{registered} table(s) registered, {len(errors)} error(s).")
+
+        errors.sort(key=lambda e: e['row'])
+        return {"created": len(new_rows), "updated": len(updated_ids), "registered": registered, "errors": errors,
+                "dry_run": dry_run}
+
+    def _check_format(self, fmt):
+        fmt = (fmt or '').lower().lstrip('.')
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt or '(none)'} (use json, csv or xlsx)")
+        return fmt
+
+    def _require_openpyxl(self):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ValueError("XLSX support requires the openpyxl package")
+        return openpyxl
+
+    def _parse(self, content, fmt, errors):
+        # Normalizes every format to [{"row", "source_table", "target_table", "type", "mappings", "options"}]
+        if fmt == 'json':
+            try:
+                data = json.loads(content.decode('utf-8-sig') if isinstance(content, bytes) else content)
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON: {e}")
+            if not isinstance(data, list):
+                raise ValueError("JSON import expects a list of mappings")
+            records = []
+            for i, item in enumerate(data, start=1):
+                if not isinstance(item, dict):
+                    errors.append({"row": i, "message": "Mapping must be an object"})
+                    continue
+                records.append({
+                    "row": i,
+                    "source_table": str(item.get('source_table') or '').strip().upper(),
+                    "target_table": str(item.get('target_table') or '').strip().upper(),
+                    "type": item.get('type') or '1:1',
+                    "mappings": item.get('mappings') or [],
+                    "options": item.get('options') or {}
+                })
+            return records
+
+        if fmt == 'csv':
+            text_content = content.decode('utf-8-sig') if isinstance(content, bytes) else content
+            rows = list(csv.reader(io.StringIO(text_content)))
+        else:
+            openpyxl = self._require_openpyxl()
+            workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+            rows = [['' if v is None else str(v) for v in row] for row in workbook.active.iter_rows(values_only=True)]
+            workbook.close()
+        if not rows:
+            return []
+
+        header = [h.strip().lower() for h in rows[0]]
+        missing = [c for c in ('source_table', 'target_table', 'target_column') if c not in header]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+        # Row numbers are spreadsheet line numbers (header is line 1)
+        grouped = {}
+        for line_no, row in enumerate(rows[1:], start=2):
+            values = dict(zip(header, [v.strip() if isinstance(v, str) else v for v in row]))
+            if not any(values.values()):
+                continue
+            key = (values.get('source_table', '').upper(), values.get('target_table', '').upper())
+            record = grouped.get(key)
+            if not record:
+                record = {"row": line_no, "source_table": key[0], "target_table": key[1],
+                          "type": values.get('mapping_type') or '1:1', "mappings": [], "options": {}, "lines": []}
+                grouped[key] = record
+            record['mappings'].append({
+                "source_column": values.get('source_column', '').upper(),
+                "target_column": values.get('target_column', '').upper(),
+                "rule_type": (values.get('rule_type') or 'DIRECT').upper(),
+                "rule_detail": values.get('rule_detail', ''),
+                "remarks": values.get('remarks', '')
+            })
+            record['lines'].append(line_no)
+        return list(grouped.values())
+
+    def _resolve_tables(self, names):
+        # ({name: id} of sources, {name: id} of targets, {db_type: {name: catalog columns}} of
+        # tables that exist in the source/target database but have no tb_etl_meta_mst row yet)
+        from services.metadata_service import MetadataService
+        names = sorted(n for n in names if n)
+        sources, targets = {}, {}
+        for i in range(0, len(names), 1000):
+            rows = db.session.query(EtlMetadata.id, EtlMetadata.table_name, EtlMetadata.db_type) \
+                .filter(EtlMetadata.table_name.in_(names[i:i + 1000])).order_by(EtlMetadata.id).all()
+            for meta_id, table_name, db_type in rows:
+                # Ordered by id, so the latest row per name/type overwrites older duplicates
+                if db_type == 'ORACLE':
+                    sources[table_name] = meta_id
+                elif db_type == 'POSTGRES':
+                    targets[table_name] = meta_id
+
+        meta_service = MetadataService()
+        catalog = {}
+        for role, db_type, resolved in (('SOURCE', 'ORACLE', sources), ('TARGET', 'POSTGRES', targets)):
+            missing = [n for n in names if n not in resolved]
+            found = meta_service.get_tables(role, missing) if missing else {}
+            catalog[db_type] = {name: table['columns'] for name, table in found.items()}
+        return sources, targets, catalog
+
+    def _register_tables(self, pairs, sources, targets, catalog):
+        # tb_etl_meta_mst rows for catalog tables used by the import, inserted (not committed)
+        # with their catalog columns; ids are added to sources/targets
+        now = datetime.utcnow()
+        count = 0
+        for index, db_type, resolved in ((0, 'ORACLE', sources), (1, 'POSTGRES', targets)):
+            names = sorted({pair[index] for pair in pairs if pair[index] not in resolved})
+            if not names:
+                continue
+            rows = [{"table_name": name, "db_type": db_type, "schema_info": json.dumps(catalog[db_type][name]),
+                     "etl_cry_dtm": now} for name in names]
+            ids = db.session.scalars(
+                insert(EtlMetadata).returning(EtlMetadata.id, sort_by_parameter_order=True), rows).all()
+            resolved.update(zip(names, ids))
+            count += len(names)
+        return count
+
+    def _find_existing(self, pairs):
+        pairs = set(pairs)
+        source_ids = sorted({p[0] for p in pairs})
+        existing = {}
+        for i in range(0, len(source_ids), 1000):
+            query = EtlMapping.query.options(load_only(EtlMapping.id, EtlMapping.source_table_id, EtlMapping.target_table_id,
+                                                       EtlMapping.mapping_json)) \
+                .filter(EtlMapping.source_table_id.in_(source_ids[i:i + 1000])).order_by(EtlMapping.id)
+            for mapping in query:
+                pair = (mapping.source_table_id, mapping.target_table_id)
+                if pair in pairs:
+                    existing[pair] = mapping
+        return existing
+
+    def _validate(self, record, sources, targets):
+        if not record['source_table'] or not record['target_table']:
+            return "source_table and target_table are required"
+        if record['source_table'] not in sources:
+            return f"Source table {record['source_table']} not found in metadata or the source catalog"
+        if record['target_table'] not in targets:
+            return f"Target table {record['target_table']} not found in metadata or the target catalog"
+        if not isinstance(record['mappings'], list) or not record['mappings']:
+            return "Mapping has no columns"
+
+        lines = record.get('lines') or []
+        for i, col in enumerate(record['mappings']):
+            where = f"line {lines[i]}: " if lines else f"column {i + 1}: "
+            if not isinstance(col, dict) or not col.get('target_column'):
+                return where + "target_column is required"
+            rule_type = (col.get('rule_type') or 'DIRECT').upper()
+            if rule_type not in RULE_TYPES:
+                return where + f"unknown rule_type {rule_type}"
+            if rule_type == 'CUSTOM' and not col.get('rule_detail'):
+                return where + "CUSTOM needs an SQL expression in rule_detail"
+            if rule_type in ('NVL', 'MASKING') and not col.get('source_column'):
+                return where + f"{rule_type} needs a source_column"
+        return None
+
+    def _mapping_data(self, record, existing_json=None):
+        # CSV/XLSX rows carry no options: an update keeps the stored options (load mode,
+        # watermark, parallelism) and any other top-level keys unless the record brings its own
+        mapping_data = {}
+        if existing_json:
+            existing = json.loads(existing_json)
+            if isinstance(existing, dict):
+                mapping_data.update(existing)
+        mapping_data.update({"type": record['type'], "mappings": record['mappings']})
+        if record.get('options'):
+            mapping_data['options'] = record['options']
+        return mapping_data
@@ -1,37 +1,62 @@
 import json
 from datetime import datetime
-from models import db, EtlMapping, EtlMetadata
-from sqlalchemy.orm import aliased
+from decimal import Decimal
+from models import db, EtlMapping, EtlMetadata, EtlWatermark
+from sqlalchemy import func
+from sqlalchemy.orm import aliased, defer
+from services.lineage_service import LineageService
+from services.metadata_service import like_pattern
+from services.pushdown_service import PushdownService
 
 class MappingService:
     def get_mappings(self):
-        return EtlMapping.query.all()
+        # mapping_json is loaded on access only; lists need just the ids
+        return EtlMapping.query.options(defer(EtlMapping.mapping_json)).all()
 
-    def get_mappings_with_names(self, source_filter=None, target_filter=None):
+    def get_mappings_with_names(self, source_filter=None, target_filter=None, after=None, limit=50):
+        # Keyset-paginated list (newest first) without mapping_json.
+        # Filters are prefix matches on the indexed table_name ('*' for wildcards).
+        # Returns (mappings, next_after); pass next_after back as after for the next page.
         SourceMeta = aliased(EtlMetadata)
         TargetMeta = aliased(EtlMetadata)
         
-        query = db.session.query(EtlMapping, SourceMeta.table_name, TargetMeta.table_name)\
+        query = db.session.query(EtlMapping.id, EtlMapping.column_count, EtlMapping.etl_cry_dtm,
+                                 SourceMeta.table_name, TargetMeta.table_name)\
             .join(SourceMeta, EtlMapping.source_table_id == SourceMeta.id)\
             .join(TargetMeta, EtlMapping.target_table_id == TargetMeta.id)
             
         if source_filter:
-            query = query.filter(SourceMeta.table_name.ilike(f'%{source_filter}%'))
+            query = query.filter(self._name_filter(SourceMeta.table_name, source_filter))
         if target_filter:
-            query = query.filter(TargetMeta.table_name.ilike(f'%{target_filter}%'))
+            query = query.filter(self._name_filter(TargetMeta.table_name, target_filter))
+        if after:
+            query = query.filter(EtlMapping.id < after)
             
-        results = query.order_by(EtlMapping.id.desc()).all()
+        results = query.order_by(EtlMapping.id.desc()).limit(limit + 1).all()
             
         mappings = []
-        for m, s_name, t_name in results:
+        for m_id, column_count, created_at, s_name, t_name in results[:limit]:
             mappings.append({
-                "id": m.id,
+                "id": m_id,
                 "source_table": s_name,
                 "target_table": t_name,
-                "created_at": m.etl_cry_dtm,
-                "mapping_json": json.loads(m.mapping_json)
+                "column_count": column_count,
+                "created_at": created_at
             })
-        return mappings
+        next_after = mappings[-1]['id'] if len(results) > limit else None
+        return mappings, next_after
+
+    def _name_filter(self, column, name_filter):
+        # UPPER(name) LIKE 'PATTERN%': case-insensitive on every backend (LIKE is case-sensitive
+        # on Postgres and Oracle) and served by the functional index on upper(table_name)
+        name_filter = name_filter.strip().upper()
+        pattern = like_pattern(name_filter if '*' in name_filter else name_filter + '*')
+        return func.upper(column).like(pattern, escape='\\')
+
+    @staticmethod
+    def count_columns(mapping_data):
+        mappings = mapping_data.get('mappings', []) if isinstance(mapping_data, dict) else mapping_data
+        return len([m for m in mappings or [] if m.get('target_column')])
 
     def save_mapping(self, source_table, target_table, mapping_data, mapping_id=None):
         # source_table and target_table can be IDs (int) or Names (str)
@@ -49,7 +74,9 @@ class MappingService:
                 mapping.source_table_id = source_id
                 mapping.target_table_id = target_id
                 mapping.mapping_json = json.dumps(mapping_data)
+                mapping.column_count = self.count_columns(mapping_data)
                 mapping.etl_cry_dtm = datetime.utcnow() # Update timestamp
+                LineageService().sync_mappings([mapping])
                 db.session.commit()
                 return mapping
 
@@ -58,9 +85,12 @@ class MappingService:
             source_table_id=source_id,
             target_table_id=target_id,
             mapping_json=json.dumps(mapping_data),
+            column_count=self.count_columns(mapping_data),
             etl_cry_dtm=datetime.utcnow()
         )
         db.session.add(new_mapping)
+        db.session.flush()
+        LineageService().sync_mappings([new_mapping])
         db.session.commit()
         return new_mapping
 
@@ -100,7 +130,67 @@ class MappingService:
     def delete_mapping(self, id):
         mapping = EtlMapping.query.get(id)
         if mapping:
+            EtlWatermark.query.filter_by(mapping_id=mapping.id).delete()
+            LineageService().delete_mapping(mapping.id)
             db.session.delete(mapping)
             db.session.commit()
+            PushdownService.clear_cache(id)
             return True
         return False
+
+    def get_watermark(self, mapping_id, watermark_column=None):
+        # Returns the last high-water mark as a Python value, or None if there is none
+        # (or it was recorded for a different column).
+        mark = EtlWatermark.query.filter_by(mapping_id=mapping_id).first()
+        return self._watermark_value(mark, watermark_column)
+
+    def get_watermarks(self, watermark_columns):
+        # Bulk get_watermark: {mapping_id: watermark_column} -> {mapping_id: value}
+        mapping_ids = sorted(watermark_columns)
+        values = {}
+        for i in range(0, len(mapping_ids), 1000):
+            for mark in EtlWatermark.query.filter(EtlWatermark.mapping_id.in_(mapping_ids[i:i + 1000])):
+                values[mark.mapping_id] = self._watermark_value(mark, watermark_columns[mark.mapping_id])
+        return values
+
+    def _watermark_value(self, mark, watermark_column=None):
+        if not mark or mark.last_value is None:
+            return None
+        if watermark_column and mark.watermark_column.upper() != watermark_column.upper():
+            return None
+
+        if mark.value_type == 'datetime':
+            return datetime.fromisoformat(mark.last_value)
+        if mark.value_type == 'date':
+            return datetime.fromisoformat(mark.last_value).date()
+        if mark.value_type == 'number':
+            value = Decimal(mark.last_value)
+            return int(value) if value == value.to_integral_value() else value
+        return mark.last_value
+
+    def save_watermark(self, mapping_id, watermark_column, value):
+        if isinstance(value, datetime):
+            value_type, last_value = 'datetime', value.isoformat()
+        elif hasattr(value, 'isoformat'):
+            value_type, last_value = 'date', value.isoformat()
+        elif isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            value_type, last_value = 'number', str(value)
+        elif value is None:
+            value_type, last_value = None, None
+        else:
+            value_type, last_value = 'string', str(value)
+
+        mark = EtlWatermark.query.filter_by(mapping_id=mapping_id).first()
+        if not mark:
+            mark = EtlWatermark(mapping_id=mapping_id)
+            db.session.add(mark)
+        mark.watermark_column = watermark_column
+        mark.last_value = last_value
+        mark.value_type = value_type
+        mark.updated_at = datetime.utcnow()
+        db.session.commit()
+        return mark
+
+    def reset_watermark(self, mapping_id):
+        EtlWatermark.query.filter_by(mapping_id=mapping_id).delete()
+        db.session.commit()
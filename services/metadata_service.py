@@ -1,9 +1,27 @@
 import json
-from datetime import datetime
-from models import db, EtlMetadata, EtlConnection
-from sqlalchemy import create_engine, text, inspect
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, EtlMetadata, EtlConnection, EtlCatalogCache
+from sqlalchemy import text, inspect, bindparam, or_, update
+from sqlalchemy.orm import load_only
+from services.engine_registry import EngineRegistry
+from services.type_map_service import TypeMapService
+
+def like_pattern(value):
+    # LIKE pattern for a user-supplied name: '%' and '_' match themselves (TB_EMP), '*' is the
+    # only wildcard. Use with escape='\\'.
+    value = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return value.replace('*', '%')
 
 class MetadataService:
+    # One catalog sync per connection at a time (see _sync_catalog)
+    _sync_locks = {}
+    _sync_locks_guard = threading.Lock()
+
     def _get_connection_by_role(self, role):
         return EtlConnection.query.filter_by(role=role).order_by(EtlConnection.id.desc()).first()
 
@@ -12,18 +30,8 @@ class MetadataService:
         return conn.name if conn else "No Connection"
 
     def _get_engine(self, conn_data):
-        if not conn_data: return None
-        
-        db_type = conn_data.type.upper()
-        uri = ""
-        if db_type == 'ORACLE':
-            uri = f"oracle+oracledb://{conn_data.username}:{conn_data.password}@{conn_data.host}:{conn_data.port}/?service_name={conn_data.schema_db}"
-        elif db_type == 'POSTGRES':
-            uri = f"postgresql://{conn_data.username}:{conn_data.password}@{conn_data.host}:{conn_data.port}/{conn_data.schema_db}"
-        
-        if uri:
-            return create_engine(uri)
-        return None
+        # Engines are pooled per connection by the registry
+        return EngineRegistry.get_engine(conn_data)
 
     def create_sample_tables(self):
         conn_data = self._get_connection_by_role('SOURCE')
@@ -115,85 +123,151 @@ class MetadataService:
         if not conn_data: return []
 
         try:
-            engine = self._get_engine(conn_data)
-            # Use raw SQL for Oracle as Inspector is having issues
-            if conn_data.type == 'ORACLE':
-                return self._get_oracle_metadata(engine, conn_data.username.upper())
-            
-            # Fallback for others (or if we fix Inspector)
-            inspector = inspect(engine)
-            table_names = inspector.get_table_names()
-            tables = []
-            for t_name in table_names:
-                columns = []
-                for col in inspector.get_columns(t_name):
-                    columns.append({
-                        "name": col['name'],
-                        "type": str(col['type']),
-                        "pk": col.get('primary_key', False),
-                        "nullable": col.get('nullable', True),
-                        "comment": col.get('comment')
-                    })
-                tables.append({"table_name": t_name, "columns": columns})
-            return tables
+            return self._get_cached_catalog(conn_data)
         except Exception as e:
             print(f"ERROR: Failed to fetch source tables: {e}")
             return []
 
-    def _get_oracle_metadata(self, engine, schema):
+    def _harvest_catalog(self, engine, conn_data, table_names=None):
+        # Use raw SQL for Oracle as Inspector is having issues
+        if conn_data.type == 'ORACLE':
+            return self._get_oracle_metadata(engine, conn_data.username.upper(), table_names)
+
+        # Fallback for others (or if we fix Inspector)
+        return self._get_inspector_metadata(engine, table_names)
+
+    def _get_inspector_metadata(self, engine, table_names=None):
+        # Bulk reflection: columns, PKs and comments for the whole schema (or the given
+        # tables) in a few queries instead of one get_columns call per table.
+        inspector = inspect(engine)
+        filter_names = list(table_names) if table_names is not None else None
+
+        multi_columns = inspector.get_multi_columns(filter_names=filter_names)
+        multi_pks = inspector.get_multi_pk_constraint(filter_names=filter_names)
+        try:
+            multi_comments = inspector.get_multi_table_comment(filter_names=filter_names)
+        except NotImplementedError:
+            # e.g. SQLite has no table comments
+            multi_comments = {}
+
         tables = []
+        for key in sorted(multi_columns, key=lambda k: k[1]):
+            t_name = key[1]
+            pk_cols = set((multi_pks.get(key) or {}).get('constrained_columns') or [])
+            columns = []
+            for col in multi_columns[key]:
+                col_type = col['type']
+                columns.append({
+                    "name": col['name'],
+                    "type": self._type_string(col_type, engine.dialect),
+                    "precision": getattr(col_type, 'precision', None),
+                    "scale": getattr(col_type, 'scale', None),
+                    "length": getattr(col_type, 'length', None),
+                    "pk": col['name'] in pk_cols,
+                    "nullable": col.get('nullable', True),
+                    "comment": col.get('comment')
+                })
+            t_comment = (multi_comments.get(key) or {}).get('text')
+            tables.append({"table_name": t_name, "comment": t_comment, "columns": columns})
+        return tables
+
+    def _type_string(self, col_type, dialect):
+        # Render with the connection's dialect so e.g. TIMESTAMP keeps its precision and time zone
+        try:
+            return col_type.compile(dialect=dialect)
+        except Exception:
+            return str(col_type)
+
+    def _get_oracle_metadata(self, engine, schema, table_names=None):
+        # Harvest the whole schema in a fixed number of queries (tables, columns, PKs)
+        # and group the rows in Python instead of querying per table.
+        # When table_names is given, only those tables are harvested (in chunks of 1000,
+        # Oracle's IN-list limit).
+        if table_names is None:
+            chunks = [None]
+        else:
+            table_names = list(table_names)
+            chunks = [table_names[i:i + 1000] for i in range(0, len(table_names), 1000)]
+
+        table_rows, column_rows, pk_rows = [], [], []
         with engine.connect() as conn:
-            # Get Tables with Comments
-            t_result = conn.execute(text("""
-                SELECT t.table_name, c.comments 
-                FROM all_tables t
-                LEFT JOIN all_tab_comments c ON t.owner = c.owner AND t.table_name = c.table_name
-                WHERE t.owner = :schema 
-                ORDER BY t.table_name
-            """), {"schema": schema})
-            
-            table_rows = t_result.fetchall()
-            
-            for t_row in table_rows:
-                t_name = t_row[0]
-                t_comment = t_row[1]
-                
-                # Get Columns with Comments
-                c_result = conn.execute(text("""
-                    SELECT c.column_name, c.data_type, c.nullable, com.comments
+            for chunk in chunks:
+                params = {"schema": schema}
+                t_filter = c_filter = pk_filter = ""
+                if chunk is not None:
+                    params["names"] = chunk
+                    t_filter = "AND t.table_name IN :names"
+                    c_filter = "AND c.table_name IN :names"
+                    pk_filter = "AND cons.table_name IN :names"
+
+                # Get Tables with Comments
+                t_query = text(f"""
+                    SELECT t.table_name, c.comments 
+                    FROM all_tables t
+                    LEFT JOIN all_tab_comments c ON t.owner = c.owner AND t.table_name = c.table_name
+                    WHERE t.owner = :schema {t_filter}
+                    ORDER BY t.table_name
+                """)
+
+                # Get Columns with Comments for every requested table.
+                # char_length is the declared length in characters (0 for non-character types)
+                c_query = text(f"""
+                    SELECT c.table_name, c.column_name, c.data_type, c.data_precision, c.data_scale,
+                           CASE WHEN c.char_length > 0 THEN c.char_length END AS char_length,
+                           c.nullable, com.comments
                     FROM all_tab_columns c
                     LEFT JOIN all_col_comments com ON c.owner = com.owner 
                         AND c.table_name = com.table_name 
                         AND c.column_name = com.column_name
-                    WHERE c.owner = :schema AND c.table_name = :table_name 
-                    ORDER BY c.column_id
-                """), {"schema": schema, "table_name": t_name})
-                
-                # Get PKs
-                pk_result = conn.execute(text("""
-                    SELECT cols.column_name
+                    WHERE c.owner = :schema {c_filter}
+                    ORDER BY c.table_name, c.column_id
+                """)
+
+                # Get PKs for every requested table
+                pk_query = text(f"""
+                    SELECT cols.table_name, cols.column_name
                     FROM all_constraints cons
                     JOIN all_cons_columns cols ON cons.constraint_name = cols.constraint_name AND cons.owner = cols.owner
-                    WHERE cons.owner = :schema 
-                    AND cons.table_name = :table_name 
+                    WHERE cons.owner = :schema {pk_filter}
                     AND cons.constraint_type = 'P'
-                """), {"schema": schema, "table_name": t_name})
-                pks = [row[0] for row in pk_result]
-                
-                columns = []
-                for row in c_result:
-                    columns.append({
-                        "name": row[0],
-                        "type": row[1],
-                        "pk": row[0] in pks,
-                        "nullable": row[2] == 'Y',
-                        "comment": row[3]
-                    })
-                tables.append({
-                    "table_name": t_name, 
-                    "comment": t_comment,
-                    "columns": columns
-                })
+                """)
+
+                if chunk is not None:
+                    t_query = t_query.bindparams(bindparam("names", expanding=True))
+                    c_query = c_query.bindparams(bindparam("names", expanding=True))
+                    pk_query = pk_query.bindparams(bindparam("names", expanding=True))
+
+                table_rows.extend(conn.execute(t_query, params).fetchall())
+                column_rows.extend(conn.execute(c_query, params).fetchall())
+                pk_rows.extend(conn.execute(pk_query, params).fetchall())
+
+        return self._group_oracle_metadata(table_rows, column_rows, pk_rows)
+
+    def _group_oracle_metadata(self, table_rows, column_rows, pk_rows):
+        pks = {}
+        for t_name, c_name in pk_rows:
+            pks.setdefault(t_name, set()).add(c_name)
+
+        columns_by_table = {}
+        for t_name, c_name, c_type, c_precision, c_scale, c_length, c_nullable, c_comment in column_rows:
+            columns_by_table.setdefault(t_name, []).append({
+                "name": c_name,
+                "type": c_type,
+                "precision": int(c_precision) if c_precision is not None else None,
+                "scale": int(c_scale) if c_scale is not None else None,
+                "length": int(c_length) if c_length else None,
+                "pk": c_name in pks.get(t_name, ()),
+                "nullable": c_nullable == 'Y',
+                "comment": c_comment
+            })
+
+        tables = []
+        for t_name, t_comment in table_rows:
+            tables.append({
+                "table_name": t_name, 
+                "comment": t_comment,
+                "columns": columns_by_table.get(t_name, [])
+            })
         return tables
 
     def get_real_target_tables(self):
@@ -201,28 +275,383 @@ class MetadataService:
         if not conn_data: return []
 
         try:
-            engine = self._get_engine(conn_data)
-            inspector = inspect(engine)
-            table_names = inspector.get_table_names()
-            
-            tables = []
-            for t_name in table_names:
-                columns = []
-                for col in inspector.get_columns(t_name):
-                    columns.append({
-                        "name": col['name'],
-                        "type": str(col['type']),
-                        "pk": col.get('primary_key', False),
-                        "nullable": col.get('nullable', True),
-                        "comment": col.get('comment')
-                    })
-                # Format to match template expectation (schema_info as list of cols)
-                tables.append({"table_name": t_name, "schema_info": columns})
-            return tables
+            tables = self._get_cached_catalog(conn_data)
+            # Format to match template expectation (schema_info as list of cols)
+            return [{"table_name": t['table_name'], "schema_info": t['columns']} for t in tables]
         except Exception as e:
             print(f"ERROR: Failed to fetch target tables: {e}")
             return []
 
+    def _get_change_markers(self, engine, conn_data, table_name=None):
+        # One cheap query returning {table_name: marker}. The marker moves whenever
+        # the table's definition changes. Returns None if the database has no such marker.
+        params = {}
+        if conn_data.type == 'ORACLE':
+            t_filter = "AND object_name = :table_name" if table_name else ""
+            query = text(f"""
+                SELECT object_name, TO_CHAR(last_ddl_time, 'YYYYMMDDHH24MISS')
+                FROM all_objects
+                WHERE owner = :schema
+                AND object_type = 'TABLE'
+                AND object_name NOT LIKE 'BIN$%'
+                {t_filter}
+            """)
+            params["schema"] = conn_data.username.upper()
+        elif conn_data.type == 'POSTGRES':
+            # pg_class/pg_attribute rows get a new xmin on ALTER TABLE, pg_description
+            # on COMMENT ON and pg_constraint on PK changes.
+            t_filter = "AND c.relname = :table_name" if table_name else ""
+            query = text(f"""
+                SELECT c.relname,
+                       md5(c.xmin::text
+                           || '|' || string_agg(a.attnum::text || ':' || a.xmin::text, ',' ORDER BY a.attnum)
+                           || '|' || COALESCE((SELECT string_agg(d.objsubid::text || ':' || d.xmin::text, ',' ORDER BY d.objsubid)
+                                               FROM pg_description d WHERE d.objoid = c.oid), '')
+                           || '|' || COALESCE((SELECT string_agg(p.xmin::text, ',' ORDER BY p.oid)
+                                               FROM pg_constraint p WHERE p.conrelid = c.oid AND p.contype = 'p'), ''))
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+                WHERE n.nspname = current_schema()
+                AND c.relkind IN ('r', 'p')
+                {t_filter}
+                GROUP BY c.oid, c.relname, c.xmin
+            """)
+        else:
+            return None
+
+        if table_name:
+            params["table_name"] = table_name
+
+        with engine.connect() as conn:
+            return {row[0]: row[1] for row in conn.execute(query, params)}
+
+    def _sync_catalog(self, conn_data):
+        # A sync abandoned by a timed-out request keeps running in the background; a second
+        # one would collide with it on (connection_id, table_name), so it is skipped and the
+        # caller reads the cache that the running sync is refreshing.
+        with self._sync_locks_guard:
+            lock = self._sync_locks.setdefault(conn_data.id, threading.Lock())
+        if not lock.acquire(blocking=False):
+            print(f"DEBUG: Catalog sync already running for connection {conn_data.id}, using the cache.")
+            return
+        try:
+            self._sync_catalog_entries(conn_data)
+        finally:
+            lock.release()
+
+    def _sync_catalog_entries(self, conn_data):
+        # Bring tb_etl_meta_cache up to date, re-harvesting only tables whose
+        # change marker moved since the last sync.
+        engine = self._get_engine(conn_data)
+        cached = {
+            c.table_name: c for c in EtlCatalogCache.query.filter_by(connection_id=conn_data.id)
+                .options(load_only(EtlCatalogCache.table_name, EtlCatalogCache.ddl_marker)).all()
+        }
+        markers = self._get_change_markers(engine, conn_data)
+
+        if markers is None:
+            # No change markers available: always harvest everything
+            harvested = self._harvest_catalog(engine, conn_data)
+            markers = {t['table_name']: None for t in harvested}
+        else:
+            changed = [name for name, marker in markers.items()
+                       if name not in cached or cached[name].ddl_marker != marker]
+            if not changed:
+                harvested = []
+            elif not cached or len(changed) > 1000:
+                # Full harvest is a fixed number of queries, cheaper than many IN-list chunks
+                harvested = [t for t in self._harvest_catalog(engine, conn_data) if t['table_name'] in markers]
+            else:
+                harvested = self._harvest_catalog(engine, conn_data, changed)
+
+        self._store_catalog_entries(conn_data, cached, harvested, markers)
+
+        try:
+            self._refresh_stats(conn_data, engine)
+        except Exception as e:
+            # Statistics are advisory; a missing grant must not break the catalog
+            print(f"WARN: Failed to refresh table statistics for connection {conn_data.id}: {e}")
+
+    def _get_table_stats(self, engine, conn_data):
+        # {table_name: (num_rows, avg_row_len, size_bytes)} from optimizer statistics and
+        # segment sizes, in one or two queries. Returns None if the database has no such views.
+        if conn_data.type == 'ORACLE':
+            schema = conn_data.username.upper()
+            with engine.connect() as conn:
+                stats = {
+                    t_name: [num_rows, avg_row_len, None] for t_name, num_rows, avg_row_len in conn.execute(text("""
+                        SELECT table_name, num_rows, avg_row_len FROM all_tables WHERE owner = :schema
+                    """), {"schema": schema})
+                }
+                segments_sql = """
+                    SELECT segment_name, SUM(bytes) FROM {view}
+                    WHERE segment_type IN ('TABLE', 'TABLE PARTITION', 'TABLE SUBPARTITION') {owner_filter}
+                    GROUP BY segment_name
+                """
+                try:
+                    rows = conn.execute(text(segments_sql.format(view='dba_segments', owner_filter="AND owner = :schema")),
+                                        {"schema": schema}).fetchall()
+                except Exception:
+                    # No SELECT on dba_segments: the connected user's own segments
+                    rows = conn.execute(text(segments_sql.format(view='user_segments', owner_filter=""))).fetchall()
+                for t_name, size_bytes in rows:
+                    if t_name in stats:
+                        stats[t_name][2] = size_bytes
+            return {name: tuple(values) for name, values in stats.items()}
+
+        if conn_data.type == 'POSTGRES':
+            # Partitioned parents hold no rows themselves: add up their partitions
+            query = text("""
+                SELECT c.relname,
+                       CASE WHEN c.relkind = 'p'
+                            THEN (SELECT SUM(GREATEST(pc.reltuples, 0))::bigint FROM pg_inherits i
+                                  JOIN pg_class pc ON pc.oid = i.inhrelid WHERE i.inhparent = c.oid)
+                            WHEN c.reltuples < 0 THEN NULL
+                            ELSE c.reltuples::bigint END,
+                       CASE WHEN c.relkind = 'p'
+                            THEN (SELECT SUM(pg_total_relation_size(i.inhrelid)) FROM pg_inherits i WHERE i.inhparent = c.oid)
+                            ELSE pg_total_relation_size(c.oid) END
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = current_schema()
+                AND c.relkind IN ('r', 'p')
+            """)
+            with engine.connect() as conn:
+                return {
+                    t_name: (num_rows, int(size_bytes) // num_rows if num_rows and size_bytes else None, size_bytes)
+                    for t_name, num_rows, size_bytes in conn.execute(query)
+                }
+        return None
+
+    def _refresh_stats(self, conn_data, engine=None, force=False):
+        # Statistics move without DDL, so they are refreshed on an interval rather than by marker
+        interval = current_app.config.get('STATS_REFRESH_INTERVAL', 3600)
+        cutoff = datetime.utcnow() - timedelta(seconds=interval)
+        stale = EtlCatalogCache.query.filter(
+            EtlCatalogCache.connection_id == conn_data.id,
+            or_(EtlCatalogCache.stats_at.is_(None), EtlCatalogCache.stats_at < cutoff)
+        ).with_entities(EtlCatalogCache.id).first()
+        if not force and not stale:
+            return
+
+        stats = self._get_table_stats(engine or self._get_engine(conn_data), conn_data)
+        if stats is None:
+            return
+
+        now = datetime.utcnow()
+        rows = []
+        for entry_id, t_name in db.session.query(EtlCatalogCache.id, EtlCatalogCache.table_name) \
+                .filter(EtlCatalogCache.connection_id == conn_data.id):
+            num_rows, avg_row_len, size_bytes = stats.get(t_name, (None, None, None))
+            rows.append({"id": entry_id, "num_rows": num_rows, "avg_row_len": avg_row_len,
+                         "size_bytes": size_bytes, "stats_at": now})
+        if rows:
+            # Bulk UPDATE by primary key, one executemany
+            db.session.execute(update(EtlCatalogCache), rows)
+            db.session.commit()
+
+    def get_table_stats(self, role, table_name):
+        # Row count / size estimates from the catalog cache (no database round-trip)
+        conn_data = self._get_connection_by_role(role)
+        if not conn_data or not table_name: return None
+        entry = EtlCatalogCache.query.filter_by(connection_id=conn_data.id, table_name=table_name).first()
+        return self._entry_stats(entry) if entry else None
+
+    def get_tables_stats(self, role, table_names):
+        # {table_name: stats} for many tables, IN-list reads of the stats columns only
+        conn_data = self._get_connection_by_role(role)
+        if not conn_data: return {}
+        names = sorted(set(n for n in table_names if n))
+        stats = {}
+        for i in range(0, len(names), 1000):
+            entries = EtlCatalogCache.query.options(load_only(
+                EtlCatalogCache.table_name, EtlCatalogCache.num_rows, EtlCatalogCache.avg_row_len,
+                EtlCatalogCache.size_bytes, EtlCatalogCache.stats_at)) \
+                .filter(EtlCatalogCache.connection_id == conn_data.id,
+                        EtlCatalogCache.table_name.in_(names[i:i + 1000]))
+            for entry in entries:
+                stats[entry.table_name] = self._entry_stats(entry)
+        return stats
+
+    def suggest_parallel_degree(self, stats):
+        # One chunk per TRANSFER_CHUNK_BYTES of source data, capped at TRANSFER_MAX_PARALLEL
+        if not stats:
+            return 1
+        size_bytes = stats.get('size_bytes')
+        if not size_bytes and stats.get('num_rows') and stats.get('avg_row_len'):
+            size_bytes = stats['num_rows'] * stats['avg_row_len']
+        if not size_bytes:
+            return 1
+        chunk_bytes = current_app.config.get('TRANSFER_CHUNK_BYTES', 256 * 1024 * 1024)
+        max_degree = current_app.config.get('TRANSFER_MAX_PARALLEL', 8)
+        return max(1, min(max_degree, math.ceil(size_bytes / chunk_bytes)))
+
+    def _entry_stats(self, entry):
+        return {
+            "num_rows": entry.num_rows,
+            "avg_row_len": entry.avg_row_len,
+            "size_bytes": entry.size_bytes,
+            "stats_at": entry.stats_at.isoformat() if entry.stats_at else None
+        }
+
+    def _get_cached_catalog(self, conn_data):
+        self._sync_catalog(conn_data)
+        entries = EtlCatalogCache.query.filter_by(connection_id=conn_data.id).order_by(EtlCatalogCache.table_name).all()
+        return [self._cache_entry_to_table(e) for e in entries]
+
+    def sync_catalogs(self, roles, timeout=None):
+        # Sync several catalogs concurrently, each in its own thread and app context.
+        # Returns {role: error message} for every role that failed or timed out.
+        app = current_app._get_current_object()
+
+        def sync_role(role):
+            with app.app_context():
+                conn_data = self._get_connection_by_role(role)
+                if conn_data:
+                    self._sync_catalog(conn_data)
+
+        errors = {}
+        executor = ThreadPoolExecutor(max_workers=len(roles))
+        try:
+            futures = {role: executor.submit(sync_role, role) for role in roles}
+            # One deadline for all roles, not one per role
+            done, _ = wait(futures.values(), timeout=timeout)
+            for role, future in futures.items():
+                if future not in done:
+                    errors[role] = f"Timed out after {timeout} seconds"
+                elif future.exception() is not None:
+                    errors[role] = str(future.exception())
+                if role in errors:
+                    print(f"ERROR: Failed to sync {role.lower()} catalog: {errors[role]}")
+        finally:
+            # Don't block the request on a slow side; it finishes in the background
+            executor.shutdown(wait=False)
+        return errors
+
+    def list_tables(self, role, search=None, after=None, limit=50, refresh=True):
+        # Keyset-paginated table list (name, comment, column count) without column details.
+        # The catalog is synced only when the first page is requested.
+        conn_data = self._get_connection_by_role(role)
+        if not conn_data: return [], None
+
+        if refresh and not after:
+            try:
+                self._sync_catalog(conn_data)
+            except Exception as e:
+                print(f"ERROR: Failed to sync {role.lower()} catalog: {e}")
+
+        query = EtlCatalogCache.query.filter_by(connection_id=conn_data.id)
+        if after:
+            query = query.filter(EtlCatalogCache.table_name > after)
+        if search:
+            pattern = f'%{like_pattern(search)}%'
+            query = query.filter(or_(EtlCatalogCache.table_name.ilike(pattern, escape='\\'),
+                                     EtlCatalogCache.table_comment.ilike(pattern, escape='\\')))
+        entries = query.order_by(EtlCatalogCache.table_name).limit(limit + 1).all()
+
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        tables = [{
+            "table_name": e.table_name,
+            "comment": e.table_comment,
+            "column_count": len(json.loads(e.schema_info or '[]')),
+            "num_rows": e.num_rows,
+            "size_bytes": e.size_bytes
+        } for e in entries]
+
+        if role == 'SOURCE' and tables:
+            # Flag tables that already exist in the target catalog
+            target_conn = self._get_connection_by_role('TARGET')
+            existing = set()
+            if target_conn:
+                existing = {name for (name,) in db.session.query(EtlCatalogCache.table_name).filter(
+                    EtlCatalogCache.connection_id == target_conn.id,
+                    EtlCatalogCache.table_name.in_([t['table_name'] for t in tables]))}
+            for t in tables:
+                t['exists_in_target'] = t['table_name'] in existing
+
+        next_after = tables[-1]['table_name'] if has_more else None
+        return tables, next_after
+
+    def _store_catalog_entries(self, conn_data, cached, harvested, markers):
+        # Upsert harvested tables into the cache and evict tables missing from markers
+        stale = [name for name in cached if name not in markers]
+        if not harvested and not stale:
+            return
+
+        now = datetime.utcnow()
+        for t in harvested:
+            entry = cached.get(t['table_name'])
+            if not entry:
+                entry = EtlCatalogCache(connection_id=conn_data.id, table_name=t['table_name'])
+                db.session.add(entry)
+                cached[t['table_name']] = entry
+            entry.table_comment = t.get('comment')
+            entry.schema_info = json.dumps(t['columns'])
+            entry.ddl_marker = markers.get(t['table_name'])
+            entry.synced_at = now
+
+        for name in stale:
+            db.session.delete(cached.pop(name))
+
+        db.session.commit()
+        print(f"DEBUG: Catalog cache for connection {conn_data.id} refreshed {len(harvested)} table(s).")
+
+    def _cache_entry_to_table(self, entry):
+        return {
+            "table_name": entry.table_name,
+            "comment": entry.table_comment,
+            "columns": json.loads(entry.schema_info or '[]'),
+            "stats": self._entry_stats(entry)
+        }
+
+    def get_table(self, role, table_name):
+        # Reflect exactly one table (columns, comments, PKs) for the connection in the given role.
+        # Served from the catalog cache when the table's change marker has not moved.
+        conn_data = self._get_connection_by_role(role)
+        if not conn_data or not table_name: return None
+
+        try:
+            engine = self._get_engine(conn_data)
+            entry = EtlCatalogCache.query.filter_by(connection_id=conn_data.id, table_name=table_name).first()
+            cached = {table_name: entry} if entry else {}
+
+            markers = self._get_change_markers(engine, conn_data, table_name)
+            if markers is not None and entry and entry.ddl_marker == markers.get(table_name):
+                return self._cache_entry_to_table(entry)
+
+            harvested = [t for t in self._harvest_catalog(engine, conn_data, [table_name]) if t['table_name'] == table_name]
+            if markers is None:
+                markers = {t['table_name']: None for t in harvested}
+            self._store_catalog_entries(conn_data, cached, harvested, markers)
+
+            return self._cache_entry_to_table(cached[table_name]) if table_name in cached else None
+        except Exception as e:
+            print(f"ERROR: Failed to fetch {role.lower()} table {table_name}: {e}")
+            return None
+
+    def get_tables(self, role, table_names=None, refresh=True):
+        # Many tables at once ({table_name: table}): one catalog sync, then IN-list reads from the cache
+        conn_data = self._get_connection_by_role(role)
+        if not conn_data: return {}
+
+        if refresh:
+            try:
+                self._sync_catalog(conn_data)
+            except Exception as e:
+                print(f"ERROR: Failed to sync {role.lower()} catalog: {e}")
+
+        query = EtlCatalogCache.query.filter_by(connection_id=conn_data.id)
+        if table_names is None:
+            return {e.table_name: self._cache_entry_to_table(e) for e in query}
+        names = sorted(set(table_names))
+        tables = {}
+        for i in range(0, len(names), 1000):
+            for entry in query.filter(EtlCatalogCache.table_name.in_(names[i:i + 1000])):
+                tables[entry.table_name] = self._cache_entry_to_table(entry)
+        return tables
+
     def get_target_tables_metadata(self):
         # Renamed old method to distinguish from real DB fetch
         targets = EtlMetadata.query.filter_by(db_type='POSTGRES').order_by(EtlMetadata.id.desc()).all()
@@ -234,12 +663,13 @@ class MetadataService:
                 
         return [{"id": t.id, "table_name": t.table_name, "schema_info": json.loads(t.schema_info)} for t in unique_targets.values()]
 
-    def save_target_table(self, table_name, columns):
+    def save_target_table(self, table_name, columns, options=None):
         # Check if exists
         existing = EtlMetadata.query.filter_by(table_name=table_name, db_type='POSTGRES').first()
         
         if existing:
             existing.schema_info = json.dumps(columns)
+            existing.ddl_options = json.dumps(options) if options else None
             existing.etl_cry_dtm = datetime.utcnow()
             db.session.commit()
             return existing
@@ -248,20 +678,21 @@ class MetadataService:
             table_name=table_name,
             db_type='POSTGRES',
             schema_info=json.dumps(columns),
+            ddl_options=json.dumps(options) if options else None,
             etl_cry_dtm=datetime.utcnow()
         )
         db.session.add(new_target)
         db.session.commit()
         return new_target
 
-    def create_target_from_source(self, source_table_name, source_columns):
-        # Force Uppercase for Table Name
-        source_table_name = source_table_name.upper()
-        
-        # Convert Oracle types to Postgres types (Simple mapping)
+    def to_target_columns(self, source_columns, overrides=None):
+        # Convert Oracle types to the narrowest matching Postgres types (see TypeMapService)
+        if overrides is None:
+            overrides = TypeMapService().get_overrides()
         target_columns = []
         for col in source_columns:
-            pg_type = self._map_oracle_to_postgres(col['type'])
+            pg_type = self._map_oracle_to_postgres(col['type'], col.get('precision'), col.get('scale'),
+                                                   col.get('length'), overrides)
             target_columns.append({
                 "name": col['name'].upper(), # Force Uppercase for Column Name
                 "type": pg_type,
@@ -269,32 +700,282 @@ class MetadataService:
                 "nullable": col['nullable'],
                 "comment": col.get('comment')
             })
+        return target_columns
+
+    def create_target_from_source(self, source_table_name, source_columns, options=None):
+        # Force Uppercase for Table Name
+        source_table_name = source_table_name.upper()
+        
+        target_columns = self.to_target_columns(source_columns)
+        options = self.resolve_ddl_options(options, [source_table_name]).get(source_table_name)
         
         # Save metadata first
-        saved_target = self.save_target_table(source_table_name, target_columns)
+        saved_target = self.save_target_table(source_table_name, target_columns, options)
         
         # Physical Creation
-        self.create_table_in_target_db(source_table_name, target_columns)
+        self.create_table_in_target_db(source_table_name, target_columns, options)
         
         return saved_target
 
-    def generate_target_ddl(self, table_name, columns):
+    def resolve_ddl_options(self, options, table_names):
+        # Expand copy_indexes into the source's secondary indexes, per table
+        if not options:
+            return {}
+        options = {k: v for k, v in options.items() if v not in (None, '', {}, [])}
+        copy_indexes = options.pop('copy_indexes', False)
+        source_indexes = self.get_source_indexes(table_names) if copy_indexes else {}
+
+        resolved = {}
+        for name in table_names:
+            table_options = dict(options)
+            if copy_indexes:
+                table_options['indexes'] = source_indexes.get(name, [])
+            resolved[name] = table_options
+        return resolved
+
+    def parse_ddl_options(self, form):
+        # Build DDL options from the create/preview form fields
+        options = {}
+        if form.get('unlogged'):
+            options['unlogged'] = True
+        if form.get('fillfactor'):
+            fillfactor = str(form.get('fillfactor')).strip()
+            if not fillfactor.isdigit() or not 10 <= int(fillfactor) <= 100:
+                raise ValueError(f"Fillfactor must be a whole number between 10 and 100, got '{fillfactor}'")
+            options['storage'] = {"fillfactor": int(fillfactor)}
+        if form.get('copy_indexes'):
+            options['copy_indexes'] = True
+        if form.get('defer_indexes'):
+            options['defer_indexes'] = True
+
+        partition_type = (form.get('partition_type') or '').upper()
+        partition_column = (form.get('partition_column') or '').strip().upper()
+        if partition_type in ('RANGE', 'LIST') and partition_column:
+            # One partition per line: "P2024: 2024-01-01, 2025-01-01" (RANGE) or "P_KR: KR, JP" (LIST)
+            partitions = []
+            for line in (form.get('partitions') or '').splitlines():
+                if ':' not in line:
+                    continue
+                name, values = line.split(':', 1)
+                values = [v.strip() for v in values.split(',') if v.strip()]
+                if partition_type == 'RANGE':
+                    if len(values) != 2:
+                        raise ValueError(f"Range partition '{name.strip()}' needs a lower and an upper bound")
+                    partitions.append({"name": name.strip().upper(), "from": values[0], "to": values[1]})
+                else:
+                    partitions.append({"name": name.strip().upper(), "values": values})
+            options['partition'] = {"type": partition_type, "column": partition_column,
+                                    "partitions": partitions, "default": True}
+        return options
+
+    def get_source_indexes(self, table_names):
+        # Secondary indexes of the given source tables: {table_name: [{"name", "columns", "unique"}]}.
+        # Indexes backing the primary key and function-based indexes are skipped.
+        conn_data = self._get_connection_by_role('SOURCE')
+        if not conn_data or not table_names:
+            return {}
+        engine = self._get_engine(conn_data)
+        table_names = list(table_names)
+
+        indexes = {}
+        if conn_data.type != 'ORACLE':
+            inspector = inspect(engine)
+            multi_pks = inspector.get_multi_pk_constraint(filter_names=table_names)
+            for (schema, t_name), t_indexes in inspector.get_multi_indexes(filter_names=table_names).items():
+                pk_cols = (multi_pks.get((schema, t_name)) or {}).get('constrained_columns') or []
+                for idx in t_indexes:
+                    if None in idx['column_names'] or idx['column_names'] == pk_cols:
+                        continue
+                    indexes.setdefault(t_name, []).append(
+                        {"name": idx['name'], "columns": idx['column_names'], "unique": bool(idx.get('unique'))})
+            return indexes
+
+        query = text("""
+            SELECT i.table_name, i.index_name, i.uniqueness, ic.column_name
+            FROM all_indexes i
+            JOIN all_ind_columns ic ON ic.index_owner = i.owner AND ic.index_name = i.index_name
+            WHERE i.table_owner = :schema
+            AND i.table_name IN :names
+            AND i.index_type IN ('NORMAL', 'BITMAP')
+            AND NOT EXISTS (
+                SELECT 1 FROM all_constraints c
+                WHERE c.owner = i.table_owner AND c.index_name = i.index_name AND c.constraint_type = 'P'
+            )
+            ORDER BY i.table_name, i.index_name, ic.column_position
+        """).bindparams(bindparam("names", expanding=True))
+
+        by_name = {}
+        with engine.connect() as conn:
+            for i in range(0, len(table_names), 1000):
+                params = {"schema": conn_data.username.upper(), "names": table_names[i:i + 1000]}
+                for t_name, i_name, uniqueness, c_name in conn.execute(query, params):
+                    idx = by_name.get((t_name, i_name))
+                    if not idx:
+                        idx = {"name": i_name, "columns": [], "unique": uniqueness == 'UNIQUE'}
+                        by_name[(t_name, i_name)] = idx
+                        indexes.setdefault(t_name, []).append(idx)
+                    idx['columns'].append(c_name)
+        return indexes
+
+    def provision_targets(self, tables=None, pattern=None, batch_size=200, parallel=1, ddl_options=None):
+        # Create many target tables from the source catalog in one operation.
+        # Metadata is saved in a single transaction, DDL runs in batches of batch_size tables
+        # (one transaction per batch, a savepoint per table) and batches can run in parallel.
+        # Returns one {"table_name", "status", "message"} entry per requested table.
+        source_conn = self._get_connection_by_role('SOURCE')
+        target_conn = self._get_connection_by_role('TARGET')
+        if not source_conn or not target_conn:
+            raise ValueError("Both Source and Target connections must be configured")
+
+        self._sync_catalog(source_conn)
+        query = EtlCatalogCache.query.filter_by(connection_id=source_conn.id)
+        if tables:
+            names = [t.strip().upper() for t in tables if t and t.strip()]
+            entries = []
+            for i in range(0, len(names), 1000):
+                entries.extend(query.filter(EtlCatalogCache.table_name.in_(names[i:i + 1000])))
+        elif pattern:
+            names = None
+            entries = query.filter(EtlCatalogCache.table_name.like(like_pattern(pattern.strip().upper()), escape='\\'))
+        else:
+            raise ValueError("Specify tables or a pattern")
+        sources = {e.table_name: json.loads(e.schema_info or '[]') for e in sorted(entries, key=lambda e: e.table_name)}
+
+        results = {}
+        for name in names or []:
+            if name not in sources:
+                results[name] = {"table_name": name, "status": "not_found", "message": "Source table not found"}
+
+        overrides = TypeMapService().get_overrides()
+        targets = {name: self.to_target_columns(columns, overrides) for name, columns in sources.items()}
+        options = self.resolve_ddl_options(ddl_options, list(targets))
+        self._save_target_tables(targets, options)
+
+        engine = self._get_engine(target_conn)
+        items = [(name, columns, options.get(name)) for name, columns in targets.items()]
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        if parallel and parallel > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                for batch_results in executor.map(lambda b: self._provision_batch(engine, b), batches):
+                    results.update(batch_results)
+        else:
+            for batch in batches:
+                results.update(self._provision_batch(engine, batch))
+
+        created = sum(1 for r in results.values() if r['status'] == 'created')
+        print(f"DEBUG: Provisioned {created}/{len(results)} target table(s) in {len(batches)} batch(es).")
+        return [results[name] for name in (names or sorted(results))]
+
+    def _save_target_tables(self, targets, options=None):
+        # Upsert tb_etl_meta_mst rows for all tables with one lookup and one commit
+        if not targets:
+            return
+        existing = {}
+        names = list(targets)
+        for i in range(0, len(names), 1000):
+            for m in EtlMetadata.query.filter(EtlMetadata.db_type == 'POSTGRES',
+                                              EtlMetadata.table_name.in_(names[i:i + 1000])):
+                existing.setdefault(m.table_name, m)
+
+        now = datetime.utcnow()
+        for name, columns in targets.items():
+            entry = existing.get(name)
+            if not entry:
+                entry = EtlMetadata(table_name=name, db_type='POSTGRES')
+                db.session.add(entry)
+            entry.schema_info = json.dumps(columns)
+            entry.ddl_options = json.dumps(options[name]) if options and options.get(name) else None
+            entry.etl_cry_dtm = now
+        db.session.commit()
+
+    def _provision_batch(self, engine, batch):
+        results = {}
+        with engine.connect() as conn:
+            with conn.begin():
+                for table_name, columns, options in batch:
+                    savepoint = conn.begin_nested()
+                    try:
+                        conn.execute(text(self.generate_drop_ddl(table_name)))
+                        for statement in self.generate_table_statements(table_name, columns, options):
+                            conn.execute(text(statement))
+                        self._apply_comments(conn, table_name, columns)
+                        savepoint.commit()
+                        results[table_name] = {"table_name": table_name, "status": "created", "message": None}
+                    except Exception as e:
+                        savepoint.rollback()
+                        print(f"ERROR: Failed to create target table {table_name}: {e}")
+                        results[table_name] = {"table_name": table_name, "status": "failed", "message": str(e)}
+        return results
+
+    def _generate_comment_ddl(self, table_name, columns):
+        # Statements for text(): quotes doubled, colons escaped so they aren't read as bind parameters
+        statements = []
+        for col in columns:
+            if col.get('comment'):
+                comment = str(col['comment']).replace("'", "''").replace(':', '\\:')
+                statements.append(f'COMMENT ON COLUMN "{table_name.upper()}"."{col["name"].upper()}" IS \'{comment}\'')
+        return statements
+
+    def _apply_comments(self, conn, table_name, columns):
+        # COMMENT ON exists on Postgres and Oracle; other targets get a warning instead of silently losing them
+        comments = self._generate_comment_ddl(table_name, columns)
+        if not comments:
+            return
+        if conn.dialect.name == 'postgresql':
+            # All column comments of a table in one round-trip
+            conn.execute(text(";\n".join(comments)))
+        elif conn.dialect.name == 'oracle':
+            for statement in comments:
+                conn.execute(text(statement))
+        else:
+            print(f"WARN: Skipped {len(comments)} column comment(s) of {table_name}: "
+                  f"{conn.dialect.name} has no COMMENT ON.")
+
+    def generate_target_ddl(self, table_name, columns, options=None):
         # Generate DDL with formatting
-        # DROP TABLE "TABLE_NAME"
+        # DROP TABLE "TABLE_NAME";
         #
         # CREATE TABLE "TABLE_NAME" 
         # (
         # 	"COL1" TYPE PK
         #   , "COL2" TYPE
         # )
-        
+        # followed by partitions and indexes (deferred indexes are listed as post-load DDL)
+        options = options or {}
+        statements = [self.generate_drop_ddl(table_name)] + self.generate_table_statements(table_name, columns, options)
+        ddl = ";\n\n".join(statements) + ";"
+        if options.get('defer_indexes') and options.get('indexes'):
+            ddl += "\n\n-- Build after the initial load\n" + ";\n".join(self.generate_index_ddl(table_name, options)) + ";"
+        return ddl
+
+    def generate_table_statements(self, table_name, columns, options=None):
+        # CREATE TABLE, its partitions and (unless deferred) its secondary indexes
+        options = options or {}
+        statements = [self.generate_create_ddl(table_name, columns, options)]
+        statements.extend(self.generate_partition_ddl(table_name, options))
+        if not options.get('defer_indexes'):
+            statements.extend(self.generate_index_ddl(table_name, options))
+        return statements
+
+    def generate_create_ddl(self, table_name, columns, options=None):
+        options = options or {}
         table_name_upper = table_name.upper()
-        ddl_parts = [f'DROP TABLE IF EXISTS "{table_name_upper}"', "", f'CREATE TABLE "{table_name_upper}" \n(']
+        partition = options.get('partition')
+
+        pk_cols = [col['name'].upper() for col in columns if col['pk']]
+        if partition and pk_cols and partition['column'] not in pk_cols:
+            # Postgres requires the partition key in every unique constraint
+            pk_cols.append(partition['column'])
+        inline_pk = len(pk_cols) == 1
+
+        # Partitioned parents hold no data: UNLOGGED/storage apply to the partitions
+        unlogged = "UNLOGGED " if options.get('unlogged') and not partition else ""
+        ddl_parts = [f'CREATE {unlogged}TABLE "{table_name_upper}" \n(']
         
         for i, col in enumerate(columns):
             col_name = col['name'].upper()
             col_type = col['type']
-            pk_str = " PRIMARY KEY" if col['pk'] else ""
+            pk_str = " PRIMARY KEY" if col['pk'] and inline_pk else ""
             
             if i == 0:
                 # First column: Tab indentation
@@ -304,15 +985,83 @@ class MetadataService:
                 line = f'  , "{col_name}" {col_type}{pk_str}'
             
             ddl_parts.append(line)
+
+        if len(pk_cols) > 1:
+            pk_list = ', '.join(f'"{c}"' for c in pk_cols)
+            ddl_parts.append(f'  , PRIMARY KEY ({pk_list})')
             
         ddl_parts.append(" )")
+        if partition:
+            ddl_parts.append(f'PARTITION BY {partition["type"]} ("{partition["column"]}")')
+        elif options.get('storage'):
+            ddl_parts.append(self._storage_clause(options['storage']))
         
         return "\n".join(ddl_parts)
 
+    def generate_partition_ddl(self, table_name, options):
+        partition = (options or {}).get('partition')
+        if not partition:
+            return []
+
+        table_name_upper = table_name.upper()
+        unlogged = "UNLOGGED " if options.get('unlogged') else ""
+        storage = f" {self._storage_clause(options['storage'])}" if options.get('storage') else ""
+        statements = []
+        for p in partition.get('partitions') or []:
+            if partition['type'] == 'RANGE':
+                bounds = f"FROM ({self._partition_value(p['from'])}) TO ({self._partition_value(p['to'])})"
+            else:
+                bounds = f"IN ({', '.join(self._partition_value(v) for v in p['values'])})"
+            statements.append(f'CREATE {unlogged}TABLE "{table_name_upper}_{p["name"].upper()}" '
+                              f'PARTITION OF "{table_name_upper}" FOR VALUES {bounds}{storage}')
+        if partition.get('default'):
+            # Catch-all so rows outside the declared bounds don't fail the load
+            statements.append(f'CREATE {unlogged}TABLE "{table_name_upper}_DEFAULT" '
+                              f'PARTITION OF "{table_name_upper}" DEFAULT{storage}')
+        return statements
+
+    def generate_index_ddl(self, table_name, options):
+        table_name_upper = table_name.upper()
+        partition = (options or {}).get('partition')
+        statements = []
+        for idx in (options or {}).get('indexes') or []:
+            columns = [c.upper() for c in idx['columns']]
+            unique = idx.get('unique')
+            if unique and partition and partition['column'] not in columns:
+                print(f"WARN: Index {idx['name']} on partitioned {table_name_upper} created as non-unique "
+                      f"(partition key {partition['column']} not covered).")
+                unique = False
+            cols = ', '.join(f'"{c}"' for c in columns)
+            statements.append(f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{idx["name"].upper()}" '
+                              f'ON "{table_name_upper}" ({cols})')
+        return statements
+
+    def generate_drop_index_ddl(self, table_name, options):
+        return [f'DROP INDEX IF EXISTS "{idx["name"].upper()}"' for idx in (options or {}).get('indexes') or []]
+
+    def build_target_indexes(self, conn, table_name, options):
+        # Post-load index build for targets created with defer_indexes
+        for statement in self.generate_index_ddl(table_name, options):
+            conn.execute(text(statement))
+
+    def _storage_clause(self, storage):
+        params = []
+        for key, value in storage.items():
+            if not re.fullmatch(r'[a-z_]+', str(key).lower()) or not re.fullmatch(r'[A-Za-z0-9_.]+', str(value)):
+                raise ValueError(f"Invalid storage parameter: {key}={value}")
+            params.append(f"{str(key).lower()}={value}")
+        return f"WITH ({', '.join(params)})"
+
+    def _partition_value(self, value):
+        value = str(value).strip()
+        if value.upper() in ('MINVALUE', 'MAXVALUE') or re.fullmatch(r'-?\d+(\.\d+)?', value):
+            return value.upper()
+        return "'" + value.strip("'").replace("'", "''") + "'"
+
     def generate_drop_ddl(self, table_name):
         return f'DROP TABLE IF EXISTS "{table_name.upper()}"'
 
-    def create_table_in_target_db(self, table_name, columns):
+    def create_table_in_target_db(self, table_name, columns, options=None):
         conn_data = self._get_connection_by_role('TARGET')
         if not conn_data:
             print("ERROR: No Target connection found.")
@@ -321,26 +1070,22 @@ class MetadataService:
         try:
             engine = self._get_engine(conn_data)
             
-            ddl = self.generate_target_ddl(table_name, columns)
-            
             with engine.connect() as conn:
                 # Drop if exists to allow recreation
-                conn.execute(text(f"DROP TABLE IF EXISTS {table_name.upper()}"))
+                conn.execute(text(self.generate_drop_ddl(table_name)))
                 
-                conn.execute(text(ddl))
+                for statement in self.generate_table_statements(table_name, columns, options):
+                    conn.execute(text(statement))
                 conn.commit()
                 print(f"DEBUG: Created table {table_name} in Target DB.")
                 
                 # Add comments if available
-                for col in columns:
-                    if col.get('comment'):
-                        comment_sql = f"COMMENT ON COLUMN {table_name.upper()}.{col['name'].upper()} IS '{col['comment']}'"
-                        try:
-                            conn.execute(text(comment_sql))
-                        except Exception as ce:
-                            print(f"WARN: Failed to add comment for {col['name']}: {ce}")
-                
-                conn.commit()
+                try:
+                    self._apply_comments(conn, table_name, columns)
+                    conn.commit()
+                except Exception as ce:
+                    conn.rollback()
+                    print(f"WARN: Failed to add column comments for {table_name}: {ce}")
                 return True
                 
         except Exception as e:
@@ -367,11 +1112,5 @@ class MetadataService:
         print(f"DEBUG: Deleted count: {deleted_count}")
         return True
 
-    def _map_oracle_to_postgres(self, oracle_type):
-        oracle_type = oracle_type.upper()
-        if 'NUMBER' in oracle_type:
-            if ',' in oracle_type: return 'NUMERIC'
-            return 'INTEGER'
-        if 'VARCHAR2' in oracle_type: return 'VARCHAR'
-        if 'DATE' in oracle_type: return 'TIMESTAMP'
-        return 'TEXT' # Fallback
+    def _map_oracle_to_postgres(self, oracle_type, precision=None, scale=None, length=None, overrides=None):
+        return TypeMapService().map_type(oracle_type, precision, scale, length, overrides)
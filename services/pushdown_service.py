@@ -0,0 +1,195 @@
+import hashlib
+import json
+import re
+import threading
+from sqlalchemy.dialects.oracle.base import OracleDialect
+from sqlalchemy.dialects.postgresql.base import PGDialect
+from sqlalchemy.dialects.sqlite.base import SQLiteDialect
+
+DIALECTS = {
+    'oracle': OracleDialect,
+    'postgresql': PGDialect,
+    'sqlite': SQLiteDialect
+}
+
+# Connection types as stored in EtlConnection.type
+CONNECTION_DIALECTS = {
+    'ORACLE': 'oracle',
+    'POSTGRES': 'postgresql'
+}
+
+# Base type names (first word, without length/precision) per family; anything else, e.g.
+# INTERVAL or RAW, has no family and is never cast
+NUMBER_TYPES = {'NUMBER', 'NUMERIC', 'DECIMAL', 'INTEGER', 'INT', 'INT2', 'INT4', 'INT8', 'BIGINT', 'SMALLINT',
+                'FLOAT', 'FLOAT4', 'FLOAT8', 'DOUBLE', 'REAL', 'BINARY_FLOAT', 'BINARY_DOUBLE'}
+DATETIME_TYPES = {'DATE', 'TIMESTAMP', 'TIMESTAMPTZ', 'TIME', 'TIMETZ'}
+STRING_TYPES = {'CHAR', 'CHARACTER', 'NCHAR', 'BPCHAR', 'VARCHAR', 'VARCHAR2', 'NVARCHAR', 'NVARCHAR2',
+                'TEXT', 'CLOB', 'NCLOB'}
+
+def type_family(col_type):
+    # 'string', 'datetime', 'number' or None for a catalog column type (Oracle or Postgres)
+    base = re.match(r'\s*([A-Z][A-Z0-9_]*)', (col_type or '').upper())
+    if not base:
+        return None
+    base = base.group(1)
+    if base in STRING_TYPES:
+        return 'string'
+    if base in DATETIME_TYPES:
+        return 'datetime'
+    if base in NUMBER_TYPES:
+        return 'number'
+    return None
+
+class PushdownService:
+    """
+    Compiles an EtlMapping into a single source-side SELECT.
+    NVL defaults, CUSTOM expressions, full masks and type-family casts are inlined so
+    the source database does the work; unmapped columns are pruned. Rules that cannot
+    be expressed in the source dialect (e.g. positional masks) are returned as
+    python_rules for the ColumnPipeline.
+    Results are cached per mapping until its mapping_json (or the column types) change.
+    """
+    _cache = {}
+    _lock = threading.Lock()
+
+    def compile_mapping(self, mapping, dialect_name, source_columns=None, target_columns=None, where=None):
+        # source_columns/target_columns are catalog column lists (name/type/...), used for casts
+        source_types = {c['name'].upper(): c.get('type') for c in source_columns or []}
+        target_types = {c['name'].upper(): c.get('type') for c in target_columns or []}
+
+        fingerprint = hashlib.sha1(json.dumps(
+            [mapping.mapping_json, mapping.source_table.table_name, sorted(source_types.items()),
+             sorted(target_types.items())], default=str).encode('utf-8')).hexdigest()
+        key = (mapping.id, dialect_name)
+
+        with self._lock:
+            cached = self._cache.get(key)
+        if not cached or cached[0] != fingerprint:
+            compiled = self._compile(mapping, dialect_name, source_types, target_types)
+            with self._lock:
+                self._cache[key] = (fingerprint, compiled)
+        else:
+            compiled = cached[1]
+
+        compiled = dict(compiled)
+        if where:
+            compiled['sql'] = f"{compiled['sql']} WHERE {where}"
+        return compiled
+
+    def compile_for_connection(self, mapping, conn_type, source_columns=None, target_columns=None):
+        dialect_name = CONNECTION_DIALECTS.get((conn_type or '').upper(), 'oracle')
+        return self.compile_mapping(mapping, dialect_name, source_columns, target_columns)
+
+    @classmethod
+    def clear_cache(cls, mapping_id=None):
+        with cls._lock:
+            if mapping_id is None:
+                cls._cache.clear()
+            else:
+                for key in [k for k in cls._cache if k[0] == mapping_id]:
+                    del cls._cache[key]
+
+    def _get_rules(self, mapping):
+        mapping_data = json.loads(mapping.mapping_json)
+        # Older mappings store the list directly, newer ones as {"type": ..., "mappings": [...]}
+        mappings = mapping_data.get('mappings', []) if isinstance(mapping_data, dict) else mapping_data
+
+        rules = []
+        for m in mappings or []:
+            rule_type = (m.get('rule_type') or 'DIRECT').upper()
+            if not m.get('target_column'):
+                continue
+            # Unmapped target columns are pruned and left to the target default
+            if rule_type == 'CUSTOM' and not m.get('rule_detail') and not m.get('custom_sql'):
+                continue
+            if rule_type != 'CUSTOM' and not m.get('source_column'):
+                continue
+            rules.append({
+                "source_column": m.get('source_column'),
+                "target_column": m['target_column'],
+                "rule_type": rule_type,
+                "rule_detail": m.get('rule_detail') or m.get('custom_sql') or ''
+            })
+        return rules
+
+    def _compile(self, mapping, dialect_name, source_types, target_types):
+        dialect = DIALECTS.get(dialect_name, SQLiteDialect)()
+        quote = dialect.identifier_preparer.quote
+
+        select_list = []
+        python_rules = []
+        for rule in self._get_rules(mapping):
+            rule_type = rule['rule_type']
+            python_rule = dict(rule, rule_type='DIRECT')
+
+            if rule_type == 'CUSTOM':
+                expr = f"({rule['rule_detail']})"
+            else:
+                column_expr = quote(rule['source_column'])
+                source_type = source_types.get(rule['source_column'].upper())
+                target_type = target_types.get(rule['target_column'].upper())
+                expr = self._cast(dialect_name, column_expr, source_type, target_type)
+                if rule_type == 'NVL':
+                    func = 'NVL' if dialect_name == 'oracle' else 'COALESCE'
+                    # The default takes the type of the (possibly cast) column
+                    family = type_family(target_type if expr != column_expr else source_type)
+                    expr = f"{func}({expr}, {self._literal(rule['rule_detail'], family)})"
+                elif rule_type == 'MASKING':
+                    masked = self._mask_expr(dialect_name, expr, rule['rule_detail'])
+                    if masked:
+                        expr = masked
+                    else:
+                        # Positional masks stay in Python
+                        python_rule = rule
+
+            select_list.append(f"{expr} AS {quote(rule['target_column'])}")
+            python_rules.append(python_rule)
+
+        sql = None
+        if select_list:
+            sql = f"SELECT {', '.join(select_list)} FROM {quote(mapping.source_table.table_name)}"
+        return {
+            "sql": sql,
+            "target_columns": [r['target_column'] for r in python_rules],
+            "python_rules": python_rules
+        }
+
+    def _literal(self, value, family=None):
+        # Bare numbers only for numeric columns: COALESCE(text_col, 0) fails on Postgres, while a
+        # quoted literal is coerced to the column type on Oracle and Postgres alike
+        value = '' if value is None else str(value)
+        if family == 'number' and re.fullmatch(r'-?\d+(\.\d+)?', value.strip()):
+            return value.strip()
+        return "'" + value.replace("'", "''") + "'"
+
+    def _cast(self, dialect_name, expr, source_type, target_type):
+        # Only cast when the value changes type family (e.g. VARCHAR2 -> INTEGER)
+        source_family = type_family(source_type)
+        target_family = type_family(target_type)
+        if not source_family or not target_family or source_family == target_family:
+            return expr
+
+        if dialect_name == 'oracle':
+            cast_types = {'number': 'NUMBER', 'string': 'VARCHAR2(4000)', 'datetime': 'TIMESTAMP'}
+        elif dialect_name == 'postgresql':
+            cast_types = {'number': 'NUMERIC', 'string': 'TEXT', 'datetime': 'TIMESTAMP'}
+        else:
+            cast_types = {'number': 'NUMERIC', 'string': 'TEXT'}
+        if target_family not in cast_types:
+            return expr
+        return f"CAST({expr} AS {cast_types[target_family]})"
+
+    def _mask_expr(self, dialect_name, expr, mask):
+        # Full masks ('' or '****') can be expressed with CASE/RPAD/SUBSTR on Oracle and Postgres
+        if dialect_name not in ('oracle', 'postgresql'):
+            return None
+        if mask and set(mask) != {'*'}:
+            return None
+
+        text_expr = f"CAST({expr} AS VARCHAR2(4000))" if dialect_name == 'oracle' else f"CAST({expr} AS TEXT)"
+        if not mask:
+            masked = f"RPAD('*', LENGTH({text_expr}), '*')"
+        else:
+            n = len(mask)
+            masked = f"RPAD('*', LEAST(LENGTH({text_expr}), {n}), '*') || SUBSTR({text_expr}, {n + 1})"
+        return f"CASE WHEN {expr} IS NULL THEN NULL ELSE {masked} END"
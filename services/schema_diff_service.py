@@ -0,0 +1,141 @@
+import json
+import re
+from sqlalchemy import text
+from models import EtlMetadata
+from services.metadata_service import MetadataService
+
+TYPE_ALIASES = [
+    (r'^CHARACTER VARYING', 'VARCHAR'),
+    (r'^CHARACTER\b', 'CHAR'),
+    (r'^DECIMAL', 'NUMERIC'),
+    (r'^NUMERIC\((\d+),0\)$', r'NUMERIC(\1)'), # Postgres reports NUMERIC(20) as NUMERIC(20, 0)
+    (r'^INT2$', 'SMALLINT'),
+    (r'^(INT|INT4)$', 'INTEGER'),
+    (r'^INT8$', 'BIGINT'),
+    (r'^FLOAT4$', 'REAL'),
+    (r'^FLOAT8$', 'DOUBLE PRECISION'),
+    (r'^TIMESTAMP(\(\d+\))? WITH TIME ZONE$', r'TIMESTAMPTZ\1'),
+    (r'^TIMESTAMP(\(\d+\))? WITHOUT TIME ZONE$', r'TIMESTAMP\1'),
+    (r'^(TIMESTAMPTZ|TIMESTAMP)\(6\)$', r'\1') # 6 is the Postgres default precision
+]
+
+class SchemaDiffService:
+    """
+    Compares a target table with its source and brings it up to date in place.
+    The desired columns come from the source catalog (through the type mapping), the
+    current ones from the live target; the stored EtlMetadata.schema_info tells a source
+    change apart from drift made directly on the target. Only ADD COLUMN / ALTER COLUMN
+    statements are emitted; columns gone from the source are kept (made nullable).
+    """
+    def __init__(self, meta_service=None):
+        self.meta_service = meta_service or MetadataService()
+
+    def diff_table(self, table_name):
+        table_name = table_name.upper()
+        source = self.meta_service.get_table('SOURCE', table_name)
+        if not source:
+            raise ValueError(f"Source table {table_name} not found")
+
+        desired = self.meta_service.to_target_columns(source['columns'])
+        stored_entry = self._get_stored_entry(table_name)
+        stored = {c['name'].upper(): c for c in json.loads(stored_entry.schema_info or '[]')} if stored_entry else {}
+        live_table = self.meta_service.get_table('TARGET', table_name)
+
+        diff = {
+            "table_name": table_name,
+            "target_exists": live_table is not None,
+            "columns": desired,
+            "changes": [],
+            "statements": [],
+            "requires_recreate": False
+        }
+        if live_table is None:
+            return diff
+
+        quoted_table = f'"{table_name}"'
+        live = {c['name'].upper(): c for c in live_table['columns']}
+        changes, statements = diff['changes'], diff['statements']
+
+        for col in desired:
+            name = col['name']
+            current = live.get(name)
+            if not current:
+                # Added as nullable: NOT NULL would fail on a populated table
+                changes.append({"column": name, "change": "add", "from": None, "to": col['type']})
+                statements.append(f'ALTER TABLE {quoted_table} ADD COLUMN "{name}" {col["type"]}')
+                continue
+
+            if not self._same_type(current['type'], col['type']):
+                stored_type = (stored.get(name) or {}).get('type')
+                origin = 'target' if stored_type and self._same_type(stored_type, col['type']) else 'source'
+                changes.append({"column": name, "change": "alter_type", "from": current['type'],
+                                "to": col['type'], "origin": origin})
+                statements.append(f'ALTER TABLE {quoted_table} ALTER COLUMN "{name}" TYPE {col["type"]} '
+                                  f'USING "{name}"::{col["type"]}')
+
+            if not col['pk'] and bool(current.get('nullable', True)) != bool(col['nullable']):
+                action = 'DROP NOT NULL' if col['nullable'] else 'SET NOT NULL'
+                changes.append({"column": name, "change": "nullable", "from": current.get('nullable'),
+                                "to": col['nullable']})
+                statements.append(f'ALTER TABLE {quoted_table} ALTER COLUMN "{name}" {action}')
+
+        desired_names = {c['name'] for c in desired}
+        for name, current in live.items():
+            if name in desired_names:
+                continue
+            changes.append({"column": name, "change": "removed_in_source", "from": current['type'], "to": None})
+            if not current.get('nullable', True) and not current.get('pk'):
+                # Keep the column (and its data) but let new loads leave it empty
+                statements.append(f'ALTER TABLE {quoted_table} ALTER COLUMN "{name}" DROP NOT NULL')
+
+        desired_pk = [c['name'] for c in desired if c['pk']]
+        live_pk = [c['name'].upper() for c in live_table['columns'] if c.get('pk')]
+        if sorted(desired_pk) != sorted(live_pk):
+            # Primary key changes are left to an explicit recreate
+            changes.append({"column": ', '.join(desired_pk), "change": "primary_key",
+                            "from": ', '.join(live_pk), "to": ', '.join(desired_pk)})
+            diff['requires_recreate'] = True
+        return diff
+
+    def apply_diff(self, table_name, recreate=False):
+        # Alter the target in place; drop/recreate only when asked (or when it doesn't exist yet)
+        diff = self.diff_table(table_name)
+        table_name = diff['table_name']
+        stored_entry = self._get_stored_entry(table_name)
+        options = json.loads(stored_entry.ddl_options or '{}') if stored_entry else {}
+
+        if recreate or not diff['target_exists']:
+            self.meta_service.save_target_table(table_name, diff['columns'], options)
+            if not self.meta_service.create_table_in_target_db(table_name, diff['columns'], options):
+                raise ValueError(f"Failed to create target table {table_name}")
+            diff['mode'] = 'recreated' if diff['target_exists'] else 'created'
+            return diff
+
+        if diff['statements']:
+            conn_data = self.meta_service._get_connection_by_role('TARGET')
+            engine = self.meta_service._get_engine(conn_data)
+            # All changes of a table succeed or fail together
+            with engine.begin() as conn:
+                for statement in diff['statements']:
+                    conn.execute(text(statement))
+            print(f"DEBUG: Altered target table {table_name} ({len(diff['statements'])} statement(s)).")
+
+        self.meta_service.save_target_table(table_name, diff['columns'], options)
+        diff['mode'] = 'altered' if diff['statements'] else 'unchanged'
+        return diff
+
+    def _get_stored_entry(self, table_name):
+        return EtlMetadata.query.filter_by(table_name=table_name, db_type='POSTGRES') \
+            .order_by(EtlMetadata.id.desc()).first()
+
+    def _normalize_type(self, col_type):
+        col_type = re.sub(r'\s+', ' ', (col_type or '').upper()).strip()
+        col_type = re.sub(r'\s*\(\s*', '(', col_type)
+        col_type = re.sub(r'\s*,\s*', ',', col_type)
+        col_type = re.sub(r'\s*\)', ')', col_type)
+        for pattern, replacement in TYPE_ALIASES:
+            col_type = re.sub(pattern, replacement, col_type)
+        return col_type
+
+    def _same_type(self, a, b):
+        return self._normalize_type(a) == self._normalize_type(b)
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+from flask import current_app, has_app_context
+from jinja2 import BaseLoader, ChoiceLoader, Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateNotFound, meta
+from models import EtlTemplate
+
+# Defaults used when no app config is available (e.g. scripts run outside a request)
+DEFAULT_TEMPLATE_SETTINGS = {
+    'DAG_TEMPLATE_DIR': None, # extra folder for shared macros/includes on disk
+    'DAG_TEMPLATE_BYTECODE_DIR': None # on-disk bytecode cache, survives restarts
+}
+
+def content_hash(content):
+    return hashlib.sha1((content or '').encode('utf-8')).hexdigest()
+
+class EtlTemplateLoader(BaseLoader):
+    """
+    Resolves {% include %} / {% import %} names to tb_etl_tmpl_mst rows: "#<id>" or a
+    template_name (latest row wins). Cached includes stay valid until TemplateRegistry
+    is invalidated by a template save.
+    """
+    def get_source(self, environment, name):
+        if name.startswith('#') and name[1:].isdigit():
+            template = EtlTemplate.query.get(int(name[1:]))
+        else:
+            template = EtlTemplate.query.filter_by(template_name=name).order_by(EtlTemplate.id.desc()).first()
+        if not template:
+            raise TemplateNotFound(name)
+        version = TemplateRegistry._version
+        return template.template_content, None, lambda: TemplateRegistry._version == version
+
+class TemplateRegistry:
+    """
+    Process-wide Jinja environment for DAG templates.
+    Compiled templates are cached by EtlTemplate.id plus a hash of the content, so an
+    edited template compiles once and the old code is dropped. With
+    DAG_TEMPLATE_BYTECODE_DIR set, compiled code is also kept on disk across restarts.
+    Dependency hashes are cached the same way, plus the registry version, since an
+    include can change without the template itself changing.
+    """
+    _environment = None
+    _compiled = {}
+    _dependency_hashes = {}
+    _version = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _settings():
+        settings = dict(DEFAULT_TEMPLATE_SETTINGS)
+        if has_app_context():
+            for key in settings:
+                settings[key] = current_app.config.get(key, settings[key])
+        return settings
+
+    @classmethod
+    def get_environment(cls):
+        with cls._lock:
+            if cls._environment is None:
+                settings = cls._settings()
+                loaders = [EtlTemplateLoader()]
+                if settings['DAG_TEMPLATE_DIR']:
+                    loaders.append(FileSystemLoader(settings['DAG_TEMPLATE_DIR']))
+                bytecode_cache = None
+                if settings['DAG_TEMPLATE_BYTECODE_DIR']:
+                    os.makedirs(settings['DAG_TEMPLATE_BYTECODE_DIR'], exist_ok=True)
+                    bytecode_cache = FileSystemBytecodeCache(settings['DAG_TEMPLATE_BYTECODE_DIR'])
+                # auto_reload asks the loader's uptodate() before reusing a cached include
+                cls._environment = Environment(loader=ChoiceLoader(loaders), bytecode_cache=bytecode_cache,
+                                               auto_reload=True, cache_size=400)
+            return cls._environment
+
+    @classmethod
+    def get_template(cls, template):
+        # template: an EtlTemplate row
+        digest = content_hash(template.template_content)
+        with cls._lock:
+            cached = cls._compiled.get(template.id)
+        if cached and cached[0] == digest:
+            return cached[1]
+
+        compiled = cls._compile(cls.get_environment(), f"#{template.id}", template.template_content)
+        with cls._lock:
+            cls._compiled[template.id] = (digest, compiled)
+        return compiled
+
+    @classmethod
+    def dependency_hash(cls, template):
+        # Hash of the template and everything it includes/imports/extends (transitively),
+        # so a change to a shared macro file marks the DAGs using it as stale
+        key = (content_hash(template.template_content), cls._version)
+        with cls._lock:
+            cached = cls._dependency_hashes.get(template.id)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        env = cls.get_environment()
+        sources = {}
+        pending = [(f"#{template.id}", template.template_content)]
+        while pending:
+            name, source = pending.pop()
+            if name in sources:
+                continue
+            sources[name] = source
+            # Dynamic names (variables) can't be resolved statically and are skipped
+            for ref in meta.find_referenced_templates(env.parse(source)):
+                if ref and ref not in sources:
+                    try:
+                        pending.append((ref, env.loader.get_source(env, ref)[0]))
+                    except TemplateNotFound:
+                        sources[ref] = None
+        digest = hashlib.sha256(json.dumps(sorted(sources.items()), default=str).encode('utf-8')).hexdigest()
+        with cls._lock:
+            cls._dependency_hashes[template.id] = (key, digest)
+        return digest
+
+    @classmethod
+    def _compile(cls, env, name, source):
+        # Same steps as jinja2's BaseLoader.load, for a source we already hold
+        bucket = None
+        code = None
+        if env.bytecode_cache is not None:
+            bucket = env.bytecode_cache.get_bucket(env, name, None, source)
+            code = bucket.code
+        if code is None:
+            code = env.compile(source, name)
+            if bucket is not None:
+                bucket.code = code
+                env.bytecode_cache.set_bucket(bucket)
+        return env.template_class.from_code(env, code, env.make_globals(None))
+
+    @classmethod
+    def invalidate(cls, template_id=None):
+        # Called when templates change: includes/imports may refer to the changed one by name
+        with cls._lock:
+            cls._version += 1
+            # Any template may include the changed one, so every dependency hash is recomputed
+            cls._dependency_hashes.clear()
+            if template_id is None:
+                cls._compiled.clear()
+            else:
+                cls._compiled.pop(template_id, None)
+
+    @classmethod
+    def reset(cls):
+        # Drop the environment itself (e.g. after changing DAG_TEMPLATE_* settings)
+        with cls._lock:
+            cls._environment = None
+            cls._compiled.clear()
+            cls._dependency_hashes.clear()
+            cls._version += 1
@@ -1,4 +1,5 @@
 from models import db, EtlTemplate
+from services.template_registry import TemplateRegistry
 
 class TemplateService:
     def get_all_templates(self):
@@ -12,6 +13,8 @@ class TemplateService:
         )
         db.session.add(new_template)
         db.session.commit()
+        # A new template can shadow a name used by {% include %} / {% import %}
+        TemplateRegistry.invalidate()
         return new_template
 
     def get_template(self, id):
@@ -0,0 +1,358 @@
+import json
+import time
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from models import EtlMapping, EtlConnection
+from sqlalchemy import text, insert, table, column
+from services.engine_registry import EngineRegistry
+from services.mapping_service import MappingService
+from services.transform_service import ColumnPipeline
+from services.pushdown_service import PushdownService
+
+class PartialTransferError(RuntimeError):
+    # Some parallel chunks failed after others were committed; stats lists both sets of ranges
+    def __init__(self, message, stats):
+        super().__init__(message)
+        self.stats = stats
+
+class TransferService:
+    """
+    Moves data for one EtlMapping from the Source to the Target database.
+    Source rows are streamed with a server-side cursor and written in batches
+    (COPY FROM STDIN on Postgres/psycopg2, executemany elsewhere), so memory
+    stays bounded by batch_size regardless of table size.
+    """
+    def __init__(self, source_engine=None, target_engine=None):
+        # Engines can be injected (e.g. SQLite for local end-to-end runs);
+        # by default the active SOURCE/TARGET connections are used.
+        self.source_engine = source_engine
+        self.target_engine = target_engine
+
+    def _get_engine_by_role(self, role):
+        conn_data = EtlConnection.query.filter_by(role=role).order_by(EtlConnection.id.desc()).first()
+        return EngineRegistry.get_engine(conn_data)
+
+    def run_mapping(self, mapping_id, batch_size=10000, arraysize=None, truncate=True, parallel_degree=None,
+                    full_reload=False):
+        mapping = EtlMapping.query.get(mapping_id)
+        if not mapping:
+            raise ValueError("Invalid Mapping ID")
+
+        source_engine = self.source_engine or self._get_engine_by_role('SOURCE')
+        target_engine = self.target_engine or self._get_engine_by_role('TARGET')
+        if not source_engine or not target_engine:
+            raise ValueError("Source and Target connections are required")
+
+        options = self._get_options(mapping)
+        source_table = mapping.source_table.table_name
+        target_table = mapping.target_table.table_name
+        degree = self._resolve_degree(parallel_degree or options.get('parallel_degree'), source_table)
+
+        # Rules are compiled into one source-side SELECT; only what the source can't do runs in Python
+        compiled = self._compile_mapping(mapping, source_engine)
+        if not compiled['sql']:
+            raise ValueError("Mapping has no mapped columns")
+
+        # Incremental mode pulls only rows in (last mark, current high-water mark]
+        map_service = MappingService()
+        watermark_column = options.get('watermark_column')
+        incremental = bool(watermark_column) and (options.get('load_mode') or 'FULL').upper() == 'INCREMENTAL' \
+            and not full_reload
+        last_mark = map_service.get_watermark(mapping.id, watermark_column) if incremental else None
+        if incremental and last_mark is None:
+            # No mark stored yet: the first run seeds the target like a full load
+            incremental = False
+        new_mark = None
+        wm_where, wm_params = None, {}
+        if watermark_column:
+            new_mark = self._get_high_water_mark(source_engine, source_table, watermark_column, last_mark)
+        if incremental:
+            if new_mark is None:
+                print(f"DEBUG: No new rows in {source_table} since {last_mark}.")
+                return self._stats(mapping, source_table, target_table, 0, 0, degree, 0, last_mark, incremental)
+            # Deltas are appended, the target is not cleared
+            truncate = False
+        if new_mark is not None:
+            # Full loads stop at the mark too, otherwise rows committed during the copy
+            # would be copied now and again by the next incremental run
+            wm_where, wm_params = self._watermark_filter(source_engine, watermark_column, last_mark, new_mark,
+                                                         include_nulls=not incremental)
+
+        # Targets declared with defer_indexes load without their secondary indexes on full loads
+        from services.metadata_service import MetadataService
+        meta_service = MetadataService()
+        target_options = json.loads(mapping.target_table.ddl_options or '{}')
+        rebuild_indexes = truncate and target_options.get('defer_indexes') and target_options.get('indexes')
+
+        started = time.time()
+        if truncate:
+            with target_engine.begin() as t_conn:
+                if rebuild_indexes:
+                    for statement in meta_service.generate_drop_index_ddl(target_table, target_options):
+                        t_conn.execute(text(statement))
+                self._truncate_target(t_conn, target_table)
+
+        chunks = [(None, {})]
+        if degree > 1:
+            chunks = self._split_chunks(source_engine, source_table, degree, options.get('split_method', 'PK_RANGE'))
+        chunks = [(self._and_where(where, wm_where), dict(params, **wm_params)) for where, params in chunks]
+
+        try:
+            if len(chunks) == 1:
+                where, params = chunks[0]
+                total = self._copy_chunk(source_engine, target_engine, source_table, target_table,
+                                         compiled, where, params, batch_size, arraysize)
+            else:
+                # Each chunk is copied by a worker with its own source connection and target transaction,
+                # so a failed chunk doesn't undo the others: the run fails as partial with both sets of ranges
+                total = 0
+                completed, failed = [], []
+                with ThreadPoolExecutor(max_workers=degree) as executor:
+                    futures = [
+                        (executor.submit(self._copy_chunk, source_engine, target_engine, source_table, target_table,
+                                         compiled, where, params, batch_size, arraysize), where, params)
+                        for where, params in chunks
+                    ]
+                    for future, where, params in futures:
+                        try:
+                            rows = future.result()
+                            total += rows
+                            completed.append(dict(self._chunk_range(where, params), rows=rows))
+                        except Exception as e:
+                            failed.append(dict(self._chunk_range(where, params), error=str(e)))
+                if failed:
+                    stats = self._stats(mapping, source_table, target_table, total, len(chunks), degree,
+                                        time.time() - started, None, incremental)
+                    stats.update(status='PARTIAL', completed_chunks=completed, failed_chunks=failed)
+                    print(f"ERROR: {len(failed)} of {len(chunks)} chunk(s) failed for {source_table} -> {target_table}; "
+                          f"{total} rows committed.")
+                    raise PartialTransferError(
+                        f"{len(failed)} of {len(chunks)} chunk(s) failed, {target_table} is partially loaded "
+                        f"({total} rows): {failed[0]['error']}", stats)
+        finally:
+            if rebuild_indexes:
+                # One index build per index after the load instead of per-row maintenance
+                with target_engine.begin() as t_conn:
+                    meta_service.build_target_indexes(t_conn, target_table, target_options)
+
+        if watermark_column and new_mark is not None:
+            map_service.save_watermark(mapping.id, watermark_column, new_mark)
+
+        elapsed = time.time() - started
+        stats = self._stats(mapping, source_table, target_table, total, len(chunks), degree, elapsed,
+                            new_mark if watermark_column else None, incremental)
+        print(f"DEBUG: Transferred {total} rows {source_table} -> {target_table} in {len(chunks)} chunk(s) ({stats['rows_per_sec']} rows/sec)")
+        return stats
+
+    def _resolve_degree(self, degree, source_table):
+        # 'AUTO' sizes the parallelism from the source table statistics in the catalog
+        if str(degree or '').upper() != 'AUTO':
+            return int(degree or 1)
+        from services.metadata_service import MetadataService
+        meta_service = MetadataService()
+        return meta_service.suggest_parallel_degree(meta_service.get_table_stats('SOURCE', source_table))
+
+    def _stats(self, mapping, source_table, target_table, total, chunks, degree, elapsed, watermark, incremental):
+        return {
+            "mapping_id": mapping.id,
+            "source_table": source_table,
+            "target_table": target_table,
+            "load_mode": 'INCREMENTAL' if incremental else 'FULL',
+            "rows": total,
+            "chunks": chunks,
+            "parallel_degree": degree,
+            "watermark": str(watermark) if watermark is not None else None,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(total / elapsed, 1) if elapsed > 0 else float(total)
+        }
+
+    def _chunk_range(self, where, params):
+        # JSON-friendly description of a chunk, enough to re-run it
+        return {"where": where, "params": {k: str(v) for k, v in params.items()}}
+
+    def _get_high_water_mark(self, source_engine, source_table, watermark_column, last_mark):
+        # Upper bound fixed before copying, so rows committed during the load go to the next run
+        quote = source_engine.dialect.identifier_preparer.quote
+        sql = f"SELECT MAX({quote(watermark_column)}) FROM {quote(source_table)}"
+        params = {}
+        if last_mark is not None:
+            sql += f" WHERE {quote(watermark_column)} > :wm_last"
+            params['wm_last'] = last_mark
+        with source_engine.connect() as conn:
+            return conn.execute(text(sql), params).scalar()
+
+    def _watermark_filter(self, source_engine, watermark_column, last_mark, new_mark, include_nulls=False):
+        # include_nulls: full loads keep rows without a mark (incremental runs never see them)
+        key = source_engine.dialect.identifier_preparer.quote(watermark_column)
+        where = f"{key} <= :wm_upper"
+        if include_nulls:
+            where = f"{where} OR {key} IS NULL"
+        params = {"wm_upper": new_mark}
+        if last_mark is not None:
+            where = f"{key} > :wm_last AND {where}"
+            params['wm_last'] = last_mark
+        return where, params
+
+    def _and_where(self, *clauses):
+        clauses = [c for c in clauses if c]
+        return ' AND '.join(f"({c})" for c in clauses) if clauses else None
+
+    def _copy_chunk(self, source_engine, target_engine, source_table, target_table,
+                    compiled, where, params, batch_size, arraysize):
+        source_sql = compiled['sql'] + (f" WHERE {where}" if where else "")
+        target_columns = compiled['target_columns']
+
+        # Remaining rules are applied column-wise per batch, not per row
+        pipeline = ColumnPipeline(compiled['python_rules'])
+
+        total = 0
+        with source_engine.connect() as s_conn, target_engine.begin() as t_conn:
+            result = s_conn.execution_options(stream_results=True, yield_per=batch_size).execute(text(source_sql), params)
+            if arraysize and hasattr(result.cursor, 'arraysize'):
+                # Rows fetched per round-trip (oracledb/psycopg2 server-side cursors)
+                result.cursor.arraysize = arraysize
+
+            for batch in result.partitions(batch_size):
+                rows = pipeline.apply(batch)
+                self._write_batch(t_conn, target_table, target_columns, rows)
+                total += len(rows)
+        return total
+
+    def _get_options(self, mapping):
+        mapping_data = json.loads(mapping.mapping_json)
+        return (mapping_data.get('options') or {}) if isinstance(mapping_data, dict) else {}
+
+    def _get_pk_columns(self, source_engine, source_table):
+        # Prefer the PK flags harvested into the metadata catalog, fall back to reflection
+        from services.metadata_service import MetadataService
+        table_info = None
+        if not self.source_engine:
+            table_info = MetadataService().get_table('SOURCE', source_table)
+        if table_info:
+            return [c['name'] for c in table_info['columns'] if c['pk']]
+        from sqlalchemy import inspect
+        return inspect(source_engine).get_pk_constraint(source_table).get('constrained_columns') or []
+
+    def _split_chunks(self, source_engine, source_table, degree, split_method):
+        # Returns [(where_clause, params)] covering the table exactly once
+        split_method = (split_method or 'PK_RANGE').upper()
+        if split_method == 'ROWID':
+            if source_engine.dialect.name != 'oracle':
+                raise ValueError("ROWID split is only supported for Oracle sources")
+            return self._split_by_rowid(source_engine, source_table)
+
+        pk_columns = self._get_pk_columns(source_engine, source_table)
+        if not pk_columns:
+            print(f"WARN: {source_table} has no primary key; copying in a single stream.")
+            return [(None, {})]
+
+        quote = source_engine.dialect.identifier_preparer.quote
+        key = quote(pk_columns[0])
+        t_name = quote(source_table)
+
+        with source_engine.connect() as conn:
+            if split_method == 'NTILE':
+                # Bucket boundaries follow the real key distribution (handles gaps/skew and non-numeric keys)
+                rows = conn.execute(text(f"""
+                    SELECT MIN(k) FROM (
+                        SELECT {key} AS k, NTILE(:degree) OVER (ORDER BY {key}) AS bucket FROM {t_name}
+                    ) b GROUP BY bucket ORDER BY 1
+                """), {"degree": degree}).fetchall()
+                bounds = [r[0] for r in rows]
+            else:
+                lo, hi = conn.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {t_name}")).fetchone()
+                if lo is None:
+                    return [(None, {})]
+                if not isinstance(lo, (int, float, Decimal)) or isinstance(lo, bool):
+                    raise ValueError("PK_RANGE split needs a numeric leading PK column; use NTILE instead")
+                step = (hi - lo) / degree
+                bounds = [lo] + [lo + step * i for i in range(1, degree)]
+
+        # Ranges are [bound_i, bound_i+1); the first is open below, the last open above
+        bounds = sorted(set(bounds))
+        if len(bounds) <= 1:
+            return [(None, {})]
+        chunks = []
+        for i in range(len(bounds)):
+            clauses, params = [], {}
+            if i > 0:
+                clauses.append(f"{key} >= :lo")
+                params['lo'] = bounds[i]
+            if i < len(bounds) - 1:
+                clauses.append(f"{key} < :hi")
+                params['hi'] = bounds[i + 1]
+            chunks.append((' AND '.join(clauses), params))
+        return chunks
+
+    def _split_by_rowid(self, source_engine, source_table):
+        # One chunk per segment extent, like DBMS_PARALLEL_EXECUTE.CREATE_CHUNKS_BY_ROWID
+        with source_engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT DBMS_ROWID.ROWID_CREATE(1, o.data_object_id, e.relative_fno, e.block_id, 0),
+                       DBMS_ROWID.ROWID_CREATE(1, o.data_object_id, e.relative_fno, e.block_id + e.blocks - 1, 32767)
+                FROM user_extents e
+                JOIN user_objects o ON o.object_name = e.segment_name
+                    AND NVL(o.subobject_name, '-') = NVL(e.partition_name, '-')
+                WHERE e.segment_name = :table_name
+                AND e.segment_type LIKE 'TABLE%'
+                ORDER BY e.relative_fno, e.block_id
+            """), {"table_name": source_table}).fetchall()
+        if not rows:
+            return [(None, {})]
+        return [("ROWID BETWEEN CHARTOROWID(:lo) AND CHARTOROWID(:hi)", {"lo": lo, "hi": hi}) for lo, hi in rows]
+
+    def _compile_mapping(self, mapping, source_engine):
+        source_columns = target_columns = None
+        if not self.source_engine:
+            # Column types from the catalog let the compiler inline casts
+            from services.metadata_service import MetadataService
+            meta_service = MetadataService()
+            source_info = meta_service.get_table('SOURCE', mapping.source_table.table_name)
+            target_info = meta_service.get_table('TARGET', mapping.target_table.table_name)
+            source_columns = source_info['columns'] if source_info else None
+            target_columns = target_info['columns'] if target_info else None
+        return PushdownService().compile_mapping(mapping, source_engine.dialect.name, source_columns, target_columns)
+
+    def _truncate_target(self, t_conn, target_table):
+        quoted = t_conn.dialect.identifier_preparer.quote(target_table)
+        if t_conn.dialect.name == 'postgresql':
+            t_conn.execute(text(f"TRUNCATE TABLE {quoted}"))
+        else:
+            t_conn.execute(text(f"DELETE FROM {quoted}"))
+
+    def _write_batch(self, t_conn, target_table, target_columns, rows):
+        if not rows:
+            return
+        if t_conn.dialect.name == 'postgresql' and t_conn.dialect.driver == 'psycopg2':
+            self._copy_batch(t_conn, target_table, target_columns, rows)
+        else:
+            stmt = insert(table(target_table, *[column(c) for c in target_columns]))
+            t_conn.execute(stmt, [dict(zip(target_columns, row)) for row in rows])
+
+    def _copy_batch(self, t_conn, target_table, target_columns, rows):
+        import io
+        quote = t_conn.dialect.identifier_preparer.quote
+        buf = io.StringIO()
+        for row in rows:
+            buf.write(','.join(self._copy_value(v) for v in row))
+            buf.write('\n')
+        buf.seek(0)
+
+        cols = ', '.join(quote(c) for c in target_columns)
+        cursor = t_conn.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {quote(target_table)} ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+        finally:
+            cursor.close()
+
+    def _copy_value(self, value):
+        # CSV for COPY: unquoted empty field is NULL, everything else is quoted
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            value = 't' if value else 'f'
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            value = '\\x' + bytes(value).hex()
+        else:
+            value = str(value)
+        return '"' + value.replace('"', '""') + '"'
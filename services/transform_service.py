@@ -0,0 +1,55 @@
+class ColumnPipeline:
+    """
+    Applies the mapping rules (DIRECT, NVL, MASKING, CUSTOM) to a whole batch at once.
+    A batch is transposed into column lists, each rule runs over its column with a
+    single comprehension/map call, and the columns are zipped back into rows for the writer.
+    CUSTOM expressions are evaluated by the source SELECT, so they pass through like DIRECT.
+    """
+    def __init__(self, rules):
+        self.rules = rules
+        self.column_funcs = [self._compile_rule(rule) for rule in rules]
+
+    def apply(self, batch):
+        if not batch:
+            return []
+        columns = list(zip(*batch))
+        out = [func(col) if func else col for func, col in zip(self.column_funcs, columns)]
+        return list(zip(*out))
+
+    def _compile_rule(self, rule):
+        rule_type = rule['rule_type']
+        if rule_type == 'NVL':
+            return self._nvl(rule['rule_detail'])
+        if rule_type == 'MASKING':
+            return self._masking(rule['rule_detail'])
+        # DIRECT / CUSTOM: column is passed through untouched
+        return None
+
+    def _nvl(self, default):
+        return lambda col: [default if v is None else v for v in col]
+
+    def _masking(self, mask):
+        # Each '*' in the mask hides the character at that position, any other mask
+        # character keeps it. Characters beyond the mask are kept; an empty mask hides all.
+        if not mask:
+            def mask_value(v):
+                return None if v is None else '*' * len(str(v))
+        elif set(mask) == {'*'}:
+            n = len(mask)
+            def mask_value(v):
+                if v is None:
+                    return None
+                s = str(v)
+                return '*' * min(len(s), n) + s[n:]
+        else:
+            positions = [i for i, ch in enumerate(mask) if ch == '*']
+            def mask_value(v):
+                if v is None:
+                    return None
+                chars = list(str(v))
+                for i in positions:
+                    if i >= len(chars):
+                        break
+                    chars[i] = '*'
+                return ''.join(chars)
+        return lambda col: list(map(mask_value, col))
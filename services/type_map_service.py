@@ -0,0 +1,111 @@
+import re
+from datetime import datetime
+from models import db, EtlTypeMap
+
+INTEGER_TYPES = {'INTEGER': 'INTEGER', 'INT': 'INTEGER', 'SMALLINT': 'SMALLINT', 'BIGINT': 'BIGINT'}
+VARCHAR_TYPES = ('VARCHAR2', 'NVARCHAR2', 'VARCHAR', 'NVARCHAR', 'CHARACTER VARYING')
+CHAR_TYPES = ('CHAR', 'NCHAR', 'CHARACTER')
+TEXT_TYPES = ('CLOB', 'NCLOB', 'LONG', 'TEXT')
+BINARY_TYPES = ('BLOB', 'RAW', 'LONG RAW', 'BFILE', 'BYTEA')
+
+class TypeMapService:
+    """
+    Oracle -> Postgres column type mapping.
+    Picks the narrowest correct type from precision/scale/length, e.g. NUMBER(9) -> INTEGER,
+    NUMBER(12) -> BIGINT, NUMBER(10,2) -> NUMERIC(10,2), VARCHAR2(50) -> VARCHAR(50).
+    Rows in tb_etl_type_map override the built-in rules, most specific source type first
+    ("NUMBER(1)" before "NUMBER").
+    """
+    def get_all(self):
+        return EtlTypeMap.query.order_by(EtlTypeMap.source_type).all()
+
+    def get_overrides(self):
+        return {m.source_type.upper().replace(' ', ''): m.target_type for m in EtlTypeMap.query.all()}
+
+    def save(self, source_type, target_type):
+        source_type = source_type.strip().upper()
+        entry = EtlTypeMap.query.filter_by(source_type=source_type).first()
+        if not entry:
+            entry = EtlTypeMap(source_type=source_type)
+            db.session.add(entry)
+        entry.target_type = target_type.strip()
+        entry.etl_cry_dtm = datetime.utcnow()
+        db.session.commit()
+        return entry
+
+    def delete(self, type_map_id):
+        entry = EtlTypeMap.query.get(type_map_id)
+        if entry:
+            db.session.delete(entry)
+            db.session.commit()
+            return True
+        return False
+
+    def parse_type(self, col_type, precision=None, scale=None, length=None):
+        # Split "NUMBER(10, 2)" / "VARCHAR2(20 CHAR)" / "TIMESTAMP(6) WITH TIME ZONE" into
+        # a base type and its size; harvested precision/scale/length win over the string.
+        col_type = (col_type or '').upper()
+        base = re.sub(r'\s+', ' ', re.sub(r'\(.*?\)', '', col_type)).strip()
+        args = re.search(r'\(([^)]*)\)', col_type)
+        nums = [int(n) for n in re.findall(r'-?\d+', args.group(1))] if args else []
+
+        if base in VARCHAR_TYPES + CHAR_TYPES + BINARY_TYPES:
+            if not length and nums:
+                length = nums[0]
+        elif precision is None and nums:
+            precision = nums[0]
+            if scale is None and len(nums) > 1:
+                scale = nums[1]
+        return base, precision, scale, length or None
+
+    def map_type(self, col_type, precision=None, scale=None, length=None, overrides=None):
+        base, precision, scale, length = self.parse_type(col_type, precision, scale, length)
+
+        if overrides:
+            candidates = []
+            if precision is not None:
+                if scale:
+                    candidates.append(f"{base}({precision},{scale})")
+                else:
+                    candidates.extend([f"{base}({precision},0)", f"{base}({precision})"])
+            if length:
+                candidates.append(f"{base}({length})")
+            candidates.append(base)
+            for key in candidates:
+                target = overrides.get(key.replace(' ', ''))
+                if target:
+                    return target.format(precision=precision or '', scale=scale or 0, length=length or '')
+
+        if base in ('NUMBER', 'NUMERIC', 'DECIMAL'):
+            if scale is not None and scale > 0:
+                return f"NUMERIC({precision},{scale})" if precision else 'NUMERIC'
+            if precision is None or (scale is not None and scale < 0):
+                # Plain NUMBER holds any value (integers and decimals)
+                return 'NUMERIC'
+            if precision <= 4: return 'SMALLINT'
+            if precision <= 9: return 'INTEGER'
+            if precision <= 18: return 'BIGINT'
+            return f"NUMERIC({precision})"
+        if base in INTEGER_TYPES: return INTEGER_TYPES[base]
+        if base == 'FLOAT':
+            # Oracle FLOAT precision is in binary digits
+            return 'REAL' if precision and precision <= 24 else 'DOUBLE PRECISION'
+        if base in ('BINARY_FLOAT', 'REAL'): return 'REAL'
+        if base in ('BINARY_DOUBLE', 'DOUBLE PRECISION'): return 'DOUBLE PRECISION'
+        if base in VARCHAR_TYPES: return f"VARCHAR({length})" if length else 'VARCHAR'
+        if base in CHAR_TYPES: return f"CHAR({length})" if length else 'CHAR'
+        if base in TEXT_TYPES: return 'TEXT'
+        if base in BINARY_TYPES: return 'BYTEA'
+        if base == 'DATE':
+            # Oracle DATE carries a time part down to the second
+            return 'TIMESTAMP(0)'
+        if base.startswith('TIMESTAMP'):
+            with_tz = 'WITH TIME ZONE' in base or 'WITH LOCAL TIME ZONE' in base
+            pg_type = 'TIMESTAMPTZ' if with_tz else 'TIMESTAMP'
+            return f"{pg_type}({min(precision, 6)})" if precision is not None else pg_type
+        if base.startswith('INTERVAL'): return 'INTERVAL'
+        if base == 'XMLTYPE': return 'XML'
+        if base == 'ROWID': return 'CHAR(18)'
+        if base == 'UROWID': return 'VARCHAR(4000)'
+        if base == 'BOOLEAN': return 'BOOLEAN'
+        return 'TEXT' # Fallback
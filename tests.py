@@ -1,4 +1,5 @@
 import unittest
+import io
 import os
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
 
@@ -8,6 +9,7 @@ from services.mapping_service import MappingService
 from services.template_service import TemplateService
 from services.dag_service import DagService
 import json
+from models import EtlConnection
 
 class TestEtlManager(unittest.TestCase):
     def setUp(self):
@@ -18,6 +20,34 @@ class TestEtlManager(unittest.TestCase):
             db.drop_all()
             db.create_all()
 
+    def _fake_catalog(self, tables):
+        # tables: {role: {table_name: columns}} standing in for the source/target data dictionaries.
+        # Adds SOURCE (Oracle) and TARGET (Postgres) connections; the change marker follows the
+        # columns, like last_ddl_time after an ALTER TABLE. Use as a context manager.
+        import contextlib
+        import hashlib
+        from unittest import mock
+        db.session.add_all([
+            EtlConnection(name='src', role='SOURCE', type='ORACLE', host='h', port=1521,
+                          schema_db='XE', username='scott', password='tiger'),
+            EtlConnection(name='tgt', role='TARGET', type='POSTGRES', host='h', port=5432,
+                          schema_db='db', username='u', password='p')])
+        db.session.commit()
+
+        def markers(service, engine, conn_data, table_name=None):
+            return {n: hashlib.md5(json.dumps(c).encode()).hexdigest() for n, c in tables[conn_data.role].items()
+                    if table_name is None or n == table_name}
+
+        def harvest(service, engine, conn_data, table_names=None):
+            return [{"table_name": n, "comment": None, "columns": c} for n, c in tables[conn_data.role].items()
+                    if table_names is None or n in table_names]
+
+        stack = contextlib.ExitStack()
+        for name, fake in (('_get_engine', lambda service, conn_data: None), ('_get_change_markers', markers),
+                           ('_harvest_catalog', harvest), ('_get_table_stats', lambda service, engine, conn_data: None)):
+            stack.enter_context(mock.patch.object(MetadataService, name, fake))
+        return stack
+
     def test_metadata_flow(self):
         with app.app_context():
             service = MetadataService()
@@ -80,5 +110,1111 @@ class TestEtlManager(unittest.TestCase):
             self.assertIn("DAG_ID: etl_EMP_to_EMP", history.generated_code)
             self.assertIn("SOURCE: EMP", history.generated_code)
 
+    def test_oracle_metadata_grouping(self):
+        service = MetadataService()
+        table_rows = [('DEPT', None), ('EMP', '사원정보')]
+        column_rows = [
+            ('DEPT', 'DEPTNO', 'NUMBER', 2, 0, None, 'N', None),
+            ('EMP', 'EMPNO', 'NUMBER', 4, 0, None, 'N', '사원번호'),
+            ('EMP', 'ENAME', 'VARCHAR2', None, None, 10, 'Y', '사원명')
+        ]
+        pk_rows = [('DEPT', 'DEPTNO'), ('EMP', 'EMPNO')]
+
+        tables = service._group_oracle_metadata(table_rows, column_rows, pk_rows)
+
+        self.assertEqual([t['table_name'] for t in tables], ['DEPT', 'EMP'])
+        self.assertEqual(tables[1]['comment'], '사원정보')
+        self.assertEqual([c['name'] for c in tables[1]['columns']], ['EMPNO', 'ENAME'])
+        self.assertTrue(tables[1]['columns'][0]['pk'])
+        self.assertFalse(tables[1]['columns'][1]['pk'])
+        self.assertTrue(tables[1]['columns'][1]['nullable'])
+        self.assertEqual((tables[1]['columns'][0]['precision'], tables[1]['columns'][0]['scale']), (4, 0))
+        self.assertEqual(tables[1]['columns'][1]['length'], 10)
+
+    def test_type_mapping_is_precision_aware(self):
+        from services.type_map_service import TypeMapService
+        with app.app_context():
+            service = MetadataService()
+            cases = [
+                (('NUMBER', 4, 0, None), 'SMALLINT'),
+                (('NUMBER', 9, 0, None), 'INTEGER'),
+                (('NUMBER', 12, 0, None), 'BIGINT'),
+                (('NUMBER', 22, None, None), 'NUMERIC(22)'),
+                (('NUMBER', 10, 2, None), 'NUMERIC(10,2)'),
+                (('NUMBER', None, None, None), 'NUMERIC'),
+                (('NUMBER(10, 2)', None, None, None), 'NUMERIC(10,2)'),
+                (('VARCHAR2', None, None, 50), 'VARCHAR(50)'),
+                (('VARCHAR2(20 CHAR)', None, None, None), 'VARCHAR(20)'),
+                (('CHAR', None, None, 1), 'CHAR(1)'),
+                (('DATE', None, None, None), 'TIMESTAMP(0)'),
+                (('TIMESTAMP(6) WITH TIME ZONE', None, None, None), 'TIMESTAMPTZ(6)'),
+                (('CLOB', None, None, None), 'TEXT'),
+                (('BLOB', None, None, None), 'BYTEA'),
+                (('RAW', None, None, 16), 'BYTEA'),
+                (('SDO_GEOMETRY', None, None, None), 'TEXT')
+            ]
+            for args, expected in cases:
+                self.assertEqual(service._map_oracle_to_postgres(*args), expected, args)
+
+            type_maps = TypeMapService()
+            type_maps.save('number(1)', 'BOOLEAN')
+            type_maps.save('VARCHAR2', 'VARCHAR({length})')
+            type_maps.save('DATE', 'DATE')
+            columns = service.to_target_columns([
+                {"name": "flag", "type": "NUMBER", "precision": 1, "scale": 0, "pk": False, "nullable": True},
+                {"name": "qty", "type": "NUMBER", "precision": 5, "scale": 0, "pk": False, "nullable": True},
+                {"name": "name", "type": "VARCHAR2", "length": 30, "pk": False, "nullable": True},
+                {"name": "hired", "type": "DATE", "pk": False, "nullable": True}
+            ])
+            self.assertEqual([c['type'] for c in columns], ['BOOLEAN', 'INTEGER', 'VARCHAR(30)', 'DATE'])
+
+    def test_catalog_cache_refreshes_only_changed_tables(self):
+        with app.app_context():
+            conn = EtlConnection(name='src', role='SOURCE', type='ORACLE', host='h', port=1521,
+                                 schema_db='XE', username='scott', password='tiger')
+            db.session.add(conn)
+            db.session.commit()
+
+            service = MetadataService()
+            markers = {'EMP': 't1', 'DEPT': 't1'}
+            harvested = []
+
+            def fake_harvest(engine, conn_data, table_names=None):
+                names = sorted(markers) if table_names is None else table_names
+                harvested.append(sorted(names))
+                return [{"table_name": n, "comment": None,
+                         "columns": [{"name": "ID", "type": "NUMBER", "pk": True, "nullable": False, "comment": markers[n]}]}
+                        for n in names]
+
+            service._get_engine = lambda conn_data: None
+            service._get_change_markers = lambda engine, conn_data: dict(markers)
+            service._harvest_catalog = fake_harvest
+
+            tables = service.get_source_tables()
+            self.assertEqual([t['table_name'] for t in tables], ['DEPT', 'EMP'])
+            self.assertEqual(harvested, [['DEPT', 'EMP']])
+
+            # Nothing changed: served from cache
+            service.get_source_tables()
+            self.assertEqual(len(harvested), 1)
+
+            # One table altered, one dropped
+            markers['EMP'] = 't2'
+            del markers['DEPT']
+            tables = service.get_source_tables()
+            self.assertEqual(harvested[-1], ['EMP'])
+            self.assertEqual([t['table_name'] for t in tables], ['EMP'])
+            self.assertEqual(tables[0]['columns'][0]['comment'], 't2')
+
+    def test_get_table_reflects_single_table(self):
+        with app.app_context():
+            conn = EtlConnection(name='tgt', role='TARGET', type='POSTGRES', host='h', port=5432,
+                                 schema_db='db', username='u', password='p')
+            db.session.add(conn)
+            db.session.commit()
+
+            service = MetadataService()
+            harvested = []
+
+            def fake_harvest(engine, conn_data, table_names=None):
+                harvested.append(table_names)
+                return [{"table_name": n, "comment": None,
+                         "columns": [{"name": "ID", "type": "INTEGER", "pk": True, "nullable": False, "comment": None}]}
+                        for n in table_names]
+
+            service._get_engine = lambda conn_data: None
+            service._get_change_markers = lambda engine, conn_data, table_name=None: {'EMP': 'm1'}
+            service._harvest_catalog = fake_harvest
+
+            table = service.get_table('TARGET', 'EMP')
+            self.assertEqual(table['columns'][0]['name'], 'ID')
+            self.assertEqual(harvested, [['EMP']])
+
+            # Unchanged marker: served from cache
+            self.assertEqual(service.get_table('TARGET', 'EMP'), table)
+            self.assertEqual(len(harvested), 1)
+
+    def test_table_stats_refresh_and_parallel_hint(self):
+        from services.transfer_service import TransferService
+        with app.app_context():
+            db.session.add(EtlConnection(name='src', role='SOURCE', type='ORACLE', host='h', port=1521,
+                                         schema_db='XE', username='scott', password='tiger'))
+            db.session.commit()
+
+            service = MetadataService()
+            stats_calls = []
+            def fake_stats(engine, conn_data):
+                stats_calls.append(1)
+                return {'CODES': (10, 20, 65536), 'SALES': (40000000, 100, 4 * 1024 ** 3)}
+
+            service._get_engine = lambda conn_data: None
+            service._get_change_markers = lambda engine, conn_data, table_name=None: {'CODES': 'm1', 'SALES': 'm1'}
+            service._harvest_catalog = lambda engine, conn_data, table_names=None: [
+                {"table_name": n, "comment": None, "columns": []} for n in (table_names or ['CODES', 'SALES'])]
+            service._get_table_stats = fake_stats
+
+            tables, _ = service.list_tables('SOURCE')
+            self.assertEqual([(t['table_name'], t['num_rows'], t['size_bytes']) for t in tables],
+                             [('CODES', 10, 65536), ('SALES', 40000000, 4 * 1024 ** 3)])
+            # Within STATS_REFRESH_INTERVAL: not harvested again
+            service.list_tables('SOURCE')
+            self.assertEqual(len(stats_calls), 1)
+
+            self.assertEqual(service.get_table_stats('SOURCE', 'CODES')['avg_row_len'], 20)
+            self.assertEqual(service.suggest_parallel_degree(service.get_table_stats('SOURCE', 'CODES')), 1)
+            self.assertEqual(service.suggest_parallel_degree(service.get_table_stats('SOURCE', 'SALES')), 8)
+            self.assertEqual(service.suggest_parallel_degree({"num_rows": 3000000, "avg_row_len": 200,
+                                                              "size_bytes": None}), 3)
+            self.assertEqual(TransferService()._resolve_degree('AUTO', 'SALES'), 8)
+            self.assertEqual(TransferService()._resolve_degree('2', 'SALES'), 2)
+
+    def test_list_tables_keyset_pagination(self):
+        from models import EtlCatalogCache
+        with app.app_context():
+            source = EtlConnection(name='src', role='SOURCE', type='ORACLE', host='h', port=1521,
+                                   schema_db='XE', username='scott', password='tiger')
+            target = EtlConnection(name='tgt', role='TARGET', type='POSTGRES', host='h', port=5432,
+                                   schema_db='db', username='u', password='p')
+            db.session.add_all([source, target])
+            db.session.commit()
+            for name, comment in [('BONUS', None), ('DEPT', '부서'), ('EMP', '사원정보'), ('SALGRADE', None)]:
+                db.session.add(EtlCatalogCache(connection_id=source.id, table_name=name, table_comment=comment,
+                                               schema_info=json.dumps([{"name": "ID"}])))
+            db.session.add(EtlCatalogCache(connection_id=target.id, table_name='EMP', schema_info='[]'))
+            db.session.commit()
+
+            service = MetadataService()
+            service._sync_catalog = lambda conn_data: None
+
+            page, next_after = service.list_tables('SOURCE', limit=2)
+            self.assertEqual([t['table_name'] for t in page], ['BONUS', 'DEPT'])
+            self.assertEqual(next_after, 'DEPT')
+
+            page, next_after = service.list_tables('SOURCE', after=next_after, limit=2)
+            self.assertEqual([t['table_name'] for t in page], ['EMP', 'SALGRADE'])
+            self.assertIsNone(next_after)
+            self.assertTrue(page[0]['exists_in_target'])
+            self.assertEqual(page[0]['column_count'], 1)
+
+            # Filter matches names and comments
+            page, _ = service.list_tables('SOURCE', search='사원')
+            self.assertEqual([t['table_name'] for t in page], ['EMP'])
+
+    def test_sync_catalogs_degrades_per_side(self):
+        import time
+        with app.app_context():
+            db.session.add_all([
+                EtlConnection(name='src', role='SOURCE', type='ORACLE', host='h', port=1521,
+                              schema_db='XE', username='scott', password='tiger'),
+                EtlConnection(name='tgt', role='TARGET', type='POSTGRES', host='h', port=5432,
+                              schema_db='db', username='u', password='p')
+            ])
+            db.session.commit()
+
+            service = MetadataService()
+
+            def fake_sync(conn_data):
+                if conn_data.role == 'TARGET':
+                    time.sleep(0.5)
+
+            service._sync_catalog = fake_sync
+            errors = service.sync_catalogs(['SOURCE', 'TARGET'], timeout=0.1)
+            self.assertEqual(list(errors), ['TARGET'])
+            self.assertIn('Timed out', errors['TARGET'])
+
+            def failing_sync(conn_data):
+                if conn_data.role == 'SOURCE':
+                    raise RuntimeError('ORA-12541: TNS:no listener')
+
+            service._sync_catalog = failing_sync
+            errors = service.sync_catalogs(['SOURCE', 'TARGET'], timeout=1)
+            self.assertEqual(errors, {'SOURCE': 'ORA-12541: TNS:no listener'})
+
+            # Both sides share one deadline
+            def slow_sync(conn_data):
+                time.sleep(0.4)
+
+            service._sync_catalog = slow_sync
+            started = time.monotonic()
+            self.assertEqual(len(service.sync_catalogs(['SOURCE', 'TARGET'], timeout=0.3)), 2)
+            self.assertLess(time.monotonic() - started, 0.6)
+
+            # The abandoned sync still holds its connection: a new sync skips instead of writing concurrently
+            del service._sync_catalog
+            calls = []
+
+            def slow_entries(conn_data):
+                calls.append(conn_data.role)
+                time.sleep(0.3)
+
+            service._sync_catalog_entries = slow_entries
+            self.assertIn('SOURCE', service.sync_catalogs(['SOURCE'], timeout=0.05))
+            source = EtlConnection.query.filter_by(role='SOURCE').one()
+            service._sync_catalog(source)
+            self.assertEqual(calls, ['SOURCE'])
+            time.sleep(0.4)
+            service._sync_catalog(source)
+            self.assertEqual(calls, ['SOURCE', 'SOURCE'])
+
+    def test_inspector_metadata_bulk_reflection(self):
+        from sqlalchemy import create_engine
+        engine = create_engine('sqlite://')
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE emp (empno INTEGER PRIMARY KEY, ename VARCHAR(10) NOT NULL, deptno INTEGER)")
+            conn.exec_driver_sql("CREATE TABLE dept (deptno INTEGER, loc VARCHAR(13), PRIMARY KEY (deptno, loc))")
+
+        tables = MetadataService()._get_inspector_metadata(engine)
+        self.assertEqual([t['table_name'] for t in tables], ['dept', 'emp'])
+        self.assertEqual([c['pk'] for c in tables[0]['columns']], [True, True])
+        self.assertEqual([c['pk'] for c in tables[1]['columns']], [True, False, False])
+        self.assertFalse(tables[1]['columns'][1]['nullable'])
+
+        only_emp = MetadataService()._get_inspector_metadata(engine, ['emp'])
+        self.assertEqual([t['table_name'] for t in only_emp], ['emp'])
+
+    def test_engine_registry_reuses_and_invalidates(self):
+        from services.engine_registry import EngineRegistry
+        from sqlalchemy.pool import NullPool
+        with app.app_context():
+            first = EngineRegistry.get_engine_for_uri('sqlite://', 99)
+            self.assertIs(EngineRegistry.get_engine_for_uri('sqlite://', 99), first)
+
+            # Changed credentials replace the pooled engine for the same connection
+            second = EngineRegistry.get_engine_for_uri('sqlite:///:memory:', 99)
+            self.assertIsNot(second, first)
+            self.assertEqual(len([k for k in EngineRegistry._engines if k[0] == 99]), 1)
+
+            EngineRegistry.invalidate(99)
+            self.assertIsNot(EngineRegistry.get_engine_for_uri('sqlite:///:memory:', 99), second)
+            EngineRegistry.invalidate(99)
+
+            # Ad-hoc URIs (settings "test connection") are not pooled or cached
+            count = len(EngineRegistry._engines)
+            adhoc = EngineRegistry.get_engine_for_uri('sqlite://')
+            self.assertIsInstance(adhoc.pool, NullPool)
+            self.assertIsNot(EngineRegistry.get_engine_for_uri('sqlite://'), adhoc)
+            self.assertEqual(len(EngineRegistry._engines), count)
+
+            # Testing edited credentials of a saved connection leaves its pool alone
+            from unittest import mock
+            from services.connection_service import ConnectionService
+            pooled = EngineRegistry.get_engine_for_uri('sqlite://', 99)
+            data = {'id': 99, 'type': 'POSTGRES', 'host': 'h', 'port': 5432, 'schema_db': 'db',
+                    'username': 'u', 'password': 'p'}
+            with mock.patch('services.connection_service.build_connection_uri', lambda *args: 'sqlite:///:memory:'):
+                self.assertTrue(ConnectionService().test_connection(data)[0])
+            self.assertIs(EngineRegistry.get_cached_engine('sqlite://', 99), pooled)
+            self.assertIsNone(EngineRegistry.get_cached_engine('sqlite:///:memory:', 99))
+            EngineRegistry.invalidate(99)
+
+    def test_provision_targets_in_batches(self):
+        from models import EtlMetadata
+        from sqlalchemy import create_engine, text, inspect as sa_inspect
+        with app.app_context():
+            db.session.add_all([
+                EtlConnection(name='src', role='SOURCE', type='ORACLE', host='h', port=1521,
+                              schema_db='XE', username='scott', password='tiger'),
+                EtlConnection(name='tgt', role='TARGET', type='POSTGRES', host='h', port=5432,
+                              schema_db='db', username='u', password='p')
+            ])
+            db.session.commit()
+
+            names = ['TB_A', 'TB_B', 'TB_C', 'TB_BAD', 'TBXA', 'OTHER']
+            def fake_harvest(engine, conn_data, table_names=None):
+                return [{"table_name": n, "comment": None, "columns": [
+                    {"name": "ID", "type": "NUMBER", "pk": True, "nullable": False, "comment": "key"},
+                    # Duplicate column name makes CREATE TABLE fail for this one table
+                    {"name": "ID" if n == 'TB_BAD' else "NAME", "type": "VARCHAR2(10)", "pk": False,
+                     "nullable": True, "comment": None}
+                ]} for n in (table_names or names)]
+
+            target_engine = create_engine('sqlite://')
+            service = MetadataService()
+            service._get_engine = lambda conn_data: target_engine
+            service._get_change_markers = lambda engine, conn_data, table_name=None: None
+            service._harvest_catalog = fake_harvest
+
+            results = service.provision_targets(pattern='TB_*', batch_size=2)
+            status = {r['table_name']: r['status'] for r in results}
+            self.assertEqual(status, {'TB_A': 'created', 'TB_B': 'created', 'TB_BAD': 'failed', 'TB_C': 'created'})
+            self.assertEqual(sorted(sa_inspect(target_engine).get_table_names()), ['TB_A', 'TB_B', 'TB_C'])
+            self.assertEqual(EtlMetadata.query.filter_by(db_type='POSTGRES').count(), 4)
+
+            results = service.provision_targets(tables=['tb_a', 'MISSING'])
+            self.assertEqual([(r['table_name'], r['status']) for r in results],
+                             [('TB_A', 'created'), ('MISSING', 'not_found')])
+            self.assertEqual(EtlMetadata.query.filter_by(db_type='POSTGRES').count(), 4)
+
+            # Comment values are escaped for text(): doubled quotes, colons that look like binds
+            statement = service._generate_comment_ddl('tb_a', [{"name": "id", "comment": "it's key:1"}])[0]
+            self.assertEqual(str(text(statement)), 'COMMENT ON COLUMN "TB_A"."ID" IS \'it\'\'s key:1\'')
+
+    def test_target_ddl_options(self):
+        service = MetadataService()
+        columns = [
+            {"name": "SALE_ID", "type": "BIGINT", "pk": True, "nullable": False},
+            {"name": "SALE_DT", "type": "DATE", "pk": False, "nullable": False},
+            {"name": "CUST_ID", "type": "INTEGER", "pk": False, "nullable": True}
+        ]
+        options = service.parse_ddl_options({
+            "unlogged": "1", "fillfactor": "80", "defer_indexes": "1",
+            "partition_type": "RANGE", "partition_column": "sale_dt",
+            "partitions": "p2024: 2024-01-01, 2025-01-01\np2025: 2025-01-01, MAXVALUE"
+        })
+        options['indexes'] = [{"name": "IX_SALES_CUST", "columns": ["CUST_ID"], "unique": False},
+                              {"name": "UX_SALES_CUST", "columns": ["CUST_ID"], "unique": True}]
+
+        statements = service.generate_table_statements('SALES', columns, options)
+        self.assertIn('CREATE TABLE "SALES"', statements[0])
+        self.assertIn('PRIMARY KEY ("SALE_ID", "SALE_DT")', statements[0])
+        self.assertTrue(statements[0].endswith('PARTITION BY RANGE ("SALE_DT")'))
+        self.assertEqual(statements[1:], [
+            'CREATE UNLOGGED TABLE "SALES_P2024" PARTITION OF "SALES" '
+            "FOR VALUES FROM ('2024-01-01') TO ('2025-01-01') WITH (fillfactor=80)",
+            'CREATE UNLOGGED TABLE "SALES_P2025" PARTITION OF "SALES" '
+            "FOR VALUES FROM ('2025-01-01') TO (MAXVALUE) WITH (fillfactor=80)",
+            'CREATE UNLOGGED TABLE "SALES_DEFAULT" PARTITION OF "SALES" DEFAULT WITH (fillfactor=80)'
+        ])
+        # Deferred indexes are only listed as post-load DDL; unique without the partition key is relaxed
+        self.assertEqual(service.generate_index_ddl('SALES', options), [
+            'CREATE INDEX IF NOT EXISTS "IX_SALES_CUST" ON "SALES" ("CUST_ID")',
+            'CREATE INDEX IF NOT EXISTS "UX_SALES_CUST" ON "SALES" ("CUST_ID")'
+        ])
+        self.assertIn('-- Build after the initial load', service.generate_target_ddl('SALES', columns, options))
+
+        plain = service.generate_create_ddl('DEPT', [{"name": "DEPTNO", "type": "SMALLINT", "pk": True}],
+                                            {"unlogged": True, "storage": {"fillfactor": 90}})
+        self.assertEqual(plain, 'CREATE UNLOGGED TABLE "DEPT" \n(\n\t"DEPTNO" SMALLINT PRIMARY KEY\n )\nWITH (fillfactor=90)')
+        with self.assertRaises(ValueError):
+            service.generate_create_ddl('DEPT', [], {"storage": {"fillfactor": "1); DROP TABLE X"}})
+
+        # Bad form input is flashed instead of failing the request
+        for form in ({"fillfactor": "eighty"}, {"partition_type": "RANGE", "partition_column": "SALE_DT",
+                                                "partitions": "p2024: 2024-01-01"}):
+            response = self.app.post('/metadata', data=dict(form, action='create_target', source_table='SALES'))
+            self.assertEqual(response.status_code, 302)
+            with self.app.session_transaction() as session:
+                self.assertIn('Invalid DDL options for SALES', session['_flashes'][-1][1])
+
+    def test_schema_diff_alters_in_place(self):
+        from models import EtlMetadata
+        from sqlalchemy import create_engine, text, inspect as sa_inspect
+        from services.schema_diff_service import SchemaDiffService
+        with app.app_context():
+            db.session.add(EtlConnection(name='tgt', role='TARGET', type='POSTGRES', host='h', port=5432,
+                                         schema_db='db', username='u', password='p'))
+            db.session.add(EtlMetadata(table_name='EMP', db_type='POSTGRES', schema_info=json.dumps([
+                {"name": "EMPNO", "type": "INTEGER", "pk": True, "nullable": False},
+                {"name": "ENAME", "type": "VARCHAR(10)", "pk": False, "nullable": True}
+            ])))
+            db.session.commit()
+
+            source_columns = [
+                {"name": "EMPNO", "type": "NUMBER", "precision": 6, "scale": 0, "pk": True, "nullable": False},
+                {"name": "ENAME", "type": "VARCHAR2", "length": 10, "pk": False, "nullable": True},
+                {"name": "SAL", "type": "NUMBER", "precision": 7, "scale": 2, "pk": False, "nullable": True}
+            ]
+            target_columns = [
+                {"name": "EMPNO", "type": "INTEGER", "pk": True, "nullable": False},
+                {"name": "ENAME", "type": "VARCHAR(20)", "pk": False, "nullable": True},
+                {"name": "OLD_COL", "type": "TEXT", "pk": False, "nullable": False}
+            ]
+            service = MetadataService()
+            service.get_table = lambda role, name: {"table_name": name, "comment": None,
+                                                    "columns": source_columns if role == 'SOURCE' else target_columns}
+
+            diff = SchemaDiffService(service).diff_table('emp')
+            self.assertEqual([(c['column'], c['change']) for c in diff['changes']],
+                             [('ENAME', 'alter_type'), ('SAL', 'add'), ('OLD_COL', 'removed_in_source')])
+            # VARCHAR(20) on the target while the stored definition says VARCHAR(10): drift made on the target
+            self.assertEqual(diff['changes'][0]['origin'], 'target')
+            self.assertEqual(diff['statements'], [
+                'ALTER TABLE "EMP" ALTER COLUMN "ENAME" TYPE VARCHAR(10) USING "ENAME"::VARCHAR(10)',
+                'ALTER TABLE "EMP" ADD COLUMN "SAL" NUMERIC(7,2)',
+                'ALTER TABLE "EMP" ALTER COLUMN "OLD_COL" DROP NOT NULL'
+            ])
+            self.assertFalse(diff['requires_recreate'])
+
+            diff_service = SchemaDiffService(service)
+            self.assertTrue(diff_service._same_type('TIMESTAMP(6) WITHOUT TIME ZONE', 'TIMESTAMP'))
+            self.assertTrue(diff_service._same_type('NUMERIC(7, 2)', 'numeric(7,2)'))
+            self.assertFalse(diff_service._same_type('TIMESTAMP WITH TIME ZONE', 'TIMESTAMP'))
+            self.assertFalse(diff_service._same_type('NUMERIC(20, 2)', 'NUMERIC(20)'))
+
+            # NUMBER(20) maps to NUMERIC(20), which the live catalog reports as NUMERIC(20, 0)
+            wide_service = MetadataService()
+            wide_service.get_table = lambda role, name: {"table_name": name, "comment": None, "columns": [
+                {"name": "ID", "type": "NUMBER", "precision": 20, "scale": 0, "pk": True, "nullable": False}
+                if role == 'SOURCE' else {"name": "ID", "type": "NUMERIC(20, 0)", "pk": True, "nullable": False}]}
+            wide = SchemaDiffService(wide_service).diff_table('emp')
+            self.assertEqual(wide['columns'][0]['type'], 'NUMERIC(20)')
+            self.assertEqual((wide['changes'], wide['statements']), ([], []))
+
+            # Applied in place: rows are kept
+            target_engine = create_engine('sqlite://')
+            with target_engine.begin() as conn:
+                conn.execute(text('CREATE TABLE "EMP" ("EMPNO" INTEGER PRIMARY KEY, "ENAME" VARCHAR(10), "OLD_COL" TEXT)'))
+                conn.execute(text('INSERT INTO "EMP" VALUES (1, \'KING\', \'x\')'))
+            service._get_engine = lambda conn_data: target_engine
+            target_columns[1]['type'] = 'VARCHAR(10)'
+            target_columns[2]['nullable'] = True
+            result = diff_service.apply_diff('EMP')
+            self.assertEqual(result['mode'], 'altered')
+            self.assertIn('SAL', [c['name'] for c in sa_inspect(target_engine).get_columns('EMP')])
+            with target_engine.connect() as conn:
+                self.assertEqual(conn.execute(text('SELECT COUNT(*) FROM "EMP"')).scalar(), 1)
+            stored = json.loads(EtlMetadata.query.filter_by(table_name='EMP').first().schema_info)
+            self.assertEqual([c['type'] for c in stored], ['INTEGER', 'VARCHAR(10)', 'NUMERIC(7,2)'])
+
+    def test_mapping_bulk_import_export(self):
+        from models import EtlMetadata, EtlMapping
+        from services.mapping_io_service import MappingIOService
+        bonus_columns = [{"name": "ENAME", "type": "VARCHAR2(10)", "pk": False, "nullable": True, "comment": None}]
+        with app.app_context(), self._fake_catalog({'SOURCE': {'BONUS': bonus_columns},
+                                                    'TARGET': {'TB_BONUS': bonus_columns}}):
+            db.session.add_all([
+                EtlMetadata(table_name='EMP', db_type='ORACLE', schema_info='[]'),
+                EtlMetadata(table_name='DEPT', db_type='ORACLE', schema_info='[]'),
+                EtlMetadata(table_name='EMP', db_type='POSTGRES', schema_info='[]'),
+                EtlMetadata(table_name='DEPT', db_type='POSTGRES', schema_info='[]')
+            ])
+            db.session.commit()
+
+            csv_content = "\n".join([
+                "source_table,target_table,mapping_type,source_column,target_column,rule_type,rule_detail,remarks",
+                "EMP,EMP,1:1,EMPNO,EMPNO,DIRECT,,",
+                "emp,emp,1:1,COMM,COMM,NVL,0,",
+                "DEPT,DEPT,1:1,DEPTNO,DEPTNO,BOGUS,,",
+                "NOPE,EMP,1:1,A,A,DIRECT,,",
+                "DEPT,NOPE,1:1,A,A,DIRECT,,"
+            ]).encode('utf-8')
+
+            service = MappingIOService()
+            result = service.import_mappings(csv_content, 'csv', dry_run=True)
+            self.assertEqual((result['created'], EtlMapping.query.count()), (1, 0))
+
+            result = service.import_mappings(csv_content, 'csv')
+            self.assertEqual((result['created'], result['updated']), (1, 0))
+            self.assertEqual([e['row'] for e in result['errors']], [4, 5, 6])
+            self.assertIn('unknown rule_type BOGUS', result['errors'][0]['message'])
+            self.assertIn('Source table NOPE not found', result['errors'][1]['message'])
+            # No placeholder metadata rows are created for unknown names
+            self.assertEqual(EtlMetadata.query.count(), 4)
+
+            mapping = EtlMapping.query.one()
+            self.assertEqual([m['rule_type'] for m in json.loads(mapping.mapping_json)['mappings']], ['DIRECT', 'NVL'])
+
+            # Round trip through JSON: existing pair is updated, not duplicated
+            exported = json.loads(service.export_mappings('json'))
+            self.assertEqual(exported[0]['source_table'], 'EMP')
+            exported[0]['mappings'].append({"source_column": "", "target_column": "LOAD_DT",
+                                            "rule_type": "CUSTOM", "rule_detail": "SYSDATE"})
+            exported.append({"source_table": "DEPT", "target_table": "DEPT",
+                             "mappings": [{"source_column": "DEPTNO", "target_column": "DEPTNO"}]})
+            result = service.import_mappings(json.dumps(exported), 'json')
+            self.assertEqual((result['created'], result['updated'], result['errors']), (1, 1, []))
+            self.assertEqual(EtlMapping.query.count(), 2)
+
+            csv_export = service.export_mappings('csv').decode('utf-8-sig').splitlines()
+            self.assertEqual(len(csv_export), 1 + 3 + 1)
+            self.assertEqual(csv_export[3], 'EMP,EMP,1:1,,LOAD_DT,CUSTOM,SYSDATE,')
+
+            # CSV rows carry no options: an export -> import round trip keeps the stored ones
+            emp = EtlMapping.query.order_by(EtlMapping.id).first()
+            options = {"load_mode": "INCREMENTAL", "watermark_column": "UPD_DT", "parallel_degree": 4}
+            emp.mapping_json = json.dumps(dict(json.loads(emp.mapping_json), options=options, owner="hr"))
+            db.session.commit()
+            result = service.import_mappings(service.export_mappings('csv'), 'csv')
+            self.assertEqual((result['updated'], result['errors']), (2, []))
+            data = json.loads(EtlMapping.query.order_by(EtlMapping.id).first().mapping_json)
+            self.assertEqual((data['options'], data['owner'], len(data['mappings'])), (options, 'hr', 3))
+
+            response = self.app.post('/api/mappings/import', data={'file': (io.BytesIO(b'{}'), 'm.txt')},
+                                     content_type='multipart/form-data')
+            self.assertEqual(response.status_code, 400)
+
+            # Tables that were never mapped resolve through the catalogs and are registered with the import
+            bonus = json.dumps([{"source_table": "bonus", "target_table": "tb_bonus",
+                                 "mappings": [{"source_column": "ENAME", "target_column": "ENAME"}]}])
+            result = service.import_mappings(bonus, 'json', dry_run=True)
+            self.assertEqual((result['created'], result['registered'], EtlMetadata.query.count()), (1, 2, 4))
+            result = service.import_mappings(bonus, 'json')
+            self.assertEqual((result['created'], result['registered'], result['errors']), (1, 2, []))
+            registered = EtlMetadata.query.filter_by(table_name='BONUS').one()
+            self.assertEqual((registered.db_type, json.loads(registered.schema_info)), ('ORACLE', bonus_columns))
+            self.assertEqual(service.import_mappings(bonus, 'json')['registered'], 0)
+
+    def test_mapping_list_keyset_pagination(self):
+        from models import EtlMetadata, EtlMapping
+        with app.app_context():
+            metas = []
+            for name in ('EMP', 'EMP_HIST', 'DEPT'):
+                metas.append((EtlMetadata(table_name=name, db_type='ORACLE', schema_info='[]'),
+                              EtlMetadata(table_name=name, db_type='POSTGRES', schema_info='[]')))
+                db.session.add_all(metas[-1])
+            db.session.commit()
+
+            service = MappingService()
+            for source, target in metas:
+                service.save_mapping(source.id, target.id, {"type": "1:1", "mappings": [
+                    {"source_column": "A", "target_column": "A"}, {"source_column": "B", "target_column": ""}]})
+            self.assertEqual(EtlMapping.query.first().column_count, 1)
+
+            page, next_after = service.get_mappings_with_names(limit=2)
+            self.assertEqual([m['source_table'] for m in page], ['DEPT', 'EMP_HIST'])
+            self.assertNotIn('mapping_json', page[0])
+            page, next_after = service.get_mappings_with_names(after=next_after, limit=2)
+            self.assertEqual(([m['source_table'] for m in page], next_after), (['EMP'], None))
+
+            # Prefix match by default, '*' for contains; compared upper-cased, so it doesn't
+            # depend on LIKE being case-insensitive (it isn't on Postgres/Oracle)
+            page, _ = service.get_mappings_with_names(source_filter='emp')
+            self.assertEqual(len(page), 2)
+            self.assertIn('upper(tb_etl_meta_mst.table_name) LIKE',
+                          str(service._name_filter(EtlMetadata.table_name, 'emp')))
+            page, _ = service.get_mappings_with_names(source_filter='*hist')
+            self.assertEqual([m['source_table'] for m in page], ['EMP_HIST'])
+            # '_' and '%' are literal, only '*' is a wildcard
+            self.assertEqual(service.get_mappings_with_names(source_filter='e_p')[0], [])
+            self.assertEqual(service.get_mappings_with_names(source_filter='%hist')[0], [])
+            page, _ = service.get_mappings_with_names(source_filter='emp_')
+            self.assertEqual([m['source_table'] for m in page], ['EMP_HIST'])
+
+            response = self.app.get('/mappings?limit=2')
+            self.assertIn(b'after=', response.data)
+
+    def test_column_lineage_follows_mappings(self):
+        from models import EtlMetadata, EtlColumnMapping
+        from services.lineage_service import LineageService
+        from services.mapping_io_service import MappingIOService
+        emp_cols = [{"name": "EMPNO", "type": "NUMBER"}, {"name": "ENAME", "type": "VARCHAR2"}, {"name": "SAL", "type": "NUMBER"}]
+        with app.app_context(), self._fake_catalog({'SOURCE': {'EMP': emp_cols, 'EMP_STG': []}, 'TARGET': {}}):
+            # CUSTOM expressions are matched against the synced source catalog, not schema_info
+            MetadataService().get_tables('SOURCE')
+            source = EtlMetadata(table_name='EMP', db_type='ORACLE', schema_info='[]')
+            target = EtlMetadata(table_name='EMP_STG', db_type='POSTGRES', schema_info='[]')
+            stg_source = EtlMetadata(table_name='EMP_STG', db_type='ORACLE', schema_info='[]')
+            mart = EtlMetadata(table_name='EMP_MART', db_type='POSTGRES', schema_info='[]')
+            db.session.add_all([source, target, stg_source, mart])
+            db.session.commit()
+
+            service = MappingService()
+            mapping = service.save_mapping(source.id, target.id, {"type": "1:1", "mappings": [
+                {"source_column": "EMPNO", "target_column": "EMPNO", "rule_type": "DIRECT"},
+                {"source_column": "", "target_column": "LABEL", "rule_type": "CUSTOM",
+                 "rule_detail": "ENAME || ' (' || SAL || ')'"}]})
+            service.save_mapping(stg_source.id, mart.id, {"type": "1:1", "mappings": [
+                {"source_column": "LABEL", "target_column": "EMP_LABEL", "rule_type": "NVL", "rule_detail": "-"}]})
+            self.assertEqual(EtlColumnMapping.query.count(), 4)
+
+            lineage = LineageService()
+            impact = lineage.get_downstream('emp', 'sal', depth=2)
+            self.assertEqual([(e['level'], e['target_table'], e['target_column']) for e in impact],
+                             [(1, 'EMP_STG', 'LABEL'), (2, 'EMP_MART', 'EMP_LABEL')])
+            upstream = lineage.get_upstream('EMP_STG', 'LABEL')
+            self.assertEqual(sorted(e['source_column'] for e in upstream), ['ENAME', 'SAL'])
+
+            # Rows follow mapping_json on save and import, and go away with the mapping
+            service.save_mapping(source.id, target.id, {"type": "1:1", "mappings": [
+                {"source_column": "ENAME", "target_column": "LABEL"}]}, mapping_id=mapping.id)
+            self.assertEqual([e['source_column'] for e in lineage.get_upstream('EMP_STG', 'LABEL')], ['ENAME'])
+            MappingIOService().import_mappings(json.dumps([{"source_table": "EMP", "target_table": "EMP_MART",
+                "mappings": [{"source_column": "EMPNO", "target_column": "EMPNO"}]}]), 'json')
+            self.assertEqual(len(lineage.get_downstream('EMP', 'EMPNO')), 1)
+            service.delete_mapping(mapping.id)
+            self.assertEqual(lineage.get_upstream('EMP_STG'), [])
+            self.assertEqual(lineage.rebuild(), 2)
+
+            response = self.app.get('/api/lineage/EMP_MART?direction=upstream&depth=3')
+            self.assertEqual(len(response.get_json()['edges']), 2)
+
+    def test_auto_map_proposes_columns(self):
+        from models import EtlMapping, EtlMetadata
+        from services.auto_map_service import AutoMapService
+        source = {"table_name": "EMP", "columns": [
+            {"name": "EMPNO", "type": "NUMBER(4)", "pk": True, "comment": "사원 번호"},
+            {"name": "ENAME", "type": "VARCHAR2(10)", "pk": False, "comment": "Employee Name"},
+            {"name": "HIRE_DT", "type": "DATE", "pk": False, "comment": None},
+            {"name": "SAL", "type": "NUMBER(7,2)", "pk": False, "comment": "급여"},
+            {"name": "DEPTNO", "type": "NUMBER(2)", "pk": False, "comment": None}]}
+        target = {"table_name": "TB_EMP", "columns": [
+            {"name": "EMP_ID", "type": "SMALLINT", "pk": True, "comment": "사원번호"},
+            {"name": "EMPLOYEE_NM", "type": "VARCHAR(10)", "pk": False, "comment": None},
+            {"name": "HIRE_DATE", "type": "TIMESTAMP(0)", "pk": False, "comment": None},
+            {"name": "SALARY", "type": "NUMERIC(7,2)", "pk": False, "comment": "급여"},
+            {"name": "DEPTNO", "type": "SMALLINT", "pk": False, "comment": None},
+            {"name": "LOAD_DTM", "type": "TIMESTAMP(0)", "pk": False, "comment": None}]}
+
+        service = AutoMapService()
+        result = service.match_tables(source, target)
+        proposals = {m['target_column']: (m['source_column'], m['match']) for m in result['mappings']}
+        self.assertEqual(proposals, {
+            "EMP_ID": ("EMPNO", "comment"), "EMPLOYEE_NM": ("ENAME", "tokens"),
+            "HIRE_DATE": ("HIRE_DT", "normalized"), "SALARY": ("SAL", "normalized"),
+            "DEPTNO": ("DEPTNO", "exact"), "LOAD_DTM": ("", None)})
+        self.assertEqual(result['matched'], 5)
+        self.assertEqual(result['mappings'][4]['confidence'], 1.0)
+
+        with app.app_context(), self._fake_catalog({'SOURCE': {'EMP': source['columns'], 'DEPT': []},
+                                                    'TARGET': {'EMP': target['columns']}}):
+            results, errors = service.auto_map_batch()
+            self.assertEqual(([r['source_table'] for r in results], errors), (['EMP'], []))
+            _, errors = service.auto_map_batch([('EMP', 'NOPE')])
+            self.assertIn('Target table NOPE not found', errors[0]['message'])
+
+            saved = service.save_results(results)
+            self.assertEqual((saved['created'], saved['registered']), (1, 2))
+            # Tables are registered by the import itself, with their catalog columns
+            self.assertEqual(len(json.loads(EtlMetadata.query.filter_by(db_type='ORACLE').one().schema_info)), 5)
+            mapping_data = json.loads(EtlMapping.query.one().mapping_json)
+            self.assertNotIn('confidence', mapping_data['mappings'][0])
+            # Existing mappings are kept unless overwrite is set
+            self.assertEqual(service.save_results(results)['created'], 0)
+            self.assertEqual(service.save_results(results, overwrite=True)['updated'], 1)
+
+    def test_template_registry_caches_compiled_templates(self):
+        import tempfile
+        from unittest import mock
+        from models import EtlTemplate
+        from services.template_registry import TemplateRegistry
+        with app.app_context(), tempfile.TemporaryDirectory() as bytecode_dir:
+            app.config['DAG_TEMPLATE_BYTECODE_DIR'] = bytecode_dir
+            TemplateRegistry.reset()
+            try:
+                service = TemplateService()
+                service.save_template('common_macros', 'MACROS', "{% macro task(name) %}task_{{ name }}{% endmacro %}")
+                main = service.save_template('dag', 'ORACLE_S3_POSTGRES',
+                                             "{% import 'common_macros' as m %}{{ m.task(source_table) }}")
+
+                compiled = TemplateRegistry.get_template(main)
+                self.assertIs(TemplateRegistry.get_template(EtlTemplate.query.get(main.id)), compiled)
+                self.assertEqual(compiled.render(source_table='EMP'), 'task_EMP')
+                self.assertTrue(os.listdir(bytecode_dir))
+
+                # The include chain is parsed once per template version, not per DAG
+                dependency_hash = TemplateRegistry.dependency_hash(main)
+                with mock.patch.object(TemplateRegistry.get_environment(), 'parse') as parse:
+                    self.assertEqual(TemplateRegistry.dependency_hash(main), dependency_hash)
+                parse.assert_not_called()
+
+                # Edited content compiles again; edited macros are picked up after a save
+                main.template_content = "{% import 'common_macros' as m %}{{ m.task(target_table) }}"
+                self.assertIsNot(TemplateRegistry.get_template(main), compiled)
+                macros = EtlTemplate.query.filter_by(template_name='common_macros').one()
+                macros.template_content = "{% macro task(name) %}load_{{ name }}{% endmacro %}"
+                db.session.commit()
+                TemplateRegistry.invalidate(macros.id)
+                self.assertEqual(TemplateRegistry.get_template(main).render(target_table='EMP'), 'load_EMP')
+                self.assertNotEqual(TemplateRegistry.dependency_hash(main), dependency_hash)
+            finally:
+                app.config['DAG_TEMPLATE_BYTECODE_DIR'] = None
+                TemplateRegistry.reset()
+
+    def test_bulk_dag_generation(self):
+        import zipfile
+        import services.dag_service as dag_module
+        from models import EtlMetadata, EtlDagHistory
+        catalog = {'SOURCE': {'EMP': [{"name": "ID", "type": "VARCHAR2(10)"}]},
+                   'TARGET': {'EMP': [{"name": "ID", "type": "INTEGER"}]}}
+        with app.app_context(), self._fake_catalog(catalog):
+            map_service = MappingService()
+            mapping_ids = []
+            for name in ('EMP', 'DEPT', 'BONUS'):
+                source = EtlMetadata(table_name=name, db_type='ORACLE', schema_info='[]')
+                target = EtlMetadata(table_name=name, db_type='POSTGRES', schema_info='[]')
+                db.session.add_all([source, target])
+                db.session.commit()
+                mapping_ids.append(map_service.save_mapping(source.id, target.id, {"type": "1:1", "mappings": [
+                    {"source_column": "ID", "target_column": "ID"}], "options": {"watermark_column": "MOD_DTM"}}).id)
+            map_service.save_watermark(mapping_ids[0], 'MOD_DTM', 42)
+            template = TemplateService().save_template(
+                'bulk', 'ORACLE_S3_POSTGRES', "{{ dag_id }}|{{ source_sql }}|{{ last_watermark }}")
+
+            service = DagService()
+            result = service.generate_dags(template.id, workers=1)
+            self.assertEqual(([h['mapping_id'] for h in result['histories']], result['errors']), (mapping_ids, []))
+            code = EtlDagHistory.query.get(result['histories'][0]['id']).generated_code
+            # Casts come from the catalog column types, same SQL as the mapping API shows
+            self.assertIn('SELECT CAST("ID" AS NUMBER) AS "ID" FROM "EMP"|42', code)
+            compiled_sql = self.app.get(f'/api/mappings/{mapping_ids[0]}').get_json()['compiled_sql']
+            self.assertEqual(compiled_sql, 'SELECT CAST("ID" AS NUMBER) AS "ID" FROM "EMP"')
+            self.assertIn('SELECT "ID" AS "ID" FROM "DEPT"', EtlDagHistory.query.get(result['histories'][1]['id']).generated_code)
+
+            result = service.generate_dags(template.id, source_filter='D')
+            self.assertEqual([h['mapping_id'] for h in result['histories']], [mapping_ids[1]])
+
+            # Worker processes render the same output
+            threshold = dag_module.PARALLEL_RENDER_THRESHOLD
+            dag_module.PARALLEL_RENDER_THRESHOLD = 1
+            try:
+                parallel = service.generate_dags(template.id, mapping_ids=mapping_ids, workers=2)
+            finally:
+                dag_module.PARALLEL_RENDER_THRESHOLD = threshold
+            self.assertEqual(EtlDagHistory.query.get(parallel['histories'][0]['id']).generated_code, code)
+
+            archive = zipfile.ZipFile(io.BytesIO(service.build_zip([h['id'] for h in parallel['histories']])))
+            self.assertEqual(len(archive.namelist()), 3)
+            self.assertEqual(archive.read(archive.namelist()[0]).decode(), code)
+
+            response = self.app.post('/api/dags/generate', json={"template_id": template.id, "download": True})
+            self.assertEqual(response.mimetype, 'application/zip')
+
+    def test_dag_publish_skips_unchanged_and_removes_orphans(self):
+        import tempfile
+        from models import EtlDagHistory, EtlMetadata
+        from services.dag_publish_service import DagPublishService
+        with app.app_context(), tempfile.TemporaryDirectory() as dags_dir:
+            map_service = MappingService()
+            mapping_ids = []
+            for name in ('EMP', 'DEPT'):
+                source = EtlMetadata(table_name=name, db_type='ORACLE', schema_info='[]')
+                target = EtlMetadata(table_name=name, db_type='POSTGRES', schema_info='[]')
+                db.session.add_all([source, target])
+                db.session.commit()
+                mapping_ids.append(map_service.save_mapping(source.id, target.id, {"type": "1:1", "mappings": [
+                    {"source_column": "ID", "target_column": "ID"}]}).id)
+            emp_id, dept_id = mapping_ids
+            db.session.add_all([
+                EtlDagHistory(dag_id='etl_emp', mapping_id=emp_id, generated_code='old emp'),
+                EtlDagHistory(dag_id='etl_emp', mapping_id=emp_id, generated_code='emp'),
+                EtlDagHistory(dag_id='etl_dept', mapping_id=dept_id, generated_code='dept')
+            ])
+            db.session.commit()
+            with open(os.path.join(dags_dir, 'not_ours.py'), 'w') as f:
+                f.write('other')
+
+            publisher = DagPublishService(dags_dir)
+            result = publisher.publish()
+            self.assertEqual(sorted(result['written']), ['etl_dept.py', 'etl_emp.py'])
+            with open(os.path.join(dags_dir, 'etl_emp.py')) as f:
+                self.assertEqual(f.read(), 'emp')
+            mtime = os.stat(os.path.join(dags_dir, 'etl_emp.py')).st_mtime_ns
+
+            # Unchanged content is not rewritten
+            result = publisher.publish()
+            self.assertEqual((result['written'], result['unchanged']), ([], 2))
+            self.assertEqual(os.stat(os.path.join(dags_dir, 'etl_emp.py')).st_mtime_ns, mtime)
+
+            # A renamed dag_id replaces the mapping's old file; deleted mappings lose theirs on a full publish
+            db.session.add(EtlDagHistory(dag_id='etl_emp_v2', mapping_id=emp_id, generated_code='emp'))
+            db.session.commit()
+            self.assertTrue(map_service.delete_mapping(dept_id))
+            self.assertEqual(EtlDagHistory.query.filter_by(mapping_id=dept_id).count(), 1) # history is kept
+            result = publisher.publish(mapping_ids=[emp_id])
+            self.assertEqual((result['written'], result['removed']), (['etl_emp_v2.py'], ['etl_emp.py']))
+            self.assertEqual(publisher.publish()['removed'], ['etl_dept.py'])
+            self.assertEqual(sorted(f for f in os.listdir(dags_dir) if not f.startswith('.')),
+                             ['etl_emp_v2.py', 'not_ours.py'])
+
+            response = self.app.post('/api/dags/publish', json={})
+            self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_stale_dags_by_input_hash(self):
+        from datetime import datetime
+        from models import EtlMetadata, EtlDagHistory, EtlTemplate, EtlCatalogCache
+        from services.template_registry import TemplateRegistry
+        with app.app_context():
+            app.config['DAG_ID_MODE'] = 'deterministic'
+            catalog = {
+                'SOURCE': {name: [{"name": "ID", "type": "NUMBER"}] for name in ('EMP', 'DEPT')},
+                'TARGET': {name: [{"name": "ID", "type": "INTEGER"}] for name in ('EMP', 'DEPT')}
+            }
+            try:
+                with self._fake_catalog(catalog):
+                    map_service = MappingService()
+                    mapping_ids = []
+                    for name in ('EMP', 'DEPT'):
+                        # Source columns live in the catalog cache, not in tb_etl_meta_mst
+                        source = EtlMetadata(table_name=name, db_type='ORACLE', schema_info='[]')
+                        target = EtlMetadata(table_name=name, db_type='POSTGRES', schema_info='[]')
+                        db.session.add_all([source, target])
+                        db.session.commit()
+                        mapping_ids.append(map_service.save_mapping(source.id, target.id, {"type": "1:1", "mappings": [
+                            {"source_column": "ID", "target_column": "ID"}]}).id)
+                    tmpl_service = TemplateService()
+                    tmpl_service.save_template('macros', 'MACROS', "{% macro header() %}# v1{% endmacro %}")
+                    template = tmpl_service.save_template(
+                        'dag', 'ORACLE_S3_POSTGRES', "{% import 'macros' as m %}{{ m.header() }} {{ dag_id }} {{ created_at }}")
+
+                    service = DagService()
+                    first = service.generate_dags(template.id, workers=1)['histories']
+                    self.assertEqual(first[0]['dag_id'], 'etl_EMP_to_EMP')
+                    self.assertEqual(service.rebuild_stale()['fresh'], 2)
+
+                    # A stats refresh alone does not make anything stale
+                    for entry in EtlCatalogCache.query.all():
+                        entry.num_rows, entry.avg_row_len, entry.stats_at = 5000, 80, datetime.utcnow()
+                    db.session.commit()
+                    result = service.rebuild_stale(dry_run=True)
+                    self.assertEqual((result['stale'], result['fresh']), ([], 2))
+
+                    # Mapping and source catalog changes make exactly those DAGs stale
+                    mapping = map_service.get_mapping(mapping_ids[0])
+                    map_service.save_mapping(mapping.source_table_id, mapping.target_table_id, {"type": "1:1", "mappings": [
+                        {"source_column": "ID", "target_column": "ID", "rule_type": "NVL", "rule_detail": "0"}]},
+                        mapping_id=mapping.id)
+                    result = service.rebuild_stale(dry_run=True)
+                    self.assertEqual((result['stale'], result['fresh'], result['histories']), ([mapping_ids[0]], 1, []))
+                    service.rebuild_stale()
+
+                    # New unmapped source column: picked up by the catalog sync, the SELECT stays the same
+                    catalog['SOURCE']['DEPT'] = [{"name": "ID", "type": "NUMBER"}, {"name": "LOC", "type": "VARCHAR2(13)"}]
+                    result = service.rebuild_stale()
+                    self.assertEqual([h['mapping_id'] for h in result['histories']], [mapping_ids[1]])
+                    codes = [h.generated_code for h in EtlDagHistory.query.filter_by(mapping_id=mapping_ids[1])]
+                    self.assertEqual(codes[0], codes[1]) # deterministic: same bytes
+
+                    # An edited shared macro marks every DAG using it as stale
+                    macros = EtlTemplate.query.filter_by(template_name='macros').one()
+                    macros.template_content = "{% macro header() %}# v2{% endmacro %}"
+                    db.session.commit()
+                    TemplateRegistry.invalidate(macros.id)
+                    self.assertEqual(sorted(service.rebuild_stale()['stale']), sorted(mapping_ids))
+                    self.assertTrue(EtlDagHistory.query.order_by(EtlDagHistory.id.desc()).first().generated_code.startswith('# v2'))
+
+                    response = self.app.post('/api/dags/rebuild', json={})
+                    self.assertEqual(response.get_json()['fresh'], 2)
+            finally:
+                app.config['DAG_ID_MODE'] = 'dated'
+
+    def test_column_pipeline_rules(self):
+        from services.transform_service import ColumnPipeline
+        pipeline = ColumnPipeline([
+            {"rule_type": "DIRECT", "rule_detail": ""},
+            {"rule_type": "NVL", "rule_detail": "N/A"},
+            {"rule_type": "MASKING", "rule_detail": "#**#"},
+            {"rule_type": "MASKING", "rule_detail": ""}
+        ])
+        rows = pipeline.apply([(1, None, 'SMITH', 'AB'), (2, 'x', None, None)])
+        self.assertEqual(rows, [(1, 'N/A', 'S**TH', '**'), (2, 'x', None, None)])
+        self.assertEqual(pipeline.apply([]), [])
+
+    def test_pushdown_compiles_single_select(self):
+        from models import EtlMetadata, EtlMapping
+        from services.pushdown_service import PushdownService, type_family
+        with app.app_context():
+            source = EtlMetadata(table_name='EMP', db_type='ORACLE', schema_info='[]')
+            target = EtlMetadata(table_name='EMP', db_type='POSTGRES', schema_info='[]')
+            db.session.add_all([source, target])
+            db.session.commit()
+            mapping = EtlMapping(source_table_id=source.id, target_table_id=target.id, mapping_json=json.dumps({
+                "type": "1:1",
+                "mappings": [
+                    {"source_column": "EMPNO", "target_column": "EMP_ID", "rule_type": "DIRECT"},
+                    {"source_column": "COMM", "target_column": "COMM", "rule_type": "NVL", "rule_detail": "0"},
+                    {"source_column": "JOB", "target_column": "JOB", "rule_type": "NVL", "rule_detail": "N/A"},
+                    {"source_column": "", "target_column": "SAL2", "rule_type": "CUSTOM", "rule_detail": "SAL * 2"},
+                    {"source_column": "ENAME", "target_column": "ENAME", "rule_type": "MASKING", "rule_detail": "**"},
+                    {"source_column": "PHONE", "target_column": "PHONE", "rule_type": "MASKING", "rule_detail": "###**"},
+                    {"source_column": "", "target_column": "UNUSED", "rule_type": "DIRECT"}
+                ]
+            }))
+            db.session.add(mapping)
+            db.session.commit()
+
+            service = PushdownService()
+            source_columns = [{"name": "EMPNO", "type": "VARCHAR2"}, {"name": "COMM", "type": "NUMBER"}]
+            compiled = service.compile_mapping(mapping, 'oracle', source_columns=source_columns,
+                                               target_columns=[{"name": "EMP_ID", "type": "INTEGER"}])
+            sql = compiled['sql']
+            self.assertTrue(sql.startswith('SELECT CAST("EMPNO" AS NUMBER) AS "EMP_ID", NVL("COMM", 0) AS "COMM"'))
+            self.assertIn("NVL(\"JOB\", 'N/A') AS \"JOB\"", sql)
+            self.assertIn('(SAL * 2) AS "SAL2"', sql)
+            self.assertIn('CASE WHEN "ENAME" IS NULL THEN NULL ELSE RPAD', sql)
+            self.assertNotIn('UNUSED', sql)
+            self.assertTrue(sql.endswith('FROM "EMP"'))
+            # Only the positional mask is left for Python
+            self.assertEqual([r['rule_type'] for r in compiled['python_rules']],
+                             ['DIRECT', 'DIRECT', 'DIRECT', 'DIRECT', 'DIRECT', 'MASKING'])
+
+            # Cached until the mapping changes
+            self.assertIs(service.compile_mapping(mapping, 'oracle', source_columns,
+                                                  [{"name": "EMP_ID", "type": "INTEGER"}])['python_rules'],
+                          compiled['python_rules'])
+            self.assertIn('COALESCE("COMM", 0)', service.compile_mapping(mapping, 'postgresql', source_columns)['sql'])
+            # Numeric-looking defaults stay quoted unless the column is numeric (text_col = 0 fails on Postgres)
+            self.assertIn('COALESCE("COMM", \'0\')', service.compile_mapping(
+                mapping, 'postgresql', [{"name": "COMM", "type": "TEXT"}])['sql'])
+            self.assertIn('COALESCE("COMM", \'0\')', service.compile_mapping(mapping, 'postgresql')['sql'])
+            # INTERVAL is not numeric (it starts with INT): no cast, quoted default
+            interval = service.compile_mapping(mapping, 'oracle', [{"name": "EMPNO", "type": "INTERVAL DAY(2) TO SECOND(6)"},
+                                                                   {"name": "COMM", "type": "INTERVAL YEAR(2) TO MONTH"}],
+                                               [{"name": "EMP_ID", "type": "NUMBER(10)"}])['sql']
+            self.assertTrue(interval.startswith('SELECT "EMPNO" AS "EMP_ID", NVL("COMM", \'0\') AS "COMM"'))
+            self.assertEqual([type_family(t) for t in ('INTERVAL DAY TO SECOND', 'INT4', 'TIMESTAMP(6) WITH TIME ZONE',
+                                                       'CHARACTER VARYING(10)', 'BINARY_DOUBLE', 'RAW(16)')],
+                             [None, 'number', 'datetime', 'string', 'number', None])
+
+    def test_transfer_streams_and_applies_rules(self):
+        from sqlalchemy import create_engine, text
+        from models import EtlMetadata, EtlMapping
+        from services.transfer_service import TransferService
+
+        source_engine = create_engine('sqlite://')
+        target_engine = create_engine('sqlite://')
+        with source_engine.begin() as conn:
+            conn.execute(text('CREATE TABLE "EMP" ("EMPNO" INTEGER, "ENAME" VARCHAR(10), "COMM" NUMERIC, "SAL" NUMERIC)'))
+            conn.execute(text('INSERT INTO "EMP" VALUES (:e, :n, :c, :s)'),
+                         [{"e": i, "n": f"NAME{i}", "c": None if i % 2 else 100, "s": i * 10} for i in range(25)])
+        with target_engine.begin() as conn:
+            conn.execute(text('CREATE TABLE "EMP" ("EMPNO" INTEGER, "ENAME" VARCHAR(10), "COMM" NUMERIC, "SAL2" NUMERIC)'))
+
+        with app.app_context():
+            source = EtlMetadata(table_name='EMP', db_type='ORACLE', schema_info='[]')
+            target = EtlMetadata(table_name='EMP', db_type='POSTGRES', schema_info='[]')
+            db.session.add_all([source, target])
+            db.session.commit()
+            mapping = EtlMapping(source_table_id=source.id, target_table_id=target.id, mapping_json=json.dumps({
+                "type": "1:1",
+                "mappings": [
+                    {"source_column": "EMPNO", "target_column": "EMPNO", "rule_type": "DIRECT", "rule_detail": ""},
+                    {"source_column": "ENAME", "target_column": "ENAME", "rule_type": "MASKING", "rule_detail": "***"},
+                    {"source_column": "COMM", "target_column": "COMM", "rule_type": "NVL", "rule_detail": "0"},
+                    {"source_column": "", "target_column": "SAL2", "rule_type": "CUSTOM", "rule_detail": '"SAL" * 2'}
+                ]
+            }))
+            db.session.add(mapping)
+            db.session.commit()
+
+            stats = TransferService(source_engine, target_engine).run_mapping(mapping.id, batch_size=10)
+
+        self.assertEqual(stats['rows'], 25)
+        self.assertIn('rows_per_sec', stats)
+        with target_engine.connect() as conn:
+            rows = conn.execute(text('SELECT * FROM "EMP" ORDER BY "EMPNO"')).fetchall()
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[1][1], '***E1')
+        self.assertEqual(float(rows[1][2]), 0)
+        self.assertEqual(float(rows[2][3]), 40)
+
+    def test_transfer_parallel_chunks_cover_table_once(self):
+        import tempfile
+        from sqlalchemy import create_engine, text
+        from models import EtlMetadata, EtlMapping
+        from services.transfer_service import TransferService
+
+        tmpdir = tempfile.mkdtemp()
+        source_engine = create_engine(f'sqlite:///{tmpdir}/source.db')
+        target_engine = create_engine(f'sqlite:///{tmpdir}/target.db', connect_args={"timeout": 30})
+        with source_engine.begin() as conn:
+            conn.execute(text('CREATE TABLE "EMP" ("EMPNO" INTEGER PRIMARY KEY, "ENAME" VARCHAR(10))'))
+            conn.execute(text('INSERT INTO "EMP" VALUES (:e, :n)'), [{"e": i * 7, "n": f"N{i}"} for i in range(1, 101)])
+        with target_engine.begin() as conn:
+            conn.execute(text('CREATE TABLE "EMP" ("EMPNO" INTEGER, "ENAME" VARCHAR(10))'))
+
+        with app.app_context():
+            source = EtlMetadata(table_name='EMP', db_type='ORACLE', schema_info='[]')
+            target = EtlMetadata(table_name='EMP', db_type='POSTGRES', schema_info='[]')
+            db.session.add_all([source, target])
+            db.session.commit()
+            mapping = EtlMapping(source_table_id=source.id, target_table_id=target.id, mapping_json=json.dumps({
+                "type": "1:1",
+                "mappings": [
+                    {"source_column": "EMPNO", "target_column": "EMPNO", "rule_type": "DIRECT"},
+                    {"source_column": "ENAME", "target_column": "ENAME", "rule_type": "DIRECT"}
+                ],
+                "options": {"parallel_degree": 4, "split_method": "PK_RANGE"}
+            }))
+            db.session.add(mapping)
+            db.session.commit()
+
+            target.ddl_options = json.dumps({"defer_indexes": True,
+                                             "indexes": [{"name": "IX_EMP_ENAME", "columns": ["ENAME"]}]})
+            db.session.commit()
+
+            mapping_id = mapping.id
+            service = TransferService(source_engine, target_engine)
+            stats = service.run_mapping(mapping.id, batch_size=16)
+            self.assertEqual(stats['chunks'], 4)
+            self.assertEqual(stats['rows'], 100)
+
+            stats = service.run_mapping(mapping.id, parallel_degree=3)
+            self.assertEqual(stats['rows'], 100)
+
+            chunks = service._split_chunks(source_engine, 'EMP', 4, 'NTILE')
+            self.assertEqual([params for _, params in chunks],
+                             [{'hi': 182}, {'lo': 182, 'hi': 357}, {'lo': 357, 'hi': 532}, {'lo': 532}])
+
+        with target_engine.connect() as conn:
+            count, distinct = conn.execute(text('SELECT COUNT(*), COUNT(DISTINCT "EMPNO") FROM "EMP"')).fetchone()
+            indexes = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+        self.assertEqual((count, distinct), (100, 100))
+        self.assertEqual(indexes, ['IX_EMP_ENAME'])
+
+        # A failed chunk fails the run as partial and reports which ranges were committed
+        from services.transfer_service import PartialTransferError
+        copy_chunk = service._copy_chunk
+        def flaky_copy(*args):
+            if 'hi' not in args[6]:
+                raise RuntimeError('connection lost')
+            return copy_chunk(*args)
+        service._copy_chunk = flaky_copy
+        with app.app_context():
+            with self.assertRaises(PartialTransferError) as ctx:
+                service.run_mapping(mapping_id)
+        stats = ctx.exception.stats
+        self.assertEqual(stats['status'], 'PARTIAL')
+        self.assertEqual([c['params'] for c in stats['failed_chunks']], [{'lo': '526.75'}])
+        self.assertEqual(len(stats['completed_chunks']), 3)
+        self.assertEqual(stats['rows'], sum(c['rows'] for c in stats['completed_chunks']))
+
+    def test_transfer_incremental_watermark(self):
+        import tempfile
+        from sqlalchemy import create_engine, text
+        from models import EtlMetadata, EtlMapping
+        from services.transfer_service import TransferService
+
+        tmpdir = tempfile.mkdtemp()
+        source_engine = create_engine(f'sqlite:///{tmpdir}/source.db')
+        target_engine = create_engine(f'sqlite:///{tmpdir}/target.db')
+        with source_engine.begin() as conn:
+            conn.execute(text('CREATE TABLE "EMP" ("EMPNO" INTEGER PRIMARY KEY, "CHG_SEQ" INTEGER)'))
+            conn.execute(text('INSERT INTO "EMP" VALUES (:e, :s)'), [{"e": i, "s": i} for i in range(1, 11)])
+        with target_engine.begin() as conn:
+            conn.execute(text('CREATE TABLE "EMP" ("EMPNO" INTEGER)'))
+            conn.execute(text('INSERT INTO "EMP" VALUES (999)'))
+
+        with app.app_context():
+            source = EtlMetadata(table_name='EMP', db_type='ORACLE', schema_info='[]')
+            target = EtlMetadata(table_name='EMP', db_type='POSTGRES', schema_info='[]')
+            db.session.add_all([source, target])
+            db.session.commit()
+            mapping = EtlMapping(source_table_id=source.id, target_table_id=target.id, mapping_json=json.dumps({
+                "type": "1:1",
+                "mappings": [{"source_column": "EMPNO", "target_column": "EMPNO", "rule_type": "DIRECT"}],
+                "options": {"load_mode": "INCREMENTAL", "watermark_column": "CHG_SEQ"}
+            }))
+            db.session.add(mapping)
+            db.session.commit()
+
+            # No stored mark yet: the first run is a full load that replaces the target
+            service = TransferService(source_engine, target_engine)
+            stats = service.run_mapping(mapping.id)
+            self.assertEqual((stats['load_mode'], stats['rows']), ('FULL', 10))
+            self.assertEqual(MappingService().get_watermark(mapping.id, 'CHG_SEQ'), 10)
+
+            with source_engine.begin() as conn:
+                conn.execute(text('INSERT INTO "EMP" VALUES (:e, :s)'), [{"e": i, "s": i} for i in range(11, 14)])
+            stats = service.run_mapping(mapping.id)
+            self.assertEqual((stats['load_mode'], stats['rows'], stats['watermark']), ('INCREMENTAL', 3, '13'))
+
+            # Nothing new since the last mark
+            self.assertEqual(service.run_mapping(mapping.id)['rows'], 0)
+
+            # Full reloads stop at the mark taken before the copy (rows without a mark are kept),
+            # so a row committed during the copy is loaded once, by the next incremental run
+            with source_engine.begin() as conn:
+                conn.execute(text('INSERT INTO "EMP" VALUES (14, NULL), (15, 15)'))
+            high_water_mark = service._get_high_water_mark
+            service._get_high_water_mark = lambda *args: 13
+            stats = service.run_mapping(mapping.id, full_reload=True)
+            self.assertEqual((stats['load_mode'], stats['rows']), ('FULL', 14))
+            service._get_high_water_mark = high_water_mark
+            self.assertEqual(service.run_mapping(mapping.id)['rows'], 1)
+
+        with target_engine.connect() as conn:
+            self.assertEqual(conn.execute(text('SELECT COUNT(*), COUNT(DISTINCT "EMPNO") FROM "EMP"')).fetchone(),
+                             (15, 15))
+
 if __name__ == '__main__':
     unittest.main()